@@ -0,0 +1,146 @@
+"""AMO Eiendom – beregningskjerne for eiendomskalkulatoren.
+
+Ren Python uten Streamlit: kan importeres fra batchjobber, tester,
+benchmarks og arbeidsprosesser. app.py er bare UI-laget.
+"""
+from .batch import (
+    AVKASTNING_KOLONNER,
+    EGENKAPITAL_KOLONNER,
+    SCENARIO_KOLONNER,
+    BatchResultat,
+    beregn_avkastning_batch,
+    beregn_batch,
+    beregn_egenkapital_batch,
+    beregn_kpi_batch,
+    beregn_skatt_batch,
+)
+from .egenkapital import LTV_TERSKLER, Egenkapitalforløp, egenkapitalbane, egenkapitalforløp
+from .eksport import batch_chunks, eksport_bytes, eksporter, scenario_chunks, tidsserie_chunks
+from .graf import Beregningsgraf, Øyeblikk, kalkulatorgraf
+from .internrente import Internrente, avkastningstabell, egenkapitalstrømmer, internrente, nåverdi
+from .kalkulator import avkastningsscenario, beregn, beregn_kpi
+from .kpi import break_even_month, first_month_kpis, yields
+from .kpi_lukket import lukkede_kpi, lukkede_årssummer
+from .laan import beregn_lån, nedbetalingsplan, nedbetalingsplan_matrise, netto_cashflow, restgjeld_matrise
+from .laanehendelser import (
+    Ekstrainnbetaling,
+    Fastrente,
+    Leieendring,
+    Låneforløp,
+    Refinansiering,
+    Renteendring,
+    beregn_lån_hendelser,
+)
+from .leieliste import Leieliste, Leielistelager, les_leieliste, månedlig_leie
+from .maalsok import Målsøkresultat, målsøk, målsøk_alle
+from .maler import Mal, format_tusen
+from .modeller import Beregning, Eiendomsinput
+from .montecarlo import MonteCarloParametre, MonteCarloResultat, simuler
+from .navnerom import Navnerom
+from .profilbase import Lagreresultat, ProfilDatabase, flett, migrer_json
+from .rapport import lag_onepager_html, lag_presentasjon_html, onepager_html, presentasjon_html
+from .rapportcache import RapportCache, rapport_nøkkel
+from .sensitivitet import SensitivitetResultat, sensitivitet_grid
+from .skatt import SKATTEREGLER, Skatteregler, skatt_pr_år, skatteberegning, skattefradrag_estimat
+from .verdi import VERDISTIGNING_SATS, verdibane, verdistigning_liste
+from .ytelse import Seksjonstimer
+
+__all__ = [
+    "annonse_til_profil",
+    "kpi_chunks",
+    "les_annonser",
+    "rangér",
+    "AVKASTNING_KOLONNER",
+    "EGENKAPITAL_KOLONNER",
+    "SCENARIO_KOLONNER",
+    "BatchResultat",
+    "beregn_avkastning_batch",
+    "beregn_batch",
+    "beregn_egenkapital_batch",
+    "beregn_kpi_batch",
+    "beregn_skatt_batch",
+    "LTV_TERSKLER",
+    "Egenkapitalforløp",
+    "egenkapitalbane",
+    "egenkapitalforløp",
+    "batch_chunks",
+    "eksport_bytes",
+    "eksporter",
+    "scenario_chunks",
+    "tidsserie_chunks",
+    "Beregningsgraf",
+    "Øyeblikk",
+    "kalkulatorgraf",
+    "Internrente",
+    "avkastningstabell",
+    "egenkapitalstrømmer",
+    "internrente",
+    "nåverdi",
+    "avkastningsscenario",
+    "beregn",
+    "beregn_kpi",
+    "break_even_month",
+    "first_month_kpis",
+    "yields",
+    "lukkede_kpi",
+    "lukkede_årssummer",
+    "beregn_lån",
+    "nedbetalingsplan",
+    "nedbetalingsplan_matrise",
+    "netto_cashflow",
+    "restgjeld_matrise",
+    "Ekstrainnbetaling",
+    "Fastrente",
+    "Leieendring",
+    "Låneforløp",
+    "Refinansiering",
+    "Renteendring",
+    "beregn_lån_hendelser",
+    "Leieliste",
+    "Leielistelager",
+    "les_leieliste",
+    "månedlig_leie",
+    "Målsøkresultat",
+    "målsøk",
+    "målsøk_alle",
+    "Mal",
+    "format_tusen",
+    "Beregning",
+    "Eiendomsinput",
+    "MonteCarloParametre",
+    "MonteCarloResultat",
+    "simuler",
+    "Navnerom",
+    "Lagreresultat",
+    "ProfilDatabase",
+    "flett",
+    "migrer_json",
+    "lag_onepager_html",
+    "lag_presentasjon_html",
+    "onepager_html",
+    "presentasjon_html",
+    "RapportCache",
+    "rapport_nøkkel",
+    "SensitivitetResultat",
+    "sensitivitet_grid",
+    "SKATTEREGLER",
+    "Skatteregler",
+    "skatt_pr_år",
+    "skatteberegning",
+    "skattefradrag_estimat",
+    "VERDISTIGNING_SATS",
+    "verdibane",
+    "verdistigning_liste",
+    "Seksjonstimer",
+]
+
+# annonser lastes først ved bruk: modulen kjøres også som `python -m amo_eiendom.annonser`,
+# og er den allerede importert av pakken, advarer runpy om at den lastes to ganger.
+_ANNONSER = ("annonse_til_profil", "kpi_chunks", "les_annonser", "rangér")
+
+
+def __getattr__(navn: str):
+    if navn in _ANNONSER:
+        from . import annonser
+        return getattr(annonser, navn)
+    raise AttributeError(f"module {__name__!r} has no attribute {navn!r}")
@@ -0,0 +1,294 @@
+"""Masseimport og rangering av boligannonser fra lokale filer.
+
+    python -m amo_eiendom.annonser annonser.jsonl --sorter netto_yield --topp 50 --ut rangert.csv
+    python -m amo_eiendom.annonser annonsemappe/ --mal profil.json --alle alle.parquet
+
+Annonsene leses strømmende (JSONL linje for linje, eller én fil om gangen fra
+en mappe), gjøres om til profiler og beregnes i biter med den lukkede
+KPI-motoren (beregn_kpi_batch). Bare de beste `topp` radene holdes i minnet,
+så minnebruken er konstant uansett antall annonser. Med `--alle` skrives
+KPI-ene for alle annonser bit for bit til fil.
+"""
+import argparse
+import json
+import math
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .batch import beregn_kpi_batch
+from .eksport import eksporter
+from .kalkulator import scenario
+from .lagring import load_json
+from .modeller import OPPUSSING_STANDARD, Eiendomsinput
+from .profilbase import ProfilDatabase
+from .tall import norsk_tall
+
+# Annonsefelt → navn som godtas (små bokstaver)
+FELT = {
+    "kjøpesum": ("kjøpesum", "totalpris", "prisantydning", "pris", "price", "asking_price"),
+    "leie": ("leie", "leieestimat", "estimert_leie", "rent", "rent_estimate"),
+    "felleskostnader": ("felleskostnader", "felleskost", "fellesutgifter", "fees", "common_costs"),
+    "kommunale_avgifter": ("kommunale_avgifter", "kommunale avgifter", "municipal_fees"),  # kr pr. år
+    "finn_url": ("finn_url", "url", "lenke", "link"),
+    "navn": ("prosjekt_navn", "tittel", "title", "adresse", "address", "navn"),
+    "id": ("finnkode", "id", "annonse_id"),
+}
+
+# Sorteringsnøkkel → synkende?
+SORTERINGER = {
+    "netto_yield": True,
+    "netto_1": True,
+    "break_even_mnd": False,
+}
+
+CHUNK = 2_000
+TOPP = 100
+MAKS_FEILMELDINGER = 20
+
+# Uten mal: standardprofilen, men uten oppussing
+_STANDARD_MAL = Eiendomsinput(oppussing=dict.fromkeys(OPPUSSING_STANDARD, 0)).til_profil()
+
+KOLONNER = ("annonse", "navn", "finn_url", "kjøpesum", "leie", "drift_mnd", "total_investering", "lån",
+            "brutto_yield", "netto_yield", "termin_1", "netto_1", "break_even_mnd", "akk_slutt")
+
+
+def les_annonser(kilde: Path) -> Iterator[dict]:
+    """Annonser én om gangen fra en JSONL-fil, en JSON-fil eller en mappe med slike filer.
+
+    En JSON-fil kan inneholde én annonse eller en liste med annonser.
+    """
+    kilde = Path(kilde)
+    filer = sorted(f for f in kilde.iterdir() if f.suffix in (".json", ".jsonl")) if kilde.is_dir() else [kilde]
+    for fil in filer:
+        if fil.suffix == ".jsonl":
+            with fil.open(encoding="utf-8") as f:
+                for nr, linje in enumerate(f, 1):
+                    if linje.strip():
+                        try:
+                            yield json.loads(linje)
+                        except json.JSONDecodeError:
+                            yield {"_feil": f"{fil.name}:{nr}: ugyldig JSON"}
+            continue
+        data = load_json(fil)
+        if isinstance(data, list):
+            yield from data
+        elif data:
+            yield {"id": fil.stem, **data}
+        else:
+            yield {"_feil": f"{fil.name}: tom eller ugyldig JSON"}
+
+
+def _felter(annonse: dict) -> dict:
+    """Annonsen med feltene i FELT under interne navn (første alias som finnes)."""
+    normalisert = {str(k).strip().lower(): v for k, v in annonse.items()}
+    ut = {}
+    for navn, alias in FELT.items():
+        for a in alias:
+            if a in normalisert:
+                ut[navn] = normalisert[a]
+                break
+    return ut
+
+
+def annonse_til_profil(annonse: dict, mal: dict | None = None, egenkapital_andel: float | None = None) -> dict:
+    """Profil for én annonse. Lån, eierform og øvrige kostnader hentes fra `mal`.
+
+    Uten mal brukes standardverdiene i Eiendomsinput, men uten oppussing.
+    Med `egenkapital_andel` settes egenkapitalen til andelen av kjøpesummen.
+    """
+    felt = _felter(annonse)
+    kjøpesum = norsk_tall(felt.get("kjøpesum"))
+    leie = norsk_tall(felt.get("leie"))
+    if not kjøpesum or kjøpesum <= 0:
+        raise ValueError("mangler pris")
+    if leie is None or leie < 0:
+        raise ValueError("mangler leieestimat")
+    profil = dict(mal or _STANDARD_MAL)
+    drift = dict(profil.get("drift_mnd", {}))
+    felles = norsk_tall(felt.get("felleskostnader"))
+    kommunale = norsk_tall(felt.get("kommunale_avgifter"))
+    if felles is not None:
+        drift["felleskostnader"] = int(round(felles))
+    if kommunale is not None:
+        drift["kommunale avgifter"] = int(round(kommunale / 12))
+    profil.update(
+        prosjekt_navn=str(felt.get("navn") or felt.get("id") or "Annonse"),
+        finn_url=str(felt.get("finn_url") or ""),
+        kjøpesum=int(round(kjøpesum)),
+        leie=int(round(leie)),
+        use_rooms_total=False,
+        drift_mnd=drift,
+    )
+    for k in ("leie_mnd", "leieliste_hash", "leieliste_start", "cover_hash", "cover_b64"):
+        profil.pop(k, None)
+    if egenkapital_andel is not None:
+        profil["egenkapital"] = int(math.ceil(kjøpesum * egenkapital_andel))
+    return profil
+
+
+def kpi_chunks(
+    annonser: Iterable[dict],
+    mal: dict | None = None,
+    egenkapital_andel: float | None = None,
+    chunk: int = CHUNK,
+    feil: list[str] | None = None,
+) -> Iterator[pd.DataFrame]:
+    """KPI-tabell (KOLONNER pluss profilen som dict i 'profil') for annonsene, `chunk` om gangen.
+
+    Annonser som ikke kan tolkes hoppes over; meldingen legges i `feil` hvis gitt.
+    """
+    def bit(rader: list[tuple[str, dict, Eiendomsinput]]) -> pd.DataFrame:
+        scenarier = pd.DataFrame([scenario(inp) for _, _, inp in rader])
+        kpi = beregn_kpi_batch(scenarier, horisonter=())
+        kjøpesum = np.array([inp.kjøpesum for _, _, inp in rader], dtype=np.int64)
+        total = np.array([inp.total_investering for _, _, inp in rader], dtype=float)
+        leie, drift = scenarier["leie"].to_numpy(float), scenarier["drift_mnd"].to_numpy(float)
+        sikker = np.where(total > 0, total, 1.0)
+        return pd.DataFrame({
+            "annonse": [a for a, _, _ in rader],
+            "navn": [inp.prosjekt_navn for _, _, inp in rader],
+            "finn_url": [inp.finn_url for _, _, inp in rader],
+            "kjøpesum": kjøpesum,
+            "leie": scenarier["leie"].to_numpy(np.int64),
+            "drift_mnd": scenarier["drift_mnd"].to_numpy(np.int64),
+            "total_investering": total.astype(np.int64),
+            "lån": scenarier["lån"].to_numpy(np.int64),
+            # Samme formel som kpi.yields, for hele biten
+            "brutto_yield": np.where(total > 0, leie * 12 / sikker * 100, 0.0),
+            "netto_yield": np.where(total > 0, (leie * 12 - drift * 12) / sikker * 100, 0.0),
+            "termin_1": kpi["termin_1"].to_numpy(),
+            "netto_1": kpi["netto_1"].to_numpy(),
+            "break_even_mnd": kpi["break_even_mnd"].array,
+            "akk_slutt": kpi["akk_slutt"].to_numpy(),
+            "profil": [p for _, p, _ in rader],
+        })
+
+    rader: list[tuple[str, dict, Eiendomsinput]] = []
+    for nr, annonse in enumerate(annonser, 1):
+        id_ = str(_felter(annonse).get("id") or nr) if isinstance(annonse, dict) else str(nr)
+        try:
+            if not isinstance(annonse, dict):
+                raise ValueError("ikke et JSON-objekt")
+            if "_feil" in annonse:
+                raise ValueError(annonse["_feil"])
+            profil = annonse_til_profil(annonse, mal, egenkapital_andel)
+            rader.append((id_, profil, Eiendomsinput.fra_profil(profil)))
+        except (TypeError, ValueError) as e:
+            if feil is not None:
+                feil.append(f"{id_}: {e}")
+            continue
+        if len(rader) >= chunk:
+            yield bit(rader)
+            rader = []
+    if rader:
+        yield bit(rader)
+
+
+def _sorter(df: pd.DataFrame, sorter: str) -> pd.DataFrame:
+    # Stabil sortering; uten break-even havner sist, likhet avgjøres av netto yield
+    if sorter == "break_even_mnd":
+        return df.sort_values(["break_even_mnd", "netto_yield"], ascending=[True, False],
+                              na_position="last", kind="mergesort")
+    return df.sort_values(sorter, ascending=not SORTERINGER[sorter], na_position="last", kind="mergesort")
+
+
+def _sjekk_sortering(sorter: str):
+    if sorter not in SORTERINGER:
+        raise ValueError(f"Ukjent sortering {sorter!r}; velg en av {', '.join(SORTERINGER)}")
+
+
+def rangér_underveis(chunks: Iterable[pd.DataFrame], sorter: str, topp: int, resultat: dict) -> Iterator[pd.DataFrame]:
+    """Sender bitene uendret videre (f.eks. til eksport) og rangerer dem underveis.
+
+    Når alle bitene er sendt, ligger rangeringen i resultat["beste"] og antall rader i resultat["antall"].
+    Bare topp + én bit holdes i minnet.
+    """
+    _sjekk_sortering(sorter)
+    beste, antall = None, 0
+    for bit in chunks:
+        antall += len(bit)
+        beste = _sorter(bit if beste is None else pd.concat([beste, bit], ignore_index=True), sorter).head(topp)
+        yield bit
+    beste = (pd.DataFrame(columns=[*KOLONNER, "profil"]) if beste is None else beste).reset_index(drop=True)
+    beste.index = pd.RangeIndex(1, len(beste) + 1, name="plass")
+    resultat["beste"], resultat["antall"] = beste, antall
+
+
+def rangér(chunks: Iterable[pd.DataFrame], sorter: str = "netto_yield", topp: int = TOPP) -> tuple[pd.DataFrame, int]:
+    """De `topp` beste radene etter `sorter`, og antall rader totalt."""
+    _sjekk_sortering(sorter)
+    resultat: dict = {}
+    for _ in rangér_underveis(chunks, sorter, topp, resultat):
+        pass
+    return resultat["beste"], resultat["antall"]
+
+
+def profilnavn(beste: pd.DataFrame) -> list[str]:
+    """Navn for de rangerte annonsene som profiler; like navn får annonse-ID-en bak."""
+    dobbel = beste["navn"].duplicated(keep=False).to_numpy()
+    return [f"{n} ({a})" if d else n for n, a, d in zip(beste["navn"], beste["annonse"], dobbel)]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="amo_eiendom.annonser", description="Importer og ranger boligannonser.")
+    parser.add_argument("kilde", type=Path, help="JSONL-fil, JSON-fil eller mappe med annonser")
+    parser.add_argument("--mal", type=Path, default=None, help="profil (JSON) med lån, eierform og kostnader")
+    parser.add_argument("--egenkapital-andel", type=float, default=None,
+                        help="egenkapital som andel av kjøpesummen, f.eks. 0.15 (standard: fra malen)")
+    parser.add_argument("--sorter", choices=list(SORTERINGER), default="netto_yield")
+    parser.add_argument("--topp", type=int, default=TOPP, help="antall annonser i rangeringen")
+    parser.add_argument("--chunk", type=int, default=CHUNK, help="annonser pr. vektorisert kjøring")
+    parser.add_argument("--ut", type=Path, default=Path("rangert.csv"), help="rangert tabell (CSV)")
+    parser.add_argument("--alle", type=Path, default=None, help="skriv KPI-er for alle annonser til .csv/.parquet/.arrow")
+    parser.add_argument("--profiler", type=Path, default=None,
+                        help="lagre de rangerte annonsene som profiler i denne profildatabasen")
+    args = parser.parse_args(argv)
+
+    if not args.kilde.exists():
+        print(f"Finner ikke {args.kilde}", file=sys.stderr)
+        return 2
+    mal = load_json(args.mal) if args.mal is not None else None
+    if args.mal is not None and not mal:
+        print(f"Kunne ikke lese malen {args.mal}", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    feil: list[str] = []
+    chunks = kpi_chunks(les_annonser(args.kilde), mal, args.egenkapital_andel, max(1, args.chunk), feil)
+    if args.alle is not None:
+        args.alle.parent.mkdir(parents=True, exist_ok=True)
+        # Alle radene skrives mens de strømmer forbi, og rangeres underveis
+        resultat: dict = {}
+        bort_profil = (bit[list(KOLONNER)] for bit in rangér_underveis(chunks, args.sorter, args.topp, resultat))
+        eksporter(bort_profil, args.alle)
+        beste, antall = resultat["beste"], resultat["antall"]
+    else:
+        beste, antall = rangér(chunks, args.sorter, args.topp)
+    tid = time.perf_counter() - start
+
+    args.ut.parent.mkdir(parents=True, exist_ok=True)
+    beste[list(KOLONNER)].to_csv(args.ut)
+    if args.profiler is not None:
+        ProfilDatabase(args.profiler).lagre_mange(dict(zip(profilnavn(beste), beste["profil"])))
+    for f in feil[:MAKS_FEILMELDINGER]:
+        print(f"Feil: {f}", file=sys.stderr)
+    if len(feil) > MAKS_FEILMELDINGER:
+        print(f"… og {len(feil) - MAKS_FEILMELDINGER} feil til", file=sys.stderr)
+    print(json.dumps({
+        "annonser": antall,
+        "feilet": len(feil),
+        "sekunder": round(tid, 3),
+        "annonser_pr_sekund": round(antall / tid, 1) if tid > 0 else None,
+        "sortert_på": args.sorter,
+        "ut": str(args.ut),
+    }, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
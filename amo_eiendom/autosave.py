@@ -0,0 +1,200 @@
+"""Autosave med journal: bare endrede nøkler skrives, med debounce og atomisk komprimering.
+
+På disk:
+  autosave.json                – sist komprimerte øyeblikksbilde (skrives via temp-fil + rename)
+  autosave.journal.jsonl       – én linje pr. skriving: {"t": ..., "sett": [[sti, verdi]], "slett": [sti]}
+
+Ved lasting leses øyeblikksbildet og journalen spilles av på toppen. En avbrutt
+siste linje (krasj midt i skriving) ignoreres, og filene komprimeres straks.
+
+Flere sesjoner (også i ulike prosesser) kan dele samme fil: hver skriving
+legger bare til nøklene sesjonen selv har endret, under en fillås, og
+komprimering bygger øyeblikksbildet fra disk i stedet for fra egen tilstand.
+Samtidige endringer av ulike nøkler bevares; for samme nøkkel vinner siste skriver.
+"""
+import copy
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from .lagring import fillås, load_json
+
+DEBOUNCE_S = 2.0
+KOMPRIMER_ETTER = 200  # journallinjer
+
+
+def _diff(gammel: dict, ny: dict, sti: tuple = ()) -> tuple[list, list]:
+    """Returnerer (sett, slett) som lister av stier; går inn i nestede dicts."""
+    sett, slett = [], []
+    for k, v in ny.items():
+        if k not in gammel:
+            sett.append([[*sti, k], v])
+        elif isinstance(v, dict) and isinstance(gammel[k], dict):
+            s, d = _diff(gammel[k], v, (*sti, k))
+            sett += s
+            slett += d
+        elif gammel[k] != v:
+            sett.append([[*sti, k], v])
+    slett += [[*sti, k] for k in gammel if k not in ny]
+    return sett, slett
+
+
+def _anvend(tilstand: dict, post: dict):
+    for sti, verdi in post.get("sett", []):
+        node = tilstand
+        for k in sti[:-1]:
+            node = node.setdefault(k, {})
+        node[sti[-1]] = verdi
+    for sti in post.get("slett", []):
+        node = tilstand
+        for k in sti[:-1]:
+            node = node.get(k, {})
+        node.pop(sti[-1], None)
+
+
+def _skriv_atomisk(path: Path, tekst: str):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(tekst)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Autosave:
+    """Én instans pr. sesjon. Trådsikker: utsatte skrivinger gjøres av en timer-tråd."""
+
+    def __init__(self, path: Path, debounce_s: float = DEBOUNCE_S, komprimer_etter: int = KOMPRIMER_ETTER):
+        self.path = Path(path)
+        self.journal = self.path.with_name(self.path.stem + ".journal.jsonl")
+        self.debounce_s = debounce_s
+        self.komprimer_etter = komprimer_etter
+        self._lås = threading.Lock()
+        self._lagret: dict = {}       # tilstanden slik den står på disk
+        self._ventende: dict | None = None
+        self._timer: threading.Timer | None = None
+        self._siste_skriving = float("-inf")
+        self._journal_linjer = 0
+        self._stats = {
+            "skrivinger": 0,
+            "komprimeringer": 0,
+            "utsatt": 0,
+            "latens_ms_sum": 0.0,
+            "siste_latens_ms": 0.0,
+            "maks_latens_ms": 0.0,
+            "siste_feil": None,
+        }
+
+    def _les_disk(self) -> tuple[dict, int, bool]:
+        """(tilstand, antall journallinjer, avbrutt). Kalles med fillåsen holdt."""
+        tilstand = load_json(self.path)
+        linjer, avbrutt = 0, False
+        if self.journal.exists():
+            for linje in self.journal.read_text(encoding="utf-8").splitlines():
+                try:
+                    post = json.loads(linje)
+                except json.JSONDecodeError:
+                    avbrutt = True
+                    break
+                _anvend(tilstand, post)
+                linjer += 1
+        return tilstand, linjer, avbrutt
+
+    def last(self) -> dict:
+        """Øyeblikksbilde + avspilt journal."""
+        with fillås(self.path):
+            tilstand, linjer, avbrutt = self._les_disk()
+        with self._lås:
+            self._lagret = copy.deepcopy(tilstand)
+            self._journal_linjer = linjer
+            if avbrutt:
+                # Nye linjer etter en ødelagt linje ville aldri blitt lest
+                try:
+                    self._komprimer()
+                except OSError as e:
+                    self._stats["siste_feil"] = f"{type(e).__name__}: {e}"
+        return tilstand
+
+    def registrer(self, tilstand: dict, nå: float | None = None) -> bool:
+        """Meld fra om ny tilstand. Skriver straks hvis debounce-vinduet er ute,
+        ellers utsettes skrivingen til vinduet er over. Returnerer True hvis noe ble skrevet nå."""
+        with self._lås:
+            self._ventende = copy.deepcopy(tilstand)
+            nå = time.monotonic() if nå is None else nå
+            igjen = self.debounce_s - (nå - self._siste_skriving)
+            if igjen > 0:
+                self._stats["utsatt"] += 1
+                self._planlegg(igjen)
+                return False
+            return self._skriv_ventende()
+
+    def flush(self) -> bool:
+        """Skriv eventuelle ventende endringer nå."""
+        with self._lås:
+            return self._skriv_ventende()
+
+    def komprimer(self):
+        """Skriv øyeblikksbilde og tøm journalen."""
+        with self._lås:
+            self._skriv_ventende()
+            self._komprimer()
+
+    def statistikk(self) -> dict:
+        with self._lås:
+            s = dict(self._stats)
+            s["journal_linjer"] = self._journal_linjer
+            s["ventende"] = self._ventende is not None
+        s["snitt_latens_ms"] = s["latens_ms_sum"] / s["skrivinger"] if s["skrivinger"] else 0.0
+        return s
+
+    def _planlegg(self, forsinkelse: float):
+        if self._timer is None or not self._timer.is_alive():
+            self._timer = threading.Timer(forsinkelse, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _skriv_ventende(self) -> bool:
+        if self._ventende is None:
+            return False
+        tilstand, self._ventende = self._ventende, None
+        sett, slett = _diff(self._lagret, tilstand)
+        if not sett and not slett:
+            return False
+
+        start = time.perf_counter()
+        try:
+            post = {"t": time.time(), "sett": sett, "slett": slett}
+            with fillås(self.path):
+                with open(self.journal, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(post, ensure_ascii=False, separators=(",", ":")) + "\n")
+                self._lagret = tilstand
+                self._journal_linjer += 1
+                if self._journal_linjer >= self.komprimer_etter:
+                    self._komprimer(låst=True)
+        except OSError as e:
+            self._stats["siste_feil"] = f"{type(e).__name__}: {e}"
+            self._ventende = tilstand  # prøv igjen ved neste registrering
+            return False
+
+        ms = (time.perf_counter() - start) * 1000
+        self._siste_skriving = time.monotonic()
+        self._stats["skrivinger"] += 1
+        self._stats["latens_ms_sum"] += ms
+        self._stats["siste_latens_ms"] = ms
+        self._stats["maks_latens_ms"] = max(self._stats["maks_latens_ms"], ms)
+        return True
+
+    def _komprimer(self, låst: bool = False):
+        # Journalen inneholder allerede siste endring, så et krasj mellom de to
+        # stegene gir samme tilstand ved neste avspilling. Øyeblikksbildet bygges
+        # fra disk, så linjer fra andre sesjoner ikke går tapt.
+        if not låst:
+            with fillås(self.path):
+                return self._komprimer(låst=True)
+        tilstand, _, _ = self._les_disk()
+        _skriv_atomisk(self.path, json.dumps(tilstand, ensure_ascii=False, separators=(",", ":")))
+        _skriv_atomisk(self.journal, "")
+        self._journal_linjer = 0
+        self._stats["komprimeringer"] += 1
@@ -0,0 +1,206 @@
+"""Batch-beregning: mange lån/leie-scenarier i én vektorisert kjøring."""
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .egenkapital import LTV_TERSKLER, egenkapitalbane, terskelnavn
+from .internrente import (
+    DISKONTERINGSRENTE,
+    STANDARD_EXIT_ÅR,
+    egenkapitalstrømmer,
+    internrente,
+    netto_uten_lån,
+    nåverdi,
+    statustekst,
+)
+from .kpi_lukket import STANDARD_HORISONTER, lukkede_kpi, lukkede_årssummer
+from .laan import nedbetalingsplan_matrise, netto_cashflow, restgjeld_matrise
+from .skatt import SKATTEREGLER, Skatteregler, skatt_pr_år, skattesummer
+from .verdi import VERDISTIGNING_SATS, verdibane
+
+SCENARIO_KOLONNER = ("lån", "rente", "løpetid", "avdragsfri", "lånetype", "leie", "drift_mnd", "eierform")
+# Ekstra kolonner for internrente og nåverdi (se kalkulator.avkastningsscenario)
+AVKASTNING_KOLONNER = ("egenkapital", "startverdi")
+# Egenkapitaloppbygging trenger bare lånet og startverdien
+EGENKAPITAL_KOLONNER = SCENARIO_KOLONNER[:5] + ("startverdi",)
+EGENKAPITAL_HORISONTER_ÅR = (1, 5, 10, 20)
+
+
+@dataclass
+class BatchResultat:
+    """Matriser er (scenario × måned) og NaN-utfylt etter hvert scenarios løpetid."""
+    restgjeld: np.ndarray
+    avdrag: np.ndarray
+    renter: np.ndarray
+    netto: np.ndarray
+    akk: np.ndarray
+    antall_mnd: np.ndarray
+    kpi: pd.DataFrame
+
+    def __len__(self) -> int:
+        return len(self.antall_mnd)
+
+    def tidsserie(self, i: int) -> pd.DataFrame:
+        """Månedstabell for scenario i, på samme form som beregn_lån."""
+        n = int(self.antall_mnd[i])
+        return pd.DataFrame({
+            "Måned": np.arange(1, n + 1),
+            "Restgjeld": self.restgjeld[i, :n],
+            "Avdrag": self.avdrag[i, :n],
+            "Renter": self.renter[i, :n],
+            "Netto cashflow": self.netto[i, :n],
+            "Akk. cashflow": self.akk[i, :n],
+        })
+
+
+def _scenario_arrays(scenarier, kolonner=SCENARIO_KOLONNER) -> tuple[dict[str, np.ndarray], pd.Index]:
+    if not isinstance(scenarier, (pd.DataFrame, Mapping)):
+        raise TypeError("scenarier må være en DataFrame eller en mapping kolonne → verdier")
+    mangler = [k for k in kolonner if k not in scenarier]
+    if mangler:
+        raise ValueError(f"Mangler scenariokolonner: {', '.join(mangler)}")
+    verdier = np.broadcast_arrays(*(np.atleast_1d(np.asarray(scenarier[k])) for k in kolonner))
+    kolonner = dict(zip(kolonner, verdier))
+    indeks = scenarier.index if isinstance(scenarier, pd.DataFrame) else pd.RangeIndex(len(verdier[0]))
+    return kolonner, indeks
+
+
+def kpi_fra_matriser(renter: np.ndarray, avdrag: np.ndarray, netto: np.ndarray, akk: np.ndarray,
+                     antall_mnd: np.ndarray, indeks=None) -> pd.DataFrame:
+    """KPI-er pr. scenario: termin/netto 1. mnd, break-even-måned og slutt-akk."""
+    har_mnd = antall_mnd > 0
+
+    def første(x):
+        if not x.shape[1]:
+            return np.zeros(len(x))
+        return np.where(har_mnd, x[:, 0], 0.0)
+
+    positiv = np.nan_to_num(akk, nan=-1.0) >= 0
+    har_be = positiv.any(axis=1)
+    break_even = np.where(har_be, positiv.argmax(axis=1) + 1, 0)
+
+    siste = np.maximum(antall_mnd - 1, 0)
+    akk_slutt = akk[np.arange(len(akk)), siste] if akk.shape[1] else np.zeros(len(akk))
+
+    return pd.DataFrame({
+        "termin_1": første(renter + avdrag),
+        "netto_1": første(netto),
+        "break_even_mnd": pd.array(np.where(har_be, break_even, None), dtype="Int64"),
+        "akk_slutt": np.where(har_mnd, akk_slutt, 0.0),
+    }, index=indeks)
+
+
+def beregn_batch(scenarier) -> BatchResultat:
+    """Beregner alle scenarier i én kjøring.
+
+    `scenarier` er en DataFrame (én rad pr. scenario) eller en mapping med
+    kolonnene i SCENARIO_KOLONNER; skalarer kringkastes til alle scenarier.
+    """
+    k, indeks = _scenario_arrays(scenarier)
+    plan = nedbetalingsplan_matrise(k["lån"], k["rente"], k["løpetid"], k["avdragsfri"], k["lånetype"])
+    netto = netto_cashflow(plan["termin"], k["leie"][:, None], k["drift_mnd"][:, None], k["eierform"][:, None])
+    akk = np.cumsum(np.nan_to_num(netto, nan=0.0), axis=1)
+    akk[np.isnan(netto)] = np.nan
+
+    antall_mnd = plan["antall_mnd"]
+    return BatchResultat(
+        restgjeld=plan["restgjeld"],
+        avdrag=plan["avdrag"],
+        renter=plan["renter"],
+        netto=netto,
+        akk=akk,
+        antall_mnd=antall_mnd,
+        kpi=kpi_fra_matriser(plan["renter"], plan["avdrag"], netto, akk, antall_mnd, indeks),
+    )
+
+
+def beregn_kpi_batch(scenarier, horisonter=STANDARD_HORISONTER) -> pd.DataFrame:
+    """Bare KPI-ene pr. scenario, på lukket form uten månedsmatriser.
+
+    Samme kolonner som `beregn_batch(...).kpi`, pluss renter_aar1, renter_total
+    og akk_<h> for hver horisont. Til screening og rangering av mange scenarier.
+    """
+    k, indeks = _scenario_arrays(scenarier)
+    kpi = lukkede_kpi(*(k[kol] for kol in SCENARIO_KOLONNER), horisonter=horisonter)
+    be = kpi.pop("break_even_mnd")
+    df = pd.DataFrame(kpi, index=indeks)
+    df.insert(2, "break_even_mnd", pd.array(np.where(be > 0, be, None), dtype="Int64"))
+    return df
+
+
+def beregn_skatt_batch(scenarier, regler: dict[str, Skatteregler] = SKATTEREGLER,
+                       med_år: bool = False) -> pd.DataFrame | tuple[pd.DataFrame, dict]:
+    """Årlig skatt over hele løpetiden for alle scenarier (se skatt.skatt_pr_år).
+
+    Årssummene hentes på lukket form (kpi_lukket.lukkede_årssummer), så arbeidet
+    er pr. år, ikke pr. måned. Returnerer summene pr. scenario (skatt_aar1,
+    skatt_total, fradrag_total, før_skatt_total, etter_skatt_total,
+    underskudd_fremført); med `med_år=True` også (scenario × år)-matrisene.
+    """
+    k, indeks = _scenario_arrays(scenarier)
+    sum_år = lukkede_årssummer(*(k[kol] for kol in SCENARIO_KOLONNER[:-1]))
+    måneder = sum_år["måneder"]
+    år = skatt_pr_år(k["leie"][:, None] * måneder, k["drift_mnd"][:, None] * måneder, sum_år["renter"],
+                     sum_år["før_skatt"], k["eierform"], regler)
+    summer = pd.DataFrame(skattesummer(år), index=indeks)
+    return (summer, år) if med_år else summer
+
+
+def beregn_avkastning_batch(scenarier, exit_år=STANDARD_EXIT_ÅR, diskonteringsrente=DISKONTERINGSRENTE,
+                            verdistigning: float = VERDISTIGNING_SATS) -> pd.DataFrame:
+    """Internrente og nåverdi på egenkapitalen for alle scenarier og exit-år (se internrente).
+
+    Scenariene trenger SCENARIO_KOLONNER pluss AVKASTNING_KOLONNER. Salgsverdien
+    er startverdi × (1 + verdistigning)^år. Gir irr_<år> (% pr. år, NaN uten
+    løsning), npv_<år> (kr) og status_<år> for hvert exit-år; `diskonteringsrente`
+    kan være én pr. scenario.
+    """
+    k, indeks = _scenario_arrays(scenarier, SCENARIO_KOLONNER + AVKASTNING_KOLONNER)
+    # Planen trengs bare frem til siste exit
+    plan = nedbetalingsplan_matrise(k["lån"], k["rente"], k["løpetid"], k["avdragsfri"], k["lånetype"],
+                                    måneder=12 * max(map(int, exit_år), default=0))
+    netto = netto_cashflow(plan["termin"], k["leie"][:, None], k["drift_mnd"][:, None], k["eierform"][:, None])
+    etter_lån = netto_uten_lån(k["leie"], k["drift_mnd"], k["eierform"])
+
+    ut = {}
+    for år in exit_år:
+        år = int(år)
+        strøm = egenkapitalstrømmer(k["egenkapital"], netto, plan["restgjeld"],
+                                    k["startverdi"] * (1 + verdistigning) ** år, 12 * år, etter_lån)
+        irr = internrente(strøm)
+        ut[f"irr_{år}"] = irr.rente_år * 100
+        ut[f"npv_{år}"] = nåverdi(strøm, diskonteringsrente)
+        ut[f"status_{år}"] = statustekst(irr)
+    return pd.DataFrame(ut, index=indeks)
+
+
+def beregn_egenkapital_batch(scenarier, terskler=LTV_TERSKLER, verdistigning=VERDISTIGNING_SATS,
+                             horisonter_år=EGENKAPITAL_HORISONTER_ÅR, med_måneder: bool = False):
+    """Egenkapitaloppbygging og LTV for alle scenarier (se egenkapital).
+
+    Scenariene trenger EGENKAPITAL_KOLONNER. `verdistigning` er én sats, en bane
+    med én sats pr. år eller en (scenario × år)-matrise (verdi.årsvekst). Gir
+    ltv_<år> (%) og egenkapital_<år> (kr) for hvert år i `horisonter_år`, og
+    mnd_ltv_<terskel> med første måned LTV er under terskelen (<NA> om aldri
+    innen lånets løpetid eller lengste horisont). Med `med_måneder=True` returneres
+    også egenkapitalbane() med (scenario × måned 0..M)-matrisene.
+    """
+    k, indeks = _scenario_arrays(scenarier, EGENKAPITAL_KOLONNER)
+    horisonter_år = tuple(int(år) for år in horisonter_år)
+    M = max(int((12 * k["løpetid"]).max(initial=0)), 12 * max(horisonter_år, default=0))
+    restgjeld = restgjeld_matrise(k["lån"], k["rente"], k["løpetid"], k["avdragsfri"], k["lånetype"], måneder=M)
+    verdi = verdibane(k["startverdi"], M, verdistigning)
+    bane = egenkapitalbane(verdi, restgjeld, terskler)
+    bane["verdi"], bane["restgjeld"] = verdi, restgjeld
+
+    ut = {}
+    for år in horisonter_år:
+        ut[f"ltv_{år}"] = bane["ltv"][:, 12 * år] * 100
+        ut[f"egenkapital_{år}"] = bane["egenkapital"][:, 12 * år]
+    for i, t in enumerate(np.atleast_1d(terskler)):
+        mnd = bane["mnd_under"][:, i]
+        ut[terskelnavn(t)] = pd.array(np.where(np.isnan(mnd), None, mnd), dtype="Int64")
+    resultat = pd.DataFrame(ut, index=indeks)
+    return (resultat, bane) if med_måneder else resultat
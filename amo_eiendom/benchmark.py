@@ -0,0 +1,358 @@
+"""Benchmarks for kalkulatorens varme stier.
+
+    python -m amo_eiendom.benchmark --ut bench.json
+    python -m amo_eiendom.benchmark --ut ny.json --mot bench.json --terskel 0.25
+
+Resultatene lagres som JSON (median/min pr. tilfelle) slik at to kjøringer
+kan sammenlignes. Med `--mot` avsluttes kjøringen med kode 1 hvis et
+tilfelle er mer enn `terskel` tregere enn i referansen.
+"""
+import argparse
+import base64
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .annonser import kpi_chunks, rangér
+from .batch import beregn_avkastning_batch, beregn_egenkapital_batch, beregn_skatt_batch
+from .kalkulator import beregn, beregn_kpi
+from .kpi import break_even_month
+from .laan import beregn_lån
+from .laanehendelser import Ekstrainnbetaling, Renteendring, beregn_lån_hendelser
+from .lagring import load_json, save_json
+from .leieliste import Leieliste, månedlig_leie
+from .modeller import Eiendomsinput
+from .rapport import onepager_html, presentasjon_html
+from .skatt import skatteberegning
+from .verdi import verdistigning_liste
+
+LØPETIDER = (5, 10, 20, 30, 40)
+LÅNETYPER = ("Annuitetslån", "Serielån")
+AVDRAGSFRIE = (0, 2)
+PROFILANTALL = (10, 1_000, 10_000)
+ENHETSANTALL = (100, 5_000)
+SKATTESCENARIER = 10_000
+HENDELSESANTALL = (0, 10, 100)
+ANNONSEANTALL = (1_000, 10_000)
+COVER_BYTES = 4_000  # omtrent en liten miniatyr inline som base64
+
+STANDARD_TERSKEL = 0.25
+MIN_TID_S = 0.2
+MAKS_GJENTAK = 1_000
+
+
+@dataclass
+class Tilfelle:
+    """Ett målepunkt. `lag` bygger testdata og returnerer funksjonen som skal måles."""
+
+    navn: str
+    gruppe: str
+    lag: Callable[[], Callable[[], object]]
+
+
+def _inp(løpetid: int = 30, lånetype: str = "Annuitetslån", avdragsfri: int = 0, cover: bool = False) -> Eiendomsinput:
+    return Eiendomsinput(
+        prosjekt_navn="Benchmark",
+        finn_url="https://www.finn.no/realestate/homes/ad.html?finnkode=1",
+        note="Linje 1\\nLinje 2",
+        cover_b64=_cover_b64() if cover else "",
+        kjøpesum=4_000_000,
+        use_rooms_total=True,
+        rooms_leie={"rom_1": 6_500, "rom_2": 6_000, "rom_3": 5_500, "rom_4": 5_000},
+        antall_rom=4,
+        egenkapital=600_000,
+        rente=5.0,
+        løpetid=løpetid,
+        avdragsfri=avdragsfri,
+        lånetype=lånetype,
+    )
+
+
+def _cover_b64() -> str:
+    return base64.b64encode(np.random.default_rng(0).bytes(COVER_BYTES)).decode("ascii")
+
+
+def _profiler(antall: int, cover: bool) -> dict[str, dict]:
+    mal = _inp(cover=cover).til_profil()
+    rng = np.random.default_rng(antall)
+    profiler = {}
+    for i, kjøpesum in enumerate(rng.integers(1_500_000, 9_000_000, antall)):
+        p = dict(mal, prosjekt_navn=f"Eiendom {i}", kjøpesum=int(kjøpesum))
+        profiler[p["prosjekt_navn"]] = p
+    return profiler
+
+
+def _leieliste(antall: int) -> Leieliste:
+    rng = np.random.default_rng(antall)
+    start = np.datetime64("2024-01", "M") + rng.integers(0, 48, antall)
+    slutt = np.where(rng.random(antall) < 0.2, np.datetime64("NaT", "M"), start + rng.integers(12, 96, antall))
+    return Leieliste(
+        enhet=np.char.add("L", np.arange(antall).astype(str)),
+        type_kode=rng.integers(0, 3, antall).astype(np.int16),
+        typer=("1-rom", "2-rom", "3-rom"),
+        leie=rng.integers(8_000, 20_000, antall).astype(float),
+        start=start,
+        slutt=slutt,
+        ledighet=np.full(antall, 0.05),
+    )
+
+
+def _hendelser(antall: int, løpetid: int) -> list:
+    """Annenhver renteendring og ekstra innbetaling, jevnt fordelt over løpetiden."""
+    måneder = np.linspace(2, løpetid * 12 - 1, antall).astype(int)
+    return [
+        Renteendring(int(m), 4.0 + (i % 7) * 0.5) if i % 2 == 0 else Ekstrainnbetaling(int(m), 25_000)
+        for i, m in enumerate(måneder)
+    ]
+
+
+def _annonser(antall: int) -> list[dict]:
+    rng = np.random.default_rng(antall)
+    return [
+        {"finnkode": i, "tittel": f"Annonse {i}", "prisantydning": int(pris), "leieestimat": int(leie),
+         "felleskostnader": int(felles)}
+        for i, (pris, leie, felles) in enumerate(zip(rng.integers(1_500_000, 9_000_000, antall),
+                                                      rng.integers(8_000, 30_000, antall),
+                                                      rng.integers(0, 6_000, antall)))
+    ]
+
+
+def _lån_navn(løpetid: int, lånetype: str, avdragsfri: int) -> str:
+    return f"{løpetid}år-{'annuitet' if lånetype == 'Annuitetslån' else 'serie'}-avdragsfri{avdragsfri}"
+
+
+def _profil_tilfeller(mappe: Path, antall: int, cover: bool) -> Iterator[Tilfelle]:
+    sti = mappe / f"profiler_{antall}_{'med' if cover else 'uten'}_cover.json"
+    etikett = f"{antall}-{'med' if cover else 'uten'}_cover"
+
+    def lag_save():
+        data = _profiler(antall, cover)
+        return lambda: save_json(sti, data)
+
+    def lag_load():
+        if not sti.exists():
+            save_json(sti, _profiler(antall, cover))
+        return lambda: load_json(sti)
+
+    yield Tilfelle(f"save_json[{etikett}]", "lagring", lag_save)
+    yield Tilfelle(f"load_json[{etikett}]", "lagring", lag_load)
+
+
+def _rapport_tilfeller(løpetid: int) -> Iterator[Tilfelle]:
+    def lag(cover: bool, rapport: Callable):
+        def _lag():
+            inp = _inp(løpetid=løpetid, cover=cover)
+            res = beregn(inp)
+            return lambda: rapport(inp, res)
+        return _lag
+
+    for cover in (False, True):
+        etikett = f"{løpetid}år-{'med' if cover else 'uten'}_cover"
+        yield Tilfelle(f"lag_presentasjon_html[{etikett}]", "rapport", lag(cover, presentasjon_html))
+        yield Tilfelle(f"lag_onepager_html[{etikett}]", "rapport", lag(cover, onepager_html))
+    yield Tilfelle(f"lag_presentasjon_html[{løpetid}år-full_tidsserie]", "rapport",
+                   lag(False, lambda inp, res: presentasjon_html(inp, res, full_tidsserie=True)))
+
+
+def tilfeller(mappe: Path, rask: bool = False) -> Iterator[Tilfelle]:
+    """Alle benchmarktilfeller. Profilbasene skrives til `mappe`; `rask` hopper over den største."""
+    for løpetid in LØPETIDER:
+        for lånetype in LÅNETYPER:
+            for avdragsfri in AVDRAGSFRIE:
+                args = (4_200_000, 5.0, løpetid, avdragsfri, lånetype, 20_000, 2_500, "Privat")
+                yield Tilfelle(f"beregn_lån[{_lån_navn(løpetid, lånetype, avdragsfri)}]", "beregn_lån",
+                               lambda a=args: lambda: beregn_lån(*a))
+
+    for løpetid in (5, 20, 40):
+        for lånetype in LÅNETYPER:
+            yield Tilfelle(f"beregn_kpi[{_lån_navn(løpetid, lånetype, 0)}]", "kpi_lukket",
+                           lambda inp=_inp(løpetid, lånetype): lambda: beregn_kpi(inp))
+
+    def lag_break_even(løpetid: int):
+        df, _ = beregn_lån(4_200_000, 7.5, løpetid, 0, "Annuitetslån", 20_000, 2_500, "Privat")
+        return lambda: break_even_month(df)
+
+    for løpetid in (5, 20, 40):
+        yield Tilfelle(f"break_even_month[{løpetid}år]", "break_even", lambda n=løpetid: lag_break_even(n))
+        yield Tilfelle(f"verdistigning_liste[{løpetid}år]", "verdistigning",
+                       lambda n=løpetid: lambda: verdistigning_liste(4_500_000, n))
+
+    def lag_skatt(løpetid: int, eierform: str):
+        df, _ = beregn_lån(4_200_000, 5.0, løpetid, 0, "Annuitetslån", 20_000, 2_500, eierform)
+        return lambda: skatteberegning(df, 20_000, 2_500, eierform)
+
+    for løpetid in (5, 30):
+        for eierform in ("Privat", "AS"):
+            yield Tilfelle(f"skatteberegning[{løpetid}år-{eierform}]", "skatt",
+                           lambda n=løpetid, e=eierform: lag_skatt(n, e))
+
+    def batchscenarier() -> pd.DataFrame:
+        rng = np.random.default_rng(0)
+        return pd.DataFrame({
+            "lån": rng.uniform(1e6, 8e6, SKATTESCENARIER),
+            "rente": rng.uniform(2, 8, SKATTESCENARIER),
+            "løpetid": rng.integers(5, 31, SKATTESCENARIER),
+            "avdragsfri": 0,
+            "lånetype": rng.choice(LÅNETYPER, SKATTESCENARIER),
+            "leie": rng.uniform(8_000, 40_000, SKATTESCENARIER),
+            "drift_mnd": 2_500,
+            "eierform": rng.choice(["Privat", "AS"], SKATTESCENARIER),
+            "egenkapital": rng.uniform(3e5, 3e6, SKATTESCENARIER),
+            "startverdi": rng.uniform(2e6, 9e6, SKATTESCENARIER),
+        })
+
+    yield Tilfelle(f"beregn_skatt_batch[{SKATTESCENARIER}_scenarier]", "skatt",
+                   lambda: lambda s=batchscenarier(): beregn_skatt_batch(s))
+    for exit_år in ((10,), (5, 10, 20)):
+        yield Tilfelle(f"beregn_avkastning_batch[{SKATTESCENARIER}_scenarier-exit_{'_'.join(map(str, exit_år))}]",
+                       "internrente", lambda e=exit_år: lambda s=batchscenarier(): beregn_avkastning_batch(s, e))
+    yield Tilfelle(f"beregn_egenkapital_batch[{SKATTESCENARIER}_scenarier]", "egenkapital",
+                   lambda: lambda s=batchscenarier(): beregn_egenkapital_batch(s))
+
+    for antall in ENHETSANTALL:
+        yield Tilfelle(f"månedlig_leie[{antall}_enheter-30år]", "leieliste",
+                       lambda n=antall: lambda liste=_leieliste(n): månedlig_leie(liste, "2026-01", 360))
+
+    for antall in HENDELSESANTALL:
+        for løpetid in (10, 40):
+            args = (4_200_000, 5.0, løpetid, 0, "Annuitetslån", 20_000, 2_500, "Privat")
+            yield Tilfelle(f"beregn_lån_hendelser[{antall}_hendelser-{løpetid}år]", "laanehendelser",
+                           lambda a=args, n=antall: lambda h=_hendelser(n, a[2]): beregn_lån_hendelser(*a, h))
+            yield Tilfelle(f"beregn_lån_hendelser[{antall}_hendelser-{løpetid}år-tabell]", "laanehendelser",
+                           lambda a=args, n=antall: lambda h=_hendelser(n, a[2]): beregn_lån_hendelser(*a, h).tabell())
+
+    for antall in ANNONSEANTALL:
+        if rask and antall > 1_000:
+            continue
+        yield Tilfelle(f"rangér[{antall}_annonser]", "annonser",
+                       lambda n=antall: lambda annonser=_annonser(n): rangér(kpi_chunks(annonser), "netto_yield", 100))
+
+    for løpetid in (5, 30, 40):
+        yield from _rapport_tilfeller(løpetid)
+
+    for antall in PROFILANTALL:
+        if rask and antall > 1_000:
+            continue
+        for cover in (False, True):
+            yield from _profil_tilfeller(mappe, antall, cover)
+
+
+def mål(funksjon: Callable[[], object], min_tid_s: float = MIN_TID_S, maks_gjentak: int = MAKS_GJENTAK) -> dict:
+    """Kjører `funksjon` til minst `min_tid_s` er brukt (minst 3 ganger); tider i sekunder."""
+    funksjon()  # oppvarming
+    tider: list[float] = []
+    gc_var_på = gc.isenabled()
+    gc.disable()
+    try:
+        totalt = 0.0
+        while len(tider) < 3 or (totalt < min_tid_s and len(tider) < maks_gjentak):
+            t0 = time.perf_counter()
+            funksjon()
+            dt = time.perf_counter() - t0
+            tider.append(dt)
+            totalt += dt
+    finally:
+        if gc_var_på:
+            gc.enable()
+    return {
+        "median_s": statistics.median(tider),
+        "min_s": min(tider),
+        "gjentak": len(tider),
+    }
+
+
+def kjør(filter_: str | None = None, rask: bool = False, min_tid_s: float = MIN_TID_S) -> dict:
+    """Kjører alle (filtrerte) tilfeller og returnerer resultat-dokumentet."""
+    resultater = {}
+    with tempfile.TemporaryDirectory(prefix="amo_bench_") as mappe:
+        for t in tilfeller(Path(mappe), rask):
+            if filter_ and filter_ not in t.navn:
+                continue
+            resultater[t.navn] = {"gruppe": t.gruppe, **mål(t.lag(), min_tid_s)}
+    return {
+        "meta": {
+            "tidspunkt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "plattform": platform.platform(),
+            "cpu": os.cpu_count(),
+        },
+        "resultater": resultater,
+    }
+
+
+def sammenlign(referanse: dict, ny: dict, terskel: float = STANDARD_TERSKEL) -> list[dict]:
+    """Tilfeller i begge kjøringene, med forhold ny/referanse (median); `regresjon` over terskel."""
+    rader = []
+    for navn, r in ny["resultater"].items():
+        ref = referanse.get("resultater", {}).get(navn)
+        if ref is None or not ref["median_s"]:
+            continue
+        forhold = r["median_s"] / ref["median_s"]
+        rader.append({
+            "navn": navn,
+            "referanse_s": ref["median_s"],
+            "ny_s": r["median_s"],
+            "forhold": forhold,
+            "regresjon": forhold > 1.0 + terskel,
+        })
+    return rader
+
+
+def _tid(s: float) -> str:
+    if s < 1e-3:
+        return f"{s * 1e6:8.1f} µs"
+    if s < 1.0:
+        return f"{s * 1e3:8.2f} ms"
+    return f"{s:8.3f} s "
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="amo_eiendom.benchmark", description="Benchmark av varme stier.")
+    parser.add_argument("--ut", type=Path, default=None, help="skriv resultatene til denne JSON-filen")
+    parser.add_argument("--mot", type=Path, default=None, help="sammenlign mot en tidligere resultatfil")
+    parser.add_argument("--terskel", type=float, default=STANDARD_TERSKEL,
+                        help="tillatt relativ forverring før kjøringen feiler (standard: 0.25 = 25 %%)")
+    parser.add_argument("--filter", default=None, help="kjør bare tilfeller der navnet inneholder denne teksten")
+    parser.add_argument("--rask", action="store_true", help="hopp over profilbasen med 10 000 profiler")
+    parser.add_argument("--min-tid", type=float, default=MIN_TID_S, help="minste måletid pr. tilfelle i sekunder")
+    args = parser.parse_args(argv)
+
+    if args.mot is not None and not args.mot.exists():
+        print(f"Finner ikke {args.mot}", file=sys.stderr)
+        return 2
+
+    resultat = kjør(args.filter, args.rask, args.min_tid)
+    if args.ut is not None:
+        args.ut.write_text(json.dumps(resultat, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if args.mot is None:
+        for navn, r in resultat["resultater"].items():
+            print(f"{navn:<55} {_tid(r['median_s'])}  (min {_tid(r['min_s']).strip()}, n={r['gjentak']})")
+        return 0
+
+    rader = sammenlign(json.loads(args.mot.read_text(encoding="utf-8")), resultat, args.terskel)
+    for r in rader:
+        merke = "  REGRESJON" if r["regresjon"] else ""
+        print(f"{r['navn']:<55} {_tid(r['referanse_s'])} → {_tid(r['ny_s'])}  x{r['forhold']:.2f}{merke}")
+    regresjoner = [r for r in rader if r["regresjon"]]
+    if regresjoner:
+        print(f"{len(regresjoner)} tilfelle(r) tregere enn terskelen på {args.terskel:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Innholdsadressert lager for forsidebilder.
+
+Bildet lagres én gang på disk under SHA-256 av de lagrede (ev. nedskalerte)
+bytene; profiler og autosave holder bare hashen. En peker fra hashen av de
+opplastede bytene gjør at samme fil ikke normaliseres på nytt. Base64 lages
+først når en rapport bygges.
+"""
+import base64
+import hashlib
+import os
+from io import BytesIO
+from pathlib import Path
+
+from PIL import ExifTags, Image, ImageOps
+
+# Lengste side etter nedskalering ved opplasting
+MAKS_SIDE = 1600
+MINIATYR_SIDE = 320
+
+_MIME = {".jpg": "image/jpeg", ".png": "image/png"}
+
+
+def _skriv_atomisk(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _normaliser(data: bytes, maks_side: int) -> tuple[bytes, str]:
+    """Nedskalerer til maks_side og returnerer (bytes, filendelse)."""
+    with Image.open(BytesIO(data)) as img:
+        # exif_transpose gir en kopi uten format; roterte bilder må kodes på nytt
+        format_ = img.format
+        rotert = img.getexif().get(ExifTags.Base.Orientation, 1) != 1
+        img = ImageOps.exif_transpose(img)
+        har_alfa = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        if max(img.size) <= maks_side and format_ in ("JPEG", "PNG") and not rotert:
+            return data, ".png" if format_ == "PNG" else ".jpg"
+        img.thumbnail((maks_side, maks_side))
+        ut = BytesIO()
+        if har_alfa:
+            img.save(ut, format="PNG", optimize=True)
+            return ut.getvalue(), ".png"
+        img.convert("RGB").save(ut, format="JPEG", quality=85, optimize=True)
+        return ut.getvalue(), ".jpg"
+
+
+class Bildelager:
+    def __init__(self, rot: Path = Path("bilder"), maks_side: int = MAKS_SIDE):
+        self.rot = Path(rot)
+        self.maks_side = maks_side
+
+    def _finn(self, hash_: str) -> Path | None:
+        for ext in _MIME:
+            path = self.rot / hash_[:2] / f"{hash_}{ext}"
+            if path.exists():
+                return path
+        return None
+
+    def __contains__(self, hash_: str) -> bool:
+        return bool(hash_) and self._finn(hash_) is not None
+
+    def _peker(self, opplastet: str) -> Path:
+        return self.rot / "opplastet" / opplastet[:2] / opplastet
+
+    def lagre(self, data: bytes) -> str:
+        """Lagrer et opplastet bilde (nedskalert) og returnerer hashen av det lagrede bildet.
+
+        Duplikater lagres ikke på nytt, verken samme opplasting eller samme resultat
+        etter nedskalering.
+        """
+        peker = self._peker(hashlib.sha256(data).hexdigest())
+        if peker.exists():
+            hash_ = peker.read_text().strip()
+            if hash_ in self:
+                return hash_
+        innhold, ext = _normaliser(data, self.maks_side)
+        hash_ = hashlib.sha256(innhold).hexdigest()
+        if hash_ not in self:
+            _skriv_atomisk(self.rot / hash_[:2] / f"{hash_}{ext}", innhold)
+        _skriv_atomisk(peker, hash_.encode())
+        return hash_
+
+    def hent(self, hash_: str) -> bytes | None:
+        path = self._finn(hash_) if hash_ else None
+        return path.read_bytes() if path else None
+
+    def mime(self, hash_: str) -> str:
+        path = self._finn(hash_)
+        return _MIME[path.suffix] if path else "image/png"
+
+    def base64(self, hash_: str) -> str:
+        data = self.hent(hash_)
+        return base64.b64encode(data).decode("utf-8") if data else ""
+
+    def miniatyr(self, hash_: str, side: int = MINIATYR_SIDE) -> bytes | None:
+        """Liten JPEG-forhåndsvisning, generert første gang og deretter lest fra disk."""
+        path = self.rot / "miniatyr" / f"{hash_}_{side}.jpg"
+        if path.exists():
+            return path.read_bytes()
+        data = self.hent(hash_)
+        if data is None:
+            return None
+        with Image.open(BytesIO(data)) as img:
+            img.thumbnail((side, side))
+            ut = BytesIO()
+            img.convert("RGB").save(ut, format="JPEG", quality=80)
+        _skriv_atomisk(path, ut.getvalue())
+        return ut.getvalue()
+
+
+def flytt_cover_til_lager(profil: dict, lager: Bildelager) -> dict:
+    """Gammelt format: base64 i 'cover_b64' → bildet i lageret og bare 'cover_hash' i profilen."""
+    b64 = profil.get("cover_b64")
+    if not b64:
+        profil.pop("cover_b64", None)
+        return profil
+    try:
+        profil["cover_hash"] = lager.lagre(base64.b64decode(b64))
+    except (ValueError, OSError):
+        # Ødelagt bilde: behold ikke base64-blobben, men la profilen være ellers urørt
+        profil["cover_hash"] = profil.get("cover_hash", "")
+    profil.pop("cover_b64", None)
+    return profil
@@ -0,0 +1,157 @@
+"""Kommandolinje: beregn og lag rapporter for alle lagrede profiler uten Streamlit.
+
+    python -m amo_eiendom profiles.json --ut rapporter --arbeidere 4
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from .bilder import Bildelager
+from .eksport import KOLONNER, eksporter
+from .kalkulator import beregn, beregn_kpi
+from .lagring import load_json
+from .modeller import Eiendomsinput
+from .profilbase import ProfilDatabase
+from .rapport import onepager_html, presentasjon_html
+
+
+def les_profiler(kilde: Path) -> dict[str, dict]:
+    """Leser en profildatabase (.sqlite3/.db), profiles.json, eller alle *.json i en mappe.
+
+    En fil kan inneholde én profil (navn = filnavnet) eller en mapping navn → profil
+    som i profiles.json.
+    """
+    if kilde.suffix in (".sqlite3", ".db"):
+        return dict(ProfilDatabase(kilde).alle())
+    filer = sorted(kilde.glob("*.json")) if kilde.is_dir() else [kilde]
+    profiler = {}
+    for fil in filer:
+        data = load_json(fil)
+        if data and all(isinstance(v, dict) for v in data.values()):
+            profiler.update(data)
+        elif data:
+            profiler[fil.stem] = data
+    return profiler
+
+
+def _filnavn(navn: str, brukt: set[str]) -> str:
+    base = re.sub(r"[^\w\-]+", "_", navn).strip("_") or "profil"
+    kandidat, i = base, 2
+    while kandidat.lower() in brukt:
+        kandidat, i = f"{base}_{i}", i + 1
+    brukt.add(kandidat.lower())
+    return kandidat
+
+
+def behandle_profil(navn: str, profil: dict, ut: Path | None, filnavn: str, bilder: Path | None = None) -> dict:
+    """Beregner én profil og skriver rapportene; returnerer en KPI-rad."""
+    inp = Eiendomsinput.fra_profil(profil, navn)
+    if ut is None:
+        # Uten rapporter trengs bare KPI-ene: lukket form, ingen månedstabell
+        kpi = beregn_kpi(inp)
+    else:
+        res = beregn(inp)
+        lager = Bildelager(bilder) if bilder is not None else None
+        (ut / f"{filnavn}_presentasjon.html").write_bytes(presentasjon_html(inp, res, lager))
+        (ut / f"{filnavn}_onepager.html").write_bytes(onepager_html(inp, res))
+        kpi = {k: getattr(res, k) for k in (
+            "total_investering", "lånebeløp", "leie", "brutto_yield", "netto_yield", "kpis_1", "breakeven_mnd", "akk")}
+    return {
+        "profil": navn,
+        "kjøpesum": inp.kjøpesum,
+        "total_investering": kpi["total_investering"],
+        "lån": kpi["lånebeløp"],
+        "leie": kpi["leie"],
+        "brutto_yield": kpi["brutto_yield"],
+        "netto_yield": kpi["netto_yield"],
+        "termin_1": kpi["kpis_1"]["termin"],
+        "netto_1": kpi["kpis_1"]["netto"],
+        "break_even_mnd": kpi["breakeven_mnd"],
+        "akk_slutt": kpi["akk"],
+    }
+
+
+def _trygg(args: tuple) -> tuple[dict | None, str | None]:
+    navn = args[0]
+    try:
+        return behandle_profil(*args), None
+    except Exception as e:  # én ødelagt profil skal ikke stoppe hele kjøringen
+        return None, f"{navn}: {e}"
+
+
+def kjør(kilde: Path, ut: Path | None, arbeidere: int = 1, bilder: Path | None = None) -> tuple[pd.DataFrame, list[str]]:
+    """Behandler alle profiler i `kilde`; returnerer (KPI-tabell, feilmeldinger)."""
+    profiler = les_profiler(kilde)
+    if ut is not None:
+        ut.mkdir(parents=True, exist_ok=True)
+    brukt: set[str] = set()
+    jobber = [(navn, p, ut, _filnavn(navn, brukt), bilder) for navn, p in profiler.items()]
+
+    if arbeidere <= 1 or len(jobber) <= 1:
+        resultater = [_trygg(j) for j in jobber]
+    else:
+        chunksize = max(1, len(jobber) // (arbeidere * 4))
+        with ProcessPoolExecutor(max_workers=arbeidere) as pool:
+            resultater = list(pool.map(_trygg, jobber, chunksize=chunksize))
+
+    rader = [r for r, _ in resultater if r is not None]
+    feil = [f for _, f in resultater if f is not None]
+    kpi = pd.DataFrame(rader)
+    if not kpi.empty:
+        kpi["break_even_mnd"] = kpi["break_even_mnd"].astype("Int64")
+    return kpi, feil
+
+
+def tidsserie_for_profiler(profiler: dict[str, dict]):
+    """Full månedstabell for hver profil, én profil om gangen (for strømmende eksport)."""
+    for navn, profil in profiler.items():
+        try:
+            df = beregn(Eiendomsinput.fra_profil(profil, navn)).df
+        except (TypeError, ValueError):
+            continue
+        yield df.assign(profil=navn)[["profil", *KOLONNER]]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="amo_eiendom", description="Beregn og lag rapporter for lagrede profiler.")
+    parser.add_argument("profiler", type=Path, nargs="?", default=Path("profiles.json"),
+                        help="profildatabase, profiles.json eller en mappe med profilfiler (standard: profiles.json)")
+    parser.add_argument("--ut", type=Path, default=Path("rapporter"), help="mappe for HTML-rapporter og kpi.csv")
+    parser.add_argument("--bilder", type=Path, default=Path("bilder"), help="bildelager for forsidebilder")
+    parser.add_argument("--arbeidere", type=int, default=os.cpu_count() or 1, help="antall prosesser")
+    parser.add_argument("--tidsserie", type=Path, default=None,
+                        help="skriv full tidsserie for alle profiler til .csv/.parquet/.arrow")
+    parser.add_argument("--uten-rapporter", action="store_true", help="bare beregn KPI-er, ikke skriv HTML")
+    args = parser.parse_args(argv)
+
+    if not args.profiler.exists():
+        print(f"Finner ikke {args.profiler}", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    kpi, feil = kjør(args.profiler, None if args.uten_rapporter else args.ut, max(1, args.arbeidere), args.bilder)
+    tid = time.perf_counter() - start
+
+    args.ut.mkdir(parents=True, exist_ok=True)
+    kpi.to_csv(args.ut / "kpi.csv", index=False)
+    if args.tidsserie is not None:
+        eksporter(tidsserie_for_profiler(les_profiler(args.profiler)), args.tidsserie)
+    for f in feil:
+        print(f"Feil: {f}", file=sys.stderr)
+    antall = len(kpi)
+    print(json.dumps({
+        "profiler": antall,
+        "feilet": len(feil),
+        "arbeidere": max(1, args.arbeidere),
+        "sekunder": round(tid, 3),
+        "profiler_pr_sekund": round(antall / tid, 1) if tid > 0 else None,
+        "ut": str(args.ut),
+    }, ensure_ascii=False))
+    return 1 if feil else 0
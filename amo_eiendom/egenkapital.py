@@ -0,0 +1,93 @@
+"""Egenkapitaloppbygging: eiendomsverdi minus restgjeld, og belåningsgrad (LTV) over tid.
+
+Verdien følger verdi.verdibane (fast sats eller én sats pr. år) og restgjelden
+lånemotoren. Begge er (scenario × måned 0..M)-matriser, der måned 0 er kjøpet
+(startverdi og lånebeløp), så egenkapital, LTV og første måned LTV er under hver
+terskel regnes for alle scenarier samtidig.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .modeller import Beregning
+from .verdi import VERDISTIGNING_SATS, verdibane
+
+# Belåningsgrader det er vanlig å følge med på: 85 % er maks for nye boliglån,
+# 60 % for sekundærbolig i Oslo (utlånsforskriften)
+LTV_TERSKLER = (0.85, 0.75, 0.60, 0.50)
+
+
+def terskelnavn(terskel: float) -> str:
+    """Kolonnenavn for en terskel, f.eks. 0.6 → 'mnd_ltv_60'."""
+    return f"mnd_ltv_{round(terskel * 100):g}"
+
+
+def egenkapitalbane(verdi, restgjeld, terskler=LTV_TERSKLER) -> dict[str, np.ndarray]:
+    """Egenkapital og LTV pr. måned, og første måned LTV er under hver terskel.
+
+    `verdi` og `restgjeld` er (scenario × måned 0..M)-matriser; NaN i restgjelden
+    (etter lånets slutt) regnes som 0. Returnerer egenkapital og ltv med samme
+    form, og mnd_under som (scenario × terskel) med NaN der LTV aldri kommer under.
+    """
+    verdi = np.atleast_2d(np.asarray(verdi, dtype=float))
+    restgjeld = np.nan_to_num(np.atleast_2d(np.asarray(restgjeld, dtype=float)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ltv = np.where(verdi > 0, restgjeld / verdi, np.where(restgjeld > 0, np.inf, 0.0))
+    terskler = np.atleast_1d(np.asarray(terskler, dtype=float))
+    mnd_under = np.full((len(ltv), len(terskler)), np.nan)
+    rader = np.arange(len(ltv))
+    for i, t in enumerate(terskler):
+        under = ltv < t
+        første = under.argmax(axis=1)  # 0 også når LTV aldri er under; sjekkes under
+        funnet = under[rader, første]
+        mnd_under[funnet, i] = første[funnet]
+    return {"egenkapital": verdi - restgjeld, "ltv": ltv, "mnd_under": mnd_under}
+
+
+@dataclass
+class Egenkapitalforløp:
+    """Egenkapital og LTV for én eiendom, fra egenkapitalforløp()."""
+    tabell: pd.DataFrame                 # pr. måned 0..M: Måned, År, Verdi, Restgjeld, Egenkapital, LTV (%)
+    terskler: dict[float, int | None]    # terskel → første måned LTV er under, None om aldri
+
+    def pr_år(self) -> pd.DataFrame:
+        """Én rad pr. årsskifte (måned 0, 12, 24, ...)."""
+        return self.tabell[self.tabell["Måned"] % 12 == 0].reset_index(drop=True)
+
+    def terskeltabell(self) -> pd.DataFrame:
+        rader = [
+            {"LTV under (%)": t * 100, "Måned": m, "År": None if m is None else round(m / 12, 1)}
+            for t, m in self.terskler.items()
+        ]
+        return pd.DataFrame(rader, columns=["LTV under (%)", "Måned", "År"]).astype({"Måned": "Int64"})
+
+
+def egenkapitalforløp(res: Beregning, startverdi: float, vekst=VERDISTIGNING_SATS,
+                      terskler=LTV_TERSKLER, måneder: int | None = None) -> Egenkapitalforløp:
+    """Egenkapital og LTV for én beregning.
+
+    Restgjelden er månedstabellens (også med lånehendelser); måned 0 er lånebeløpet.
+    Med `måneder` utover lånets slutt fortsetter verdien å vokse uten gjeld.
+    """
+    gjeld = res.df["Restgjeld"].to_numpy(dtype=float)
+    M = len(gjeld) if måneder is None else int(måneder)
+    restgjeld = np.zeros(M + 1)
+    restgjeld[0] = float(res.lånebeløp)
+    restgjeld[1:min(M, len(gjeld)) + 1] = gjeld[:M]
+    verdi = verdibane(startverdi, M, vekst)[0]
+    bane = egenkapitalbane(verdi, restgjeld, terskler)
+    m = np.arange(M + 1)
+    tabell = pd.DataFrame({
+        "Måned": m,
+        "År": m / 12,
+        "Verdi": verdi,
+        "Restgjeld": restgjeld,
+        "Egenkapital": bane["egenkapital"][0],
+        "LTV (%)": bane["ltv"][0] * 100,
+    })
+    mnd = bane["mnd_under"][0]
+    return Egenkapitalforløp(
+        tabell=tabell,
+        terskler={float(t): None if np.isnan(x) else int(x) for t, x in zip(np.atleast_1d(terskler), mnd)},
+    )
@@ -0,0 +1,111 @@
+"""Eksport av full tidsserie og batchresultater til CSV, Parquet og Arrow IPC.
+
+Alt skrives chunk for chunk fra generatorer, så scenario × måned-eksporter aldri
+bygger én stor DataFrame i minnet. Parquet/Arrow krever pyarrow.
+"""
+from collections.abc import Iterable, Iterator
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .batch import BatchResultat, beregn_batch
+
+KOLONNER = ["Måned", "Restgjeld", "Avdrag", "Renter", "Netto cashflow", "Akk. cashflow"]
+
+FORMATER = {".csv": "csv", ".parquet": "parquet", ".arrow": "arrow", ".ipc": "arrow", ".feather": "arrow"}
+MIME = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet", "arrow": "application/vnd.apache.arrow.file"}
+FILENDELSE = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+
+
+def tidsserie_chunks(df: pd.DataFrame, chunk_rader: int = 10_000) -> Iterator[pd.DataFrame]:
+    """Hele månedstabellen fra beregn_lån, i biter."""
+    for start in range(0, len(df), chunk_rader):
+        yield df.iloc[start:start + chunk_rader]
+
+
+def batch_chunks(res: BatchResultat, scenario_id=None, chunk_scenarier: int = 256) -> Iterator[pd.DataFrame]:
+    """Batchresultat i langt format (én rad pr. scenario og måned), uten NaN-utfylling."""
+    ider = np.asarray(res.kpi.index if scenario_id is None else scenario_id)
+    for s0 in range(0, len(res), chunk_scenarier):
+        s1 = min(s0 + chunk_scenarier, len(res))
+        rad, kol = np.nonzero(~np.isnan(res.restgjeld[s0:s1]))
+        rad_abs = rad + s0
+        yield pd.DataFrame({
+            "scenario": ider[rad_abs],
+            "Måned": kol + 1,
+            "Restgjeld": res.restgjeld[rad_abs, kol],
+            "Avdrag": res.avdrag[rad_abs, kol],
+            "Renter": res.renter[rad_abs, kol],
+            "Netto cashflow": res.netto[rad_abs, kol],
+            "Akk. cashflow": res.akk[rad_abs, kol],
+        })
+
+
+def scenario_chunks(scenarier: pd.DataFrame, chunk_scenarier: int = 1_000) -> Iterator[pd.DataFrame]:
+    """Beregner og strømmer scenarier bit for bit, så bare én bit er i minnet om gangen."""
+    for start in range(0, len(scenarier), chunk_scenarier):
+        bit = scenarier.iloc[start:start + chunk_scenarier]
+        yield from batch_chunks(beregn_batch(bit), bit.index)
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet/Arrow-eksport krever pyarrow (pip install pyarrow)") from e
+    return pa, pq
+
+
+def skriv(chunks: Iterable[pd.DataFrame], mål, format: str) -> int:
+    """Skriver chunkene til `mål` (filsti eller binær fil). Returnerer antall rader."""
+    if format not in MIME:
+        raise ValueError(f"Ukjent eksportformat: {format!r}")
+    chunks = iter(chunks)
+    første = next(chunks, None)
+    if første is None:
+        første = pd.DataFrame({k: pd.Series(dtype="int64" if k == "Måned" else "float64") for k in KOLONNER})
+    rader = 0
+
+    if format == "csv":
+        eier = isinstance(mål, (str, Path))
+        f = open(mål, "wb") if eier else mål
+        try:
+            f.write(første.to_csv(index=False).encode("utf-8"))
+            rader += len(første)
+            for chunk in chunks:
+                f.write(chunk.to_csv(index=False, header=False).encode("utf-8"))
+                rader += len(chunk)
+        finally:
+            if eier:
+                f.close()
+        return rader
+
+    pa, pq = _pyarrow()
+    tabell = pa.Table.from_pandas(første, preserve_index=False)
+    skriver = pq.ParquetWriter(mål, tabell.schema) if format == "parquet" else pa.ipc.new_file(mål, tabell.schema)
+    with skriver:
+        skriver.write_table(tabell)
+        rader += len(første)
+        for chunk in chunks:
+            skriver.write_table(pa.Table.from_pandas(chunk, schema=tabell.schema, preserve_index=False))
+            rader += len(chunk)
+    return rader
+
+
+def eksporter(chunks: Iterable[pd.DataFrame], path: Path, format: str | None = None) -> int:
+    """Skriver til fil; formatet utledes fra filendelsen hvis det ikke er gitt."""
+    path = Path(path)
+    format = format or FORMATER.get(path.suffix.lower())
+    if format is None:
+        raise ValueError(f"Kan ikke utlede eksportformat fra {path.name}")
+    return skriv(chunks, path, format)
+
+
+def eksport_bytes(chunks: Iterable[pd.DataFrame], format: str) -> bytes:
+    """Som eksporter, men til bytes (for nedlastingsknapper)."""
+    buf = BytesIO()
+    skriv(chunks, buf, format)
+    return buf.getvalue()
@@ -0,0 +1,298 @@
+"""Avhengighetsgraf med memoiserte noder for inkrementell omberegning.
+
+Hver node beregnes på nytt bare når en av oppstrømsverdiene har endret seg.
+Inndata og noder har et versjonsnummer; en node husker versjonene den sist
+ble beregnet med. Gir en ny beregning samme verdi som før, beholdes
+versjonen, så nedstrøms noder slipper å beregnes (tidlig avbrudd).
+
+    graf = kalkulatorgraf()
+    graf.sett_input(inp)          # f.eks. bare `note` endret
+    res = graf.hent("beregning")  # ingen noder beregnes på nytt
+"""
+import copy
+import inspect
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, fields
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .bilder import Bildelager
+from .kpi import break_even_month, first_month_kpis, yields
+from .laan import beregn_lån
+from .laanehendelser import beregn_lån_hendelser
+from .modeller import Beregning, Eiendomsinput
+from .rapport import onepager_html, presentasjon_html
+from .skatt import skatteberegning
+from .verdi import verdistigning_liste
+
+INPUT_FELT = tuple(f.name for f in fields(Eiendomsinput))
+
+
+def _lik(a, b) -> bool:
+    if a is b:
+        return True
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, (pd.DataFrame, pd.Series)):
+        return a.equals(b)
+    if isinstance(a, np.ndarray):
+        return np.array_equal(a, b)
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+
+@dataclass
+class _Node:
+    navn: str
+    avhenger_av: tuple[str, ...]
+    funksjon: Callable
+    verdi: Any = None
+    nøkkel: tuple | None = None  # oppstrømsversjoner ved siste beregning
+    versjon: int = 0
+    sjekket: int = -1            # runde da noden sist ble sjekket
+    treff: int = 0
+    bom: int = 0
+    sist_ms: float = 0.0
+
+
+@dataclass(frozen=True)
+class Øyeblikk:
+    """Inndataene i grafen på et tidspunkt (fra Beregningsgraf.øyeblikk)."""
+    inndata: dict  # navn → (verdi, versjon)
+
+
+class Beregningsgraf:
+    """Inndata + noder, ment for én sesjon om gangen.
+
+    Kallene er serialisert med en lås, men `hent` gir verdien for inndataene grafen
+    har når kallet kjøres. Kode utenfor skripttråden (f.eks. nedlastinger) som skal
+    ha verdien for bestemte inndata, bruker `øyeblikk()` og `hent_for()`.
+    """
+
+    def __init__(self):
+        self._noder: dict[str, _Node] = {}
+        self._inndata: dict[str, list] = {}  # navn → [verdi, versjon]
+        self._runde = 0
+        self._lås = threading.RLock()
+
+    def node(self, navn: str | None = None, avhenger_av: tuple[str, ...] | None = None):
+        """Dekoratør som registrerer en node. Avhengighetene er parameternavnene hvis ikke oppgitt."""
+        def registrer(funksjon):
+            nøkkel = navn or funksjon.__name__
+            avh = avhenger_av or tuple(inspect.signature(funksjon).parameters)
+            self._noder[nøkkel] = _Node(nøkkel, tuple(avh), funksjon)
+            return funksjon
+        return registrer
+
+    def sett(self, ny_runde: bool = True, **verdier):
+        """Setter inndata; bare verdier som faktisk er endret får ny versjon.
+
+        En runde (typisk én rerun) teller høyst ett treff pr. node; `ny_runde=False`
+        legger til inndata i inneværende runde.
+        """
+        with self._lås:
+            if ny_runde:
+                self._runde += 1
+            for navn, verdi in verdier.items():
+                # Kopier dicts/lister: appen muterer dem på plass mellom reruns
+                verdi = copy.deepcopy(verdi) if isinstance(verdi, (dict, list)) else verdi
+                gammel = self._inndata.get(navn)
+                if gammel is None:
+                    self._inndata[navn] = [verdi, 1]
+                elif not _lik(gammel[0], verdi):
+                    gammel[0], gammel[1] = verdi, gammel[1] + 1
+
+    def sett_input(self, inp: Eiendomsinput, **ekstra):
+        """Alle feltene i Eiendomsinput som inndata (pluss eventuelle ekstra)."""
+        self.sett(**{f: getattr(inp, f) for f in INPUT_FELT}, **ekstra)
+
+    def _versjon(self, navn: str) -> int:
+        if navn in self._inndata:
+            return self._inndata[navn][1]
+        return self._oppdater(self._noder[navn]).versjon
+
+    def _oppdater(self, node: _Node) -> _Node:
+        nøkkel = tuple(self._versjon(a) for a in node.avhenger_av)
+        if nøkkel == node.nøkkel:
+            if node.sjekket != self._runde:
+                node.treff += 1
+            node.sjekket = self._runde
+            return node
+        start = time.perf_counter()
+        verdi = node.funksjon(**{a: self.hent(a) for a in node.avhenger_av})
+        node.sist_ms = (time.perf_counter() - start) * 1000
+        node.bom += 1
+        node.sjekket = self._runde
+        if node.nøkkel is None or not _lik(node.verdi, verdi):
+            node.verdi = verdi
+            node.versjon += 1
+        node.nøkkel = nøkkel
+        return node
+
+    def hent(self, navn: str):
+        """Verdien av en node eller et inndatum; beregner oppstrøms ved behov."""
+        with self._lås:
+            if navn in self._inndata:
+                return self._inndata[navn][0]
+            if navn not in self._noder:
+                raise KeyError(f"Ukjent node eller inndata: {navn!r}")
+            return self._oppdater(self._noder[navn]).verdi
+
+    def øyeblikk(self) -> Øyeblikk:
+        """Inndataene slik de er nå (verdiene kopieres ikke; `sett` bytter dem ut i stedet for å mutere)."""
+        with self._lås:
+            return Øyeblikk({navn: (verdi, versjon) for navn, (verdi, versjon) in self._inndata.items()})
+
+    def hent_for(self, øyeblikk: Øyeblikk, navn: str):
+        """Verdien av `navn` for inndataene i `øyeblikk`, også om grafen har fått nye inndata siden.
+
+        Er inndataene uendret, brukes grafens memoiserte noder. Ellers beregnes
+        noden i en egen graf med de samme nodene, uten å røre denne.
+        """
+        with self._lås:
+            if all(self._inndata.get(n, (None, None))[1] == v for n, (_, v) in øyeblikk.inndata.items()):
+                return self.hent(navn)
+            kopi = Beregningsgraf()
+            kopi._noder = {n: _Node(n, node.avhenger_av, node.funksjon) for n, node in self._noder.items()}
+        kopi.sett(**{n: verdi for n, (verdi, _) in øyeblikk.inndata.items()})
+        return kopi.hent(navn)
+
+    def avviker(self, **verdier) -> bool:
+        """Om noen av verdiene avviker fra nodens/inndatumets nåværende verdi (uten å sette noe)."""
+        with self._lås:
+            return any(not _lik(self.hent(navn), verdi) for navn, verdi in verdier.items())
+
+    def statistikk(self) -> pd.DataFrame:
+        """Treff/bom og siste beregningstid pr. node."""
+        with self._lås:
+            return pd.DataFrame([
+                {"node": n.navn, "treff": n.treff, "bom": n.bom, "sist_ms": round(n.sist_ms, 3),
+                 "avhenger_av": ", ".join(n.avhenger_av)}
+                for n in self._noder.values()
+            ])
+
+
+def kalkulatorgraf(bilder: Bildelager | None = None) -> Beregningsgraf:
+    """Beregningskjeden i kalkulator.beregn som graf, pluss rapportene.
+
+    Samme formler som Eiendomsinput og beregn(), så `hent("beregning")` gir
+    identiske tall; forskjellen er at bare berørte noder beregnes på nytt.
+    """
+    g = Beregningsgraf()
+
+    @g.node()
+    def oppussing_total(oppussing):
+        return Eiendomsinput(oppussing=oppussing).oppussing_total
+
+    @g.node()
+    def drift_mnd_total(drift_mnd):
+        return Eiendomsinput(drift_mnd=drift_mnd).drift_mnd_total
+
+    @g.node()
+    def effektiv_leie(leie, use_rooms_total, rooms_leie, antall_rom, leie_mnd):
+        return Eiendomsinput(leie=leie, use_rooms_total=use_rooms_total,
+                             rooms_leie=rooms_leie, antall_rom=antall_rom, leie_mnd=leie_mnd).effektiv_leie
+
+    @g.node()
+    def leie_pr_mnd(effektiv_leie, leie_mnd, løpetid):
+        # Fast leie som skalar (som i beregn), leieliste som månedsserie
+        if not leie_mnd:
+            return int(effektiv_leie)
+        return Eiendomsinput(leie_mnd=leie_mnd).leie_serie(int(løpetid) * 12)
+
+    @g.node()
+    def total_investering(kjøpesum, oppussing_total):
+        return int(kjøpesum + Eiendomsinput(kjøpesum=kjøpesum).dokumentavgift + oppussing_total)
+
+    @g.node()
+    def lånebeløp(total_investering, egenkapital):
+        return max(total_investering - int(egenkapital), 0)
+
+    @g.node()
+    def låneforløp(lånebeløp, rente, løpetid, avdragsfri, lånetype, leie_pr_mnd, drift_mnd_total, eierform,
+                   lånehendelser):
+        # Som kalkulator.låneforløp: None uten hendelser
+        if not lånehendelser:
+            return None
+        return beregn_lån_hendelser(
+            lån=int(lånebeløp), rente=float(rente), løpetid=int(løpetid), avdragsfri=int(avdragsfri),
+            lånetype=lånetype, leie=leie_pr_mnd, drift_mnd=int(drift_mnd_total), eierform=eierform,
+            hendelser=lånehendelser,
+        )
+
+    @g.node()
+    def plan(lånebeløp, rente, løpetid, avdragsfri, lånetype, leie_pr_mnd, drift_mnd_total, eierform, låneforløp):
+        if låneforløp is not None:
+            return låneforløp.tabell(), låneforløp.akk
+        return beregn_lån(
+            lån=int(lånebeløp), rente=float(rente), løpetid=int(løpetid), avdragsfri=int(avdragsfri),
+            lånetype=lånetype, leie=leie_pr_mnd, drift_mnd=int(drift_mnd_total), eierform=eierform,
+        )
+
+    @g.node()
+    def kpis_1(plan):
+        return first_month_kpis(plan[0])
+
+    @g.node()
+    def breakeven_mnd(plan):
+        return break_even_month(plan[0])
+
+    @g.node()
+    def skatt(plan, leie_pr_mnd, drift_mnd_total, eierform, låneforløp):
+        leie = låneforløp.leie_serie() if låneforløp is not None else leie_pr_mnd
+        return skatteberegning(plan[0], leie, drift_mnd_total, eierform)
+
+    @g.node()
+    def avkastning(effektiv_leie, drift_mnd_total, total_investering):
+        return yields(effektiv_leie, drift_mnd_total, total_investering)
+
+    @g.node()
+    def verdiutvikling(kjøpesum, oppussing_total, løpetid, verdistigning):
+        startverdi = float(kjøpesum + oppussing_total)
+        return verdistigning_liste(startverdi, int(løpetid), rate=float(verdistigning) / 100)
+
+    @g.node()
+    def beregning(plan, kpis_1, breakeven_mnd, skatt, verdiutvikling, total_investering, lånebeløp,
+                  effektiv_leie, drift_mnd_total, avkastning):
+        df, akk = plan
+        return Beregning(
+            df=df,
+            akk=akk,
+            kpis_1=kpis_1,
+            breakeven_mnd=breakeven_mnd,
+            skatt=skatt[0],
+            verdistigning=verdiutvikling,
+            total_investering=total_investering,
+            lånebeløp=lånebeløp,
+            leie=effektiv_leie,
+            drift_mnd_total=drift_mnd_total,
+            brutto_yield=avkastning[0],
+            netto_yield=avkastning[1],
+            skatt_år=skatt[1],
+        )
+
+    @g.node()
+    def verdi_df(beregning):
+        return beregning.verdi_df
+
+    # Rapportene avhenger av alle feltene, også tekstfeltene
+    @g.node(avhenger_av=INPUT_FELT)
+    def eiendom(**felt):
+        return Eiendomsinput(**felt)
+
+    @g.node()
+    def presentasjon(eiendom, beregning, rapport_full_tidsserie):
+        return presentasjon_html(eiendom, beregning, bilder, full_tidsserie=rapport_full_tidsserie)
+
+    @g.node()
+    def onepager(eiendom, beregning):
+        return onepager_html(eiendom, beregning)
+
+    g.sett(rapport_full_tidsserie=False, ny_runde=False)
+    return g
@@ -0,0 +1,216 @@
+"""Internrente (IRR) og nåverdi (NPV) på egenkapitalens kontantstrøm, vektorisert over scenarier.
+
+Kontantstrømmen er månedlig: egenkapitalen ut i måned 0, netto cashflow inn hver
+måned, og i exit-måneden salgsverdien minus restgjelden. Exit etter lånets slutt
+gir netto uten låneutgifter i de siste månedene og ingen restgjeld.
+
+Internrenten løses for alle scenarier samtidig med Newton sikret av halvering:
+hvert scenario holder et intervall med fortegnsskifte, og et Newton-steg som
+havner utenfor intervallet, eller ikke minst halverer steget fra forrige
+iterasjon, erstattes av midtpunktet. Scenarier uten løsning rapporteres med
+status i stedet for et tall.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .laan import AS_SKATTESATS
+from .modeller import Beregning
+
+STANDARD_EXIT_ÅR = (5, 10, 20)
+DISKONTERINGSRENTE = 0.07  # årlig avkastningskrav for nåverdien
+TOLERANSE = 1e-10          # på månedsrenten
+MAKS_ITERASJONER = 100
+# Søkeintervall for årlig internrente: -99 % til +1000 %
+INTERVALL_ÅR = (-0.99, 10.0)
+
+# Statuser pr. scenario; bare OK har en internrente
+OK = "ok"
+INGEN_EGENKAPITAL = "ingen egenkapital"
+INGEN_FORTEGNSSKIFTE = "ingen løsning i intervallet"
+IKKE_KONVERGERT = "ikke konvergert"
+
+
+@dataclass
+class Internrente:
+    """Én verdi pr. scenario; rentene er NaN der status ikke er OK."""
+    rente_mnd: np.ndarray
+    rente_år: np.ndarray
+    iterasjoner: np.ndarray
+    status: np.ndarray
+    entydig: np.ndarray  # False: flere fortegnsskift i kontantstrømmen, internrenten er kanskje ikke unik
+
+    @property
+    def konvergert(self) -> np.ndarray:
+        return self.status == OK
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+
+def _månedsrente(rente_år):
+    return np.power(1.0 + np.asarray(rente_år, dtype=float), 1 / 12) - 1.0
+
+
+def egenkapitalstrømmer(egenkapital, netto: np.ndarray, restgjeld: np.ndarray, salgsverdi, exit_mnd: int,
+                        netto_etter_lån=0.0) -> np.ndarray:
+    """(scenario × exit_mnd+1)-matrise med egenkapitalens kontantstrøm.
+
+    `netto` og `restgjeld` er (scenario × måned)-matriser, NaN-utfylt etter lånets
+    slutt som i nedbetalingsplan_matrise. Måneder etter lånets slutt får
+    `netto_etter_lån` (skalar eller én pr. scenario) og restgjeld 0.
+    """
+    netto = np.atleast_2d(np.asarray(netto, dtype=float))
+    restgjeld = np.atleast_2d(np.asarray(restgjeld, dtype=float))
+    S, M = netto.shape
+    exit_mnd = int(exit_mnd)
+    bredde = min(M, exit_mnd)
+    etter = np.broadcast_to(np.asarray(netto_etter_lån, dtype=float).reshape(-1, 1), (S, 1))
+
+    strøm = np.empty((S, exit_mnd + 1))
+    strøm[:, 0] = -np.asarray(egenkapital, dtype=float)
+    strøm[:, 1:bredde + 1] = netto[:, :bredde]
+    strøm[:, bredde + 1:] = etter
+    utenfor = np.isnan(strøm[:, 1:])
+    strøm[:, 1:] = np.where(utenfor, etter, strøm[:, 1:])
+    gjeld_exit = restgjeld[:, exit_mnd - 1] if 0 < exit_mnd <= M else np.zeros(S)
+    strøm[:, -1] += np.asarray(salgsverdi, dtype=float) - np.nan_to_num(gjeld_exit)
+    return strøm
+
+
+def nåverdi(strømmer: np.ndarray, rente_år=DISKONTERINGSRENTE) -> np.ndarray:
+    """Nåverdi pr. scenario av månedlige kontantstrømmer, diskontert med årlig rente."""
+    strømmer = np.atleast_2d(np.asarray(strømmer, dtype=float))
+    r = np.broadcast_to(_månedsrente(rente_år).reshape(-1, 1), (len(strømmer), 1))
+    t = np.arange(strømmer.shape[1])
+    return (strømmer * np.exp(-t * np.log1p(r))).sum(axis=1)
+
+
+def _verdi_og_derivert(strømmer_t: np.ndarray, r: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Nåverdi og derivert mht. r, med Horner i v = 1/(1+r) over den transponerte (måned × scenario)-matrisen.
+
+    Én multiplikasjon og addisjon pr. måned over alle scenarier, uten potenser.
+    """
+    v = 1.0 / (1.0 + r)
+    p = strømmer_t[-1].copy()
+    dp = np.zeros_like(p)
+    for c in strømmer_t[-2::-1]:
+        dp *= v
+        dp += p
+        p *= v
+        p += c
+    return p, -dp * v * v
+
+
+def internrente(strømmer: np.ndarray, toleranse: float = TOLERANSE, maks_iterasjoner: int = MAKS_ITERASJONER,
+                intervall_år: tuple[float, float] = INTERVALL_ÅR) -> Internrente:
+    """Månedlig og årlig internrente for hvert scenario (rad) i `strømmer`.
+
+    Konvergens: steget er under `toleranse` (relativt), eller intervallet er
+    krympet til `toleranse`. Scenarier som ikke når dit innen `maks_iterasjoner`,
+    ikke har egenkapital ut i måned 0, eller ikke har fortegnsskifte i
+    intervallet, får en status i stedet for en rente.
+    """
+    strømmer = np.atleast_2d(np.asarray(strømmer, dtype=float))
+    S = len(strømmer)
+    strømmer_t = np.ascontiguousarray(strømmer.T)
+    status = np.full(S, OK, dtype=object)
+    iterasjoner = np.zeros(S, dtype=np.int64)
+    rente = np.full(S, np.nan)
+
+    # Fortegnsskift i kontantstrømmen (nuller hoppes over)
+    fortegn = np.sign(strømmer)
+    forrige = np.maximum.accumulate(np.where(fortegn != 0, np.arange(strømmer.shape[1]), 0), axis=1)
+    skift = (fortegn[:, 1:] != 0) & (fortegn[:, 1:] != np.take_along_axis(fortegn, forrige[:, :-1], axis=1))
+    entydig = skift.sum(axis=1) <= 1
+
+    lo = np.full(S, _månedsrente(intervall_år[0]))
+    hi = np.full(S, _månedsrente(intervall_år[1]))
+    f_lo, _ = _verdi_og_derivert(strømmer_t, lo)
+    f_hi, _ = _verdi_og_derivert(strømmer_t, hi)
+    status[np.sign(f_lo) == np.sign(f_hi)] = INGEN_FORTEGNSSKIFTE
+    status[strømmer[:, 0] >= 0] = INGEN_EGENKAPITAL
+
+    aktiv = np.flatnonzero(status == OK)
+    x = np.clip(np.full(len(aktiv), _månedsrente(DISKONTERINGSRENTE)), lo[aktiv], hi[aktiv])
+    lo, hi, f_lo = lo[aktiv], hi[aktiv], f_lo[aktiv]
+    steg = hi - lo
+    aktive_t = strømmer_t[:, aktiv]
+    for i in range(1, maks_iterasjoner + 1):
+        if not len(aktiv):
+            break
+        f, df = _verdi_og_derivert(aktive_t, x)
+        # Krymp intervallet rundt fortegnsskiftet
+        samme = np.sign(f) == np.sign(f_lo)
+        lo, f_lo = np.where(samme, x, lo), np.where(samme, f, f_lo)
+        hi = np.where(samme, hi, x)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = x - f / df
+        godtatt = (newton > lo) & (newton < hi) & (np.abs(newton - x) <= np.abs(steg) / 2)
+        ny = np.where(godtatt, newton, (lo + hi) / 2)
+        steg = ny - x
+        ferdig = (f == 0) | (np.abs(ny - x) <= toleranse * (1.0 + np.abs(x))) | (hi - lo <= toleranse)
+        ny = np.where(f == 0, x, ny)
+        iterasjoner[aktiv] = i
+        rente[aktiv[ferdig]] = ny[ferdig]
+        igjen = ~ferdig
+        aktiv, x, lo, hi, f_lo, steg = aktiv[igjen], ny[igjen], lo[igjen], hi[igjen], f_lo[igjen], steg[igjen]
+        aktive_t = aktive_t[:, igjen] if ferdig.any() else aktive_t
+    status[aktiv] = IKKE_KONVERGERT
+
+    rente[status != OK] = np.nan
+    return Internrente(
+        rente_mnd=rente,
+        rente_år=np.power(1.0 + rente, 12) - 1.0,
+        iterasjoner=iterasjoner,
+        status=status,
+        entydig=entydig,
+    )
+
+
+def statustekst(irr: Internrente) -> np.ndarray:
+    """Status pr. scenario, med merknad der internrenten kanskje ikke er unik."""
+    return np.where(irr.entydig, irr.status, irr.status + " (flere fortegnsskift)")
+
+
+def netto_uten_lån(leie, drift_mnd, eierform) -> np.ndarray:
+    """Netto pr. måned når lånet er nedbetalt (med den forenklede AS-skatten som i laan.netto_cashflow)."""
+    netto = np.asarray(leie, dtype=float) - np.asarray(drift_mnd, dtype=float)
+    er_as = np.asarray(eierform, dtype=object) == "AS"
+    return np.where(er_as & (netto > 0), netto * (1 - AS_SKATTESATS), netto)
+
+
+def avkastningstabell(res: Beregning, eierform: str, exit_år=STANDARD_EXIT_ÅR,
+                      diskonteringsrente: float = DISKONTERINGSRENTE) -> pd.DataFrame:
+    """Internrente og nåverdi for én eiendom, én rad pr. exit-år.
+
+    Salgsverdien er verdistigningen i beregningen; exit etter lånets slutt og
+    utover verdiutviklingen regnes med fast leie (res.leie) og samme vekst.
+    """
+    df = res.df
+    egenkapital = float(res.total_investering - res.lånebeløp)
+    netto = df["Netto cashflow"].to_numpy(dtype=float)[None, :]
+    restgjeld = df["Restgjeld"].to_numpy(dtype=float)[None, :]
+    verdier = [float(r["Verdi"]) for r in res.verdistigning]
+    vekst = verdier[1] / verdier[0] - 1.0 if len(verdier) > 1 and verdier[0] else 0.0
+    etter_lån = netto_uten_lån(res.leie, res.drift_mnd_total, eierform)
+    rader = []
+    for år in exit_år:
+        år, mnd = int(år), 12 * int(år)
+        salgsverdi = verdier[år] if år < len(verdier) else verdier[0] * (1 + vekst) ** år
+        gjeld = float(restgjeld[0, mnd - 1]) if mnd <= restgjeld.shape[1] else 0.0
+        strøm = egenkapitalstrømmer(egenkapital, netto, restgjeld, salgsverdi, mnd, etter_lån)
+        irr = internrente(strøm)
+        rader.append({
+            "Exit (år)": år,
+            "Egenkapital": egenkapital,
+            "Sum netto": float(strøm[0, 1:].sum()) - salgsverdi + gjeld,
+            "Salgsverdi": salgsverdi,
+            "Restgjeld": gjeld,
+            "IRR (%/år)": float(irr.rente_år[0]) * 100,
+            "NPV (kr)": float(nåverdi(strøm, diskonteringsrente)[0]),
+            "Status": statustekst(irr)[0],
+        })
+    return pd.DataFrame(rader, columns=["Exit (år)", "Egenkapital", "Sum netto", "Salgsverdi", "Restgjeld",
+                                        "IRR (%/år)", "NPV (kr)", "Status"])
@@ -0,0 +1,181 @@
+"""Hele beregningen for én eiendom, uten UI."""
+from .kpi import break_even_month, first_month_kpis, yields
+from .kpi_lukket import STANDARD_HORISONTER, lukkede_kpi
+from .laan import beregn_lån
+from .laanehendelser import Låneforløp, beregn_lån_hendelser
+from .modeller import Beregning, Eiendomsinput
+from .skatt import skatteberegning
+from .verdi import verdistigning_liste
+
+
+def låneforløp(inp: Eiendomsinput) -> Låneforløp | None:
+    """Lånet med hendelser (segmenter på lukket form), eller None uten lånehendelser."""
+    if not inp.lånehendelser:
+        return None
+    return beregn_lån_hendelser(
+        lån=int(inp.lånebeløp),
+        rente=float(inp.rente),
+        løpetid=int(inp.løpetid),
+        avdragsfri=int(inp.avdragsfri),
+        lånetype=inp.lånetype,
+        leie=inp.leie_serie(int(inp.løpetid) * 12) if inp.leie_mnd else int(inp.effektiv_leie),
+        drift_mnd=int(inp.drift_mnd_total),
+        eierform=inp.eierform,
+        hendelser=inp.lånehendelser,
+    )
+
+
+def beregn(inp: Eiendomsinput) -> Beregning:
+    """Lån, nøkkeltall, skatt og verdiutvikling for én eiendom."""
+    leie = inp.effektiv_leie
+    drift_mnd_total = inp.drift_mnd_total
+    total_investering = inp.total_investering
+    lånebeløp = inp.lånebeløp
+
+    # Med leieliste varierer leien fra måned til måned
+    leie_pr_mnd = inp.leie_serie(int(inp.løpetid) * 12) if inp.leie_mnd else int(leie)
+    forløp = låneforløp(inp)
+    if forløp is not None:
+        df, akk = forløp.tabell(), forløp.akk
+        leie_pr_mnd = forløp.leie_serie()
+    else:
+        df, akk = beregn_lån(
+            lån=int(lånebeløp),
+            rente=float(inp.rente),
+            løpetid=int(inp.løpetid),
+            avdragsfri=int(inp.avdragsfri),
+            lånetype=inp.lånetype,
+            leie=leie_pr_mnd,
+            drift_mnd=int(drift_mnd_total),
+            eierform=inp.eierform,
+        )
+    brutto_yield, netto_yield = yields(leie, drift_mnd_total, total_investering)
+    skatt, skatt_år = skatteberegning(df, leie_pr_mnd, drift_mnd_total, inp.eierform)
+
+    return Beregning(
+        df=df,
+        akk=akk,
+        kpis_1=first_month_kpis(df),
+        breakeven_mnd=break_even_month(df),
+        skatt=skatt,
+        verdistigning=verdistigning_liste(inp.startverdi, int(inp.løpetid), rate=inp.verdistigning_sats),
+        total_investering=total_investering,
+        lånebeløp=lånebeløp,
+        leie=leie,
+        drift_mnd_total=drift_mnd_total,
+        brutto_yield=brutto_yield,
+        netto_yield=netto_yield,
+        skatt_år=skatt_år,
+    )
+
+
+def scenario(inp: Eiendomsinput) -> dict:
+    """Input til lånemotoren (én rad med SCENARIO_KOLONNER) for én eiendom."""
+    return {
+        "lån": int(inp.lånebeløp),
+        "rente": float(inp.rente),
+        "løpetid": int(inp.løpetid),
+        "avdragsfri": int(inp.avdragsfri),
+        "lånetype": inp.lånetype,
+        "leie": int(inp.effektiv_leie),
+        "drift_mnd": int(inp.drift_mnd_total),
+        "eierform": inp.eierform,
+    }
+
+
+def avkastningsscenario(inp: Eiendomsinput) -> dict:
+    """Som scenario(), pluss egenkapitalen i kjøpet og startverdien (batch.beregn_avkastning_batch)."""
+    return {
+        **scenario(inp),
+        "egenkapital": int(inp.total_investering - inp.lånebeløp),
+        "startverdi": inp.startverdi,
+    }
+
+
+def beregn_kpi(inp: Eiendomsinput, horisonter=STANDARD_HORISONTER) -> dict:
+    """Bare nøkkeltallene for én eiendom, uten månedstabell (se kpi_lukket).
+
+    For mange eiendommer samtidig: beregn_kpi_batch med én scenario-rad pr. eiendom.
+    Med leieliste (leie som varierer over tid) gjelder ikke den lukkede formen,
+    og tallene hentes fra månedstabellen. Med lånehendelser regnes de fra
+    segmentene i låneforløpet, også uten månedstabell.
+    """
+    if inp.lånehendelser:
+        return _kpi_fra_forløp(inp, låneforløp(inp), horisonter)
+    if inp.leie_mnd:
+        return _kpi_fra_tabell(inp, horisonter)
+    leie = inp.effektiv_leie
+    drift_mnd_total = inp.drift_mnd_total
+    total_investering = inp.total_investering
+    lånebeløp = inp.lånebeløp
+    kpi = lukkede_kpi(*scenario(inp).values(), horisonter=horisonter)
+    brutto_yield, netto_yield = yields(leie, drift_mnd_total, total_investering)
+    renter_aar1 = float(kpi["renter_aar1"][0])
+    break_even = int(kpi["break_even_mnd"][0])
+    return {
+        "total_investering": total_investering,
+        "lånebeløp": lånebeløp,
+        "leie": leie,
+        "drift_mnd_total": drift_mnd_total,
+        "brutto_yield": brutto_yield,
+        "netto_yield": netto_yield,
+        "kpis_1": {"termin": float(kpi["termin_1"][0]), "netto": float(kpi["netto_1"][0])},
+        "breakeven_mnd": break_even or None,
+        "akk": float(kpi["akk_slutt"][0]),
+        "renter_total": float(kpi["renter_total"][0]),
+        "akk_horisont": {int(h): float(kpi[f"akk_{int(h)}"][0]) for h in horisonter},
+        "skatt": {
+            "renter_aar1": renter_aar1,
+            "drift_aar": float(drift_mnd_total) * 12.0,
+            "fradrag_aar1_sum": renter_aar1 + float(drift_mnd_total) * 12.0,
+        },
+    }
+
+
+def _kpi_fra_tabell(inp: Eiendomsinput, horisonter) -> dict:
+    """Som beregn_kpi, men fra månedstabellen i beregn()."""
+    res = beregn(inp)
+    akk = res.df["Akk. cashflow"].to_numpy()
+    n = len(akk)
+    return {
+        "total_investering": res.total_investering,
+        "lånebeløp": res.lånebeløp,
+        "leie": res.leie,
+        "drift_mnd_total": res.drift_mnd_total,
+        "brutto_yield": res.brutto_yield,
+        "netto_yield": res.netto_yield,
+        "kpis_1": res.kpis_1,
+        "breakeven_mnd": res.breakeven_mnd,
+        "akk": res.akk,
+        "renter_total": float(res.df["Renter"].sum()),
+        "akk_horisont": {int(h): float(akk[min(int(h), n) - 1]) if min(int(h), n) > 0 else 0.0 for h in horisonter},
+        "skatt": res.skatt,
+    }
+
+
+def _kpi_fra_forløp(inp: Eiendomsinput, forløp: Låneforløp, horisonter) -> dict:
+    """Som beregn_kpi, men fra låneforløpet (kumulative formler pr. segment)."""
+    leie = inp.effektiv_leie
+    drift_mnd_total = inp.drift_mnd_total
+    brutto_yield, netto_yield = yields(leie, drift_mnd_total, inp.total_investering)
+    renter_aar1 = float(forløp.renter_ved(12))
+    n = forløp.horisont
+    akk_h = forløp.akk_ved([min(int(h), n) for h in horisonter]) if horisonter else []
+    return {
+        "total_investering": inp.total_investering,
+        "lånebeløp": inp.lånebeløp,
+        "leie": leie,
+        "drift_mnd_total": drift_mnd_total,
+        "brutto_yield": brutto_yield,
+        "netto_yield": netto_yield,
+        "kpis_1": forløp.første_måned(),
+        "breakeven_mnd": forløp.break_even_mnd(),
+        "akk": forløp.akk,
+        "renter_total": forløp.renter_total,
+        "akk_horisont": {int(h): float(a) for h, a in zip(horisonter, akk_h)},
+        "skatt": {
+            "renter_aar1": renter_aar1,
+            "drift_aar": float(drift_mnd_total) * 12.0,
+            "fradrag_aar1_sum": renter_aar1 + float(drift_mnd_total) * 12.0,
+        },
+    }
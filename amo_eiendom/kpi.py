@@ -0,0 +1,28 @@
+"""Nøkkeltall fra månedstabellen."""
+import pandas as pd
+
+
+def first_month_kpis(df: pd.DataFrame) -> dict:
+    if df.empty:
+        return {"termin": 0.0, "netto": 0.0}
+    r = df.iloc[0]
+    return {"termin": float(r["Renter"] + r["Avdrag"]), "netto": float(r["Netto cashflow"])}
+
+
+def break_even_month(df: pd.DataFrame):
+    if df.empty:
+        return None
+    mask = df["Akk. cashflow"] >= 0
+    if not mask.any():
+        return None
+    idx = mask.idxmax()
+    return int(df.iloc[idx]["Måned"])
+
+
+def yields(leie: float, drift_mnd: float, total_investering: float) -> tuple[float, float]:
+    """Returnerer (brutto, netto) yield i prosent."""
+    if not total_investering:
+        return 0.0, 0.0
+    brutto = (leie * 12 / total_investering) * 100
+    netto = ((leie * 12 - drift_mnd * 12) / total_investering) * 100
+    return brutto, netto
@@ -0,0 +1,155 @@
+"""Nøkkeltall på lukket form, uten å bygge månedstabellen.
+
+Gir de samme tallene som beregn_lån + first_month_kpis, break_even_month og
+skattefradrag_estimat (innenfor TOLERANSE_REL × lån), men uten DataFrame og
+med konstant arbeid pr. scenario. Brukes til screening og rangering.
+
+Planen deles i to faser: avdragsfri (fast rente, fast netto) og avdrag, der
+netto før skatt er lineær i måneden (konstant for annuitet, stigende for
+serielån). Akkumulert netto er da summer av aritmetiske rekker.
+"""
+import numpy as np
+
+from .laan import AS_SKATTESATS, _kolonne, _lånparametre
+
+STANDARD_HORISONTER = (12, 60, 120)
+
+
+def _rekke(k, c, d):
+    """Summen av c + d·(j-1) for j = 1..k."""
+    return k * c + d * k * (k - 1) / 2
+
+
+def _etter_skatt(x, er_as):
+    return np.where(er_as & (x > 0), x * (1 - AS_SKATTESATS), x)
+
+
+def _faser(lån, rente, løpetid, avdragsfri, lånetype, leie, drift_mnd) -> dict[str, np.ndarray]:
+    """Felles oppsett: avdragsfri fase (a måneder) og avdragsfase (N måneder, netto c2 + d2·(k-1))."""
+    n, af, r, n_avdrag_sikker, _annuitet, serie, terminbeløp = _lånparametre(lån, rente, løpetid, avdragsfri, lånetype)
+    N = np.maximum(n - af, 0)  # avdragsmåneder
+    overskudd = leie - drift_mnd
+    # Fase 1: bare renter, fast netto. Fase 2: termin = terminbeløp, eller avdrag + fallende
+    # renter for serielån, så netto før skatt er c2 + d2·(k-1) med d2 ≥ 0.
+    serie_avdrag = lån / n_avdrag_sikker
+    return {
+        "n": n, "N": N, "a": n - N, "r": r, "lån": lån, "serie": serie, "terminbeløp": terminbeløp,
+        "serie_avdrag": serie_avdrag,
+        "netto_fase1": overskudd - lån * r,
+        "c2": np.where(serie, overskudd - serie_avdrag - lån * r, overskudd - terminbeløp),
+        "d2": np.where(serie, r * serie_avdrag, 0.0),
+    }
+
+
+def _renter_fase2(f: dict, k):
+    """Sum renter for de k første avdragsmånedene."""
+    lån, r, terminbeløp, serie_avdrag = f["lån"], f["r"], f["terminbeløp"], f["serie_avdrag"]
+    vekst = np.power(1 + r, k)
+    saldo = np.where(r > 0, lån * vekst - terminbeløp * (vekst - 1) / np.where(r > 0, r, 1.0), lån - k * terminbeløp)
+    konstant = np.where(r > 0, k * terminbeløp - (lån - np.maximum(saldo, 0.0)), 0.0)
+    return np.where(f["serie"], r * (k * lån - serie_avdrag * k * (k - 1) / 2), konstant)
+
+
+def _renter_ved(f: dict, m):
+    """Sum renter t.o.m. måned m."""
+    return np.minimum(m, f["a"]) * f["lån"] * f["r"] + _renter_fase2(f, np.minimum(np.maximum(m - f["a"], 0), f["N"]))
+
+
+def lukkede_kpi(lån, rente, løpetid, avdragsfri, lånetype, leie, drift_mnd, eierform,
+                horisonter=STANDARD_HORISONTER) -> dict[str, np.ndarray]:
+    """KPI-er for mange scenarier uten månedsmatriser.
+
+    Parametrene kan være skalarer eller arrays (én verdi pr. scenario). Returnerer
+    arrays for termin_1, netto_1, renter_aar1, renter_total, break_even_mnd
+    (0 = aldri), akk_slutt og akk_<h> for hver horisont h (måneder, kappet ved løpetiden).
+    """
+    lån, rente, løpetid, avdragsfri, lånetype, leie, drift_mnd, eierform = np.broadcast_arrays(
+        _kolonne(lån), _kolonne(rente), _kolonne(løpetid), _kolonne(avdragsfri), _kolonne(lånetype, dtype=object),
+        _kolonne(leie), _kolonne(drift_mnd), _kolonne(eierform, dtype=object),
+    )
+    f = _faser(lån, rente, løpetid, avdragsfri, lånetype, leie, drift_mnd)
+    n, N, a, r, serie, terminbeløp = f["n"], f["N"], f["a"], f["r"], f["serie"], f["terminbeløp"]
+    serie_avdrag, c2, d2 = f["serie_avdrag"], f["c2"], f["d2"]
+    er_as = eierform == "AS"
+    netto_fase1 = _etter_skatt(f["netto_fase1"], er_as)
+    # k0: første avdragsmåned med netto ≥ 0 (AS skattes bare fra og med den første positive)
+    d2_sikker = np.where(d2 > 0, d2, 1.0)
+    k0 = np.where(c2 >= 0, 1, np.where(d2 > 0, np.ceil(1 - c2 / d2_sikker), N + 1))
+    k0 = np.minimum(np.maximum(k0, 1), N + 1)
+    skattefri = np.where(er_as, k0 - 1, N)  # måneder i starten av fase 2 uten skattetrekk
+    sum_skattefri = _rekke(skattefri, c2, d2)
+
+    def akk(m):
+        """Akkumulert netto cashflow etter måned m."""
+        m1 = np.minimum(m, a)
+        k = np.minimum(np.maximum(m - a, 0), N)
+        fase2 = _rekke(k, c2, d2)
+        fase2 = np.where(k > skattefri, sum_skattefri + (1 - AS_SKATTESATS) * (fase2 - sum_skattefri), fase2)
+        return m1 * netto_fase1 + fase2
+
+    # Måned 1
+    termin_1 = np.where(a > 0, lån * r, np.where(serie, serie_avdrag + lån * r, terminbeløp))
+    termin_1 = np.where(n > 0, termin_1, 0.0)
+    netto_1 = akk(np.minimum(n, 1))
+
+    # Break-even: netto er fast i fase 1 og ikke-synkende i fase 2, så akk synker til netto blir
+    # ikke-negativ (k0) og stiger deretter. På den stigende delen er akk et andregradspolynom i k:
+    # løs det direkte og juster ±1 måned mot avrundingsfeil.
+    τ = np.where(er_as, 1 - AS_SKATTESATS, 1.0)
+    A = τ * d2 / 2
+    B = τ * (c2 - d2 / 2)
+    C = a * netto_fase1 + (1 - τ) * sum_skattefri
+    rot = np.sqrt(np.maximum(B * B - 4 * A * C, 0.0))
+    # Numerisk stabil rot: unngår kansellering når A er liten
+    k_stjerne = np.where(
+        B > 0, -2 * C / np.where(B > 0, B + rot, 1.0),
+        np.where(A > 0, (rot - B) / np.where(A > 0, 2 * A, 1.0), np.where(C >= 0, 0.0, np.inf)),
+    )
+    øvre = np.maximum(N, 1)
+    k = np.minimum(np.maximum(np.ceil(np.minimum(k_stjerne, øvre)), k0), øvre).astype(np.int64)
+    k = np.where((k > k0) & (akk(a + k - 1) >= 0), k - 1, k)
+    k = np.where((k < N) & (akk(a + k) < 0), k + 1, k)
+    treff_fase2 = (k0 <= N) & (akk(a + k) >= 0)
+    break_even = np.where((n > 0) & (netto_1 >= 0), 1, np.where(treff_fase2, a + k, 0))
+
+    ut = {
+        "termin_1": termin_1,
+        "netto_1": netto_1,
+        "renter_aar1": _renter_ved(f, 12),
+        "renter_total": _renter_ved(f, n),
+        "break_even_mnd": break_even,
+        "akk_slutt": akk(n),
+    }
+    for h in horisonter:
+        ut[f"akk_{int(h)}"] = akk(np.minimum(n, int(h)))
+    return ut
+
+
+def lukkede_årssummer(lån, rente, løpetid, avdragsfri, lånetype, leie, drift_mnd) -> dict[str, np.ndarray]:
+    """Summer pr. inntektsår (12 og 12 måneder) uten månedsmatriser.
+
+    Returnerer (scenario × år)-matriser med måneder, renter og netto før skatt
+    (uten den forenklede AS-skatten), NaN etter løpetiden. Til skatt.skatt_pr_år.
+    """
+    lån, rente, løpetid, avdragsfri, lånetype, leie, drift_mnd = np.broadcast_arrays(
+        _kolonne(lån), _kolonne(rente), _kolonne(løpetid), _kolonne(avdragsfri), _kolonne(lånetype, dtype=object),
+        _kolonne(leie), _kolonne(drift_mnd),
+    )
+    f = {k: v[:, None] for k, v in _faser(lån, rente, løpetid, avdragsfri, lånetype, leie, drift_mnd).items()}
+    n = f["n"]
+    år = int(-(-n.max(initial=0) // 12))
+    m = np.minimum(12 * np.arange(år + 1)[None, :], n)  # måneder t.o.m. hvert årsskifte
+
+    def før_skatt_ved(m):
+        m1 = np.minimum(m, f["a"])
+        return m1 * f["netto_fase1"] + _rekke(np.minimum(np.maximum(m - f["a"], 0), f["N"]), f["c2"], f["d2"])
+
+    måneder = np.diff(m, axis=1).astype(float)
+    ut = {
+        "måneder": måneder,
+        "renter": np.diff(_renter_ved(f, m), axis=1),
+        "før_skatt": np.diff(før_skatt_ved(m), axis=1),
+    }
+    for arr in ut.values():
+        arr[måneder == 0] = np.nan
+    return ut
@@ -0,0 +1,153 @@
+"""Lånemotor: nedbetalingsplan på lukket form (annuitet/serie) med NumPy."""
+import numpy as np
+import pandas as pd
+
+# Forenklet skatt på positiv netto cashflow i AS
+AS_SKATTESATS = 0.375
+
+# Maks avvik pr. celle mot den tidligere måned-for-måned-løkken,
+# relativt til lånebeløpet (1e-9 ≈ 0,01 kr på et lån på 10 MNOK)
+TOLERANSE_REL = 1e-9
+
+
+def _kolonne(x, dtype=float) -> np.ndarray:
+    """Skalar eller array-aktig → 1-D array."""
+    return np.atleast_1d(np.asarray(x, dtype=dtype))
+
+
+def _lånparametre(lån, rente, løpetid, avdragsfri, lånetype):
+    """Felles oppsett: måneder, månedsrente, lånetype-masker og fast terminbeløp pr. scenario.
+
+    Negativ rente avvises: formlene under forutsetter r ≥ 0.
+    """
+    if np.any(rente < 0):
+        raise ValueError("Renten kan ikke være negativ")
+    n  = (løpetid * 12).astype(int)
+    af = (avdragsfri * 12).astype(int)
+    r  = rente / 100 / 12
+    n_avdrag = n - af
+    har_avdrag = n_avdrag > 0
+    n_avdrag_sikker = np.where(har_avdrag, n_avdrag, 1)
+
+    annuitet = (lånetype == "Annuitetslån") & (r > 0) & har_avdrag
+    serie = (lånetype == "Serielån") & har_avdrag
+    vekst_n = np.power(1 + r, np.where(annuitet, n_avdrag, 1))
+    terminbeløp = np.where(
+        annuitet,
+        lån * (r * vekst_n) / np.where(annuitet, vekst_n - 1, 1.0),
+        np.where(har_avdrag, lån / n_avdrag_sikker, 0.0),
+    )
+    return n, af, r, n_avdrag_sikker, annuitet, serie, terminbeløp
+
+
+def _saldo(k, lån, r, terminbeløp, serie, n_avdrag):
+    """Restgjeld etter k avdragsmåneder (lukket form, klippet ved 0)."""
+    vekst = np.power(1.0 + r, k)
+    konstant = np.where(
+        r > 0,
+        lån * vekst - terminbeløp * (vekst - 1.0) / np.where(r > 0, r, 1.0),
+        lån - k * terminbeløp,
+    )
+    serie_saldo = lån - k * (lån / n_avdrag)
+    return np.maximum(np.where(serie, serie_saldo, konstant), 0.0)
+
+
+def nedbetalingsplan_matrise(lån, rente, løpetid, avdragsfri, lånetype, måneder: int | None = None) -> dict[str, np.ndarray]:
+    """Nedbetalingsplan for mange lån samtidig.
+
+    Alle parametre kan være skalarer eller arrays med én verdi pr. scenario.
+    Returnerer restgjeld, avdrag, renter og termin som (scenario × måned)-matriser,
+    utfylt med NaN etter hvert låns løpetid, samt 'antall_mnd' pr. scenario.
+    """
+    lån, rente, løpetid, avdragsfri, lånetype = np.broadcast_arrays(
+        _kolonne(lån), _kolonne(rente), _kolonne(løpetid), _kolonne(avdragsfri), _kolonne(lånetype, dtype=object)
+    )
+
+    n, af, r, n_avdrag_sikker, annuitet, serie, terminbeløp = _lånparametre(lån, rente, løpetid, avdragsfri, lånetype)
+
+    M = int(n.max(initial=0)) if måneder is None else int(måneder)
+    m = np.arange(M)[None, :]
+
+    def kol(x):
+        return x[:, None]
+
+    def saldo(k):
+        return _saldo(k, kol(lån), kol(r), kol(terminbeløp), kol(serie), kol(n_avdrag_sikker))
+
+    # Avdragsmåneder gjennomført før og etter måned m
+    k_før = np.maximum(m - kol(af), 0)
+    k_etter = np.maximum(m - kol(af) + 1, 0)
+    avdragsfri_mnd = m < kol(af)
+
+    renter = saldo(k_før) * kol(r)
+    restgjeld = saldo(k_etter)
+    avdrag = np.where(kol(serie), kol(lån / n_avdrag_sikker), kol(terminbeløp) - renter)
+    termin = np.where(kol(serie), avdrag + renter, kol(terminbeløp))
+    avdrag = np.where(avdragsfri_mnd, 0.0, avdrag)
+    termin = np.where(avdragsfri_mnd, renter, termin)
+
+    utenfor = m >= kol(n)
+    plan = {
+        "restgjeld": restgjeld,
+        "avdrag": avdrag,
+        "renter": renter,
+        "termin": termin,
+    }
+    for arr in plan.values():
+        arr[utenfor] = np.nan
+    plan["antall_mnd"] = n
+    return plan
+
+
+def restgjeld_matrise(lån, rente, løpetid, avdragsfri, lånetype, måneder: int | None = None) -> np.ndarray:
+    """Bare restgjelden, for mange lån: (scenario × måned 0..M), der måned 0 er lånebeløpet.
+
+    Billigere enn nedbetalingsplan_matrise når renter og termin ikke trengs.
+    Etter lånets slutt er restgjelden 0 (ikke NaN).
+    """
+    lån, rente, løpetid, avdragsfri, lånetype = np.broadcast_arrays(
+        _kolonne(lån), _kolonne(rente), _kolonne(løpetid), _kolonne(avdragsfri), _kolonne(lånetype, dtype=object)
+    )
+    n, af, r, n_avdrag_sikker, _annuitet, serie, terminbeløp = _lånparametre(lån, rente, løpetid, avdragsfri, lånetype)
+    M = int(n.max(initial=0)) if måneder is None else int(måneder)
+    k = np.maximum(np.arange(M + 1)[None, :] - af[:, None], 0)
+    restgjeld = _saldo(k, lån[:, None], r[:, None], terminbeløp[:, None], serie[:, None], n_avdrag_sikker[:, None])
+    restgjeld[np.arange(M + 1)[None, :] > n[:, None]] = 0.0
+    restgjeld[:, 0] = np.where(n > 0, lån, 0.0)
+    return restgjeld
+
+
+def nedbetalingsplan(lån, rente, løpetid, avdragsfri, lånetype) -> dict[str, np.ndarray]:
+    """Returnerer restgjeld, avdrag, renter og termin som arrays (én verdi pr. måned)."""
+    plan = nedbetalingsplan_matrise(lån, rente, løpetid, avdragsfri, lånetype)
+    return {k: plan[k][0] for k in ("restgjeld", "avdrag", "renter", "termin")}
+
+
+def netto_cashflow(termin: np.ndarray, leie, drift_mnd, eierform) -> np.ndarray:
+    """Netto cashflow pr. måned; AS får forenklet skatt på positive måneder.
+
+    For matriser sendes leie/drift_mnd/eierform som kolonner (scenario × 1).
+    """
+    netto = np.asarray(leie, dtype=float) - np.asarray(drift_mnd, dtype=float) - termin
+    as_mask = (np.asarray(eierform, dtype=object) == "AS") & (netto > 0)
+    return np.where(as_mask, netto * (1 - AS_SKATTESATS), netto)
+
+
+def beregn_lån(lån, rente, løpetid, avdragsfri, lånetype, leie, drift_mnd, eierform):
+    """Returnerer df med månedsrader + akkumulert netto cashflow.
+
+    Samme tall som den gamle løkken innenfor TOLERANSE_REL × lån.
+    """
+    plan = nedbetalingsplan(lån, rente, løpetid, avdragsfri, lånetype)
+    netto = netto_cashflow(plan["termin"], leie, drift_mnd, eierform)
+    akk_cf = np.cumsum(netto)
+    akk = float(akk_cf[-1]) if len(akk_cf) else 0.0
+
+    return pd.DataFrame({
+        "Måned": np.arange(1, len(netto) + 1),
+        "Restgjeld": plan["restgjeld"],
+        "Avdrag": plan["avdrag"],
+        "Renter": plan["renter"],
+        "Netto cashflow": netto,
+        "Akk. cashflow": akk_cf,
+    }), akk
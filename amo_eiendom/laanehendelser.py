@@ -0,0 +1,504 @@
+"""Hendelsesstyrt lånemotor: renteendringer, fastrenteperioder, ekstra innbetalinger,
+leieendringer og refinansiering.
+
+Tidslinjen deles i segmenter der alt er fast (rente, terminbeløp/avdrag, løpende
+ekstra innbetaling, leie). Innenfor et segment har restgjeld, sum renter og
+akkumulert netto lukket form, så oppsettet koster O(hendelser), ikke O(måneder).
+Månedstabellen lages først ved behov, som differanser av de kumulative formlene.
+
+    forløp = beregn_lån_hendelser(4_000_000, 5.0, 25, 0, "Annuitetslån", 20_000, 3_000, "Privat", [
+        Fastrente(måned=1, måneder=36, rente=4.2),
+        Renteendring(måned=13, rente=5.5),        # gjelder først når fastrenten løper ut
+        Ekstrainnbetaling(måned=24, beløp=200_000),
+        Refinansiering(måned=121, rente=4.8, løpetid=15, beløp=3_500_000, gebyr=5_000),
+    ])
+    forløp.akk_ved([12, 60, 120])   # uten månedstabell
+    forløp.tabell()                 # samme kolonner som beregn_lån, pluss Ekstra og Rente (%)
+
+Regler:
+- Måneder er 1-baserte som i månedstabellen; en hendelse gjelder fra og med sin måned.
+- Annuitetslån regnes om over gjenværende løpetid når renten endres; serielån beholder avdraget.
+- Ekstra innbetalinger trekkes fra restgjelden før månedens renter. Med `forkort=True`
+  beholdes terminbeløpet og løpetiden blir kortere, ellers beholdes løpetiden og terminen
+  synker. Løpende (månedlige) innbetalinger forkorter alltid løpetiden.
+- Renteendringer i en fastrenteperiode gjelder fra periodens slutt.
+- Refinansiering erstatter lånet: nytt beløp (standard: restgjelden), ny rente, løpetid,
+  lånetype og avdragsfrihet. Mellomlegget minus gebyr går til (eller fra) kontantstrømmen.
+- Ekstra innbetalinger, uttak og gebyr regnes ikke med i den forenklede AS-skatten.
+"""
+import math
+from dataclasses import MISSING, asdict, dataclass, fields
+
+import numpy as np
+import pandas as pd
+
+from .laan import AS_SKATTESATS
+
+LÅNETYPER = ("Annuitetslån", "Serielån")
+
+
+@dataclass(frozen=True)
+class Renteendring:
+    måned: int
+    rente: float  # ny flytende rente i prosent
+
+
+@dataclass(frozen=True)
+class Fastrente:
+    måned: int
+    måneder: int
+    rente: float
+
+
+@dataclass(frozen=True)
+class Ekstrainnbetaling:
+    måned: int
+    beløp: float
+    til_måned: int | None = None  # None: engangsbeløp; ellers hver `hver`. måned t.o.m. til_måned
+    hver: int = 1
+    forkort: bool = True          # gjelder engangsbeløp; løpende innbetalinger forkorter alltid
+
+
+@dataclass(frozen=True)
+class Leieendring:
+    måned: int
+    leie: float
+
+
+@dataclass(frozen=True)
+class Refinansiering:
+    måned: int
+    rente: float
+    løpetid: int                  # år
+    lånetype: str = "Annuitetslån"
+    avdragsfri: int = 0           # år
+    beløp: float | None = None    # None: restgjelden
+    gebyr: float = 0.0
+
+
+HENDELSESTYPER = {
+    "renteendring": Renteendring,
+    "fastrente": Fastrente,
+    "ekstrainnbetaling": Ekstrainnbetaling,
+    "leieendring": Leieendring,
+    "refinansiering": Refinansiering,
+}
+_TYPENAVN = {klasse: navn for navn, klasse in HENDELSESTYPER.items()}
+
+Hendelse = Renteendring | Fastrente | Ekstrainnbetaling | Leieendring | Refinansiering
+
+
+def hendelse_fra_dict(d: dict) -> Hendelse:
+    """{"type": "renteendring", "måned": 37, "rente": 5.5} → Renteendring(37, 5.5).
+
+    Ukjente nøkler og tomme verdier (None/NaN, f.eks. fra en tabell) ignoreres.
+    """
+    type_ = str(d.get("type", "")).strip().lower()
+    if type_ not in HENDELSESTYPER:
+        raise ValueError(f"Ukjent hendelsestype {d.get('type')!r}; velg en av {', '.join(HENDELSESTYPER)}")
+    klasse = HENDELSESTYPER[type_]
+    verdier = {}
+    for f in fields(klasse):
+        v = d.get(f.name)
+        if v is None or (isinstance(v, float) and math.isnan(v)):
+            continue
+        if f.name in ("måned", "måneder", "til_måned", "hver", "løpetid", "avdragsfri"):
+            v = int(v)
+        elif f.name in ("rente", "beløp", "leie", "gebyr"):
+            v = float(v)
+        elif f.name == "forkort":
+            v = bool(v)
+        verdier[f.name] = v
+    mangler = [f.name for f in fields(klasse) if f.default is MISSING and f.name not in verdier]
+    if mangler:
+        raise ValueError(f"{type_} mangler {', '.join(mangler)}")
+    h = klasse(**verdier)
+    if h.måned < 1:
+        raise ValueError(f"{type_}: måned må være 1 eller senere")
+    if getattr(h, "rente", 0.0) < 0:
+        raise ValueError(f"{type_}: renten kan ikke være negativ")
+    if isinstance(h, Refinansiering) and h.lånetype not in LÅNETYPER:
+        raise ValueError(f"Ukjent lånetype {h.lånetype!r}")
+    return h
+
+
+def hendelse_til_dict(h: Hendelse) -> dict:
+    return {"type": _TYPENAVN[type(h)], **asdict(h)}
+
+
+def _annuitet(B: float, r: float, n: float) -> float:
+    """Terminbeløp som nedbetaler B over n (ev. ikke-hele) måneder."""
+    n = max(n, 1.0)
+    return B * r / (1 - (1 + r) ** -n) if r > 0 else B / n
+
+
+def _gjenstår(B: float, T: float, r: float, reserve: float) -> float:
+    """Måneder til B er nedbetalt med terminbeløp T (annuitet); `reserve` hvis T aldri holder."""
+    if B <= 0:
+        return 0.0
+    if r == 0:
+        return B / T if T > 0 else reserve
+    if T <= r * B:
+        return reserve
+    return math.log(T / (T - r * B)) / math.log1p(r)
+
+
+def _saldo(B0: float, r: float, ann: bool, T: float, A: float, E: float, k: int) -> float:
+    """Restgjeld etter k måneder i et segment (samme formel som i Låneforløp)."""
+    if not ann:
+        return max(B0 - k * (A + E), 0.0)
+    S = math.expm1(k * math.log1p(r)) / r if r > 0 else float(k)
+    return max(B0 * (1 + r * S) - (T + E) * S, 0.0)
+
+
+# Segmentkolonner: alt som er fast innenfor et segment
+_SEGMENTFELT = ("start", "k", "B0", "r", "ann", "T", "A", "E", "leie", "drift", "engang", "kontant")
+
+
+class Låneforløp:
+    """Segmentene for ett lån med hendelser, med kumulative størrelser på lukket form."""
+
+    def __init__(self, segmenter: list[dict], horisont: int, er_as: bool, nedbetalt_mnd: int | None):
+        self.horisont = int(horisont)
+        self.er_as = bool(er_as)
+        self.nedbetalt_mnd = nedbetalt_mnd
+        s = {f: np.array([seg[f] for seg in segmenter], dtype=float) for f in _SEGMENTFELT}
+        s["ann"] = s["ann"].astype(bool)
+        s["start"] = s["start"].astype(np.int64)
+        s["k"] = s["k"].astype(np.int64)
+        self._s = s
+        # Kumulative verdier ved starten av hvert segment
+        slutt = np.arange(len(segmenter))
+        self._akk_start = np.concatenate([[0.0], np.cumsum(self._kum("netto", slutt, s["k"]))])[:-1]
+        self._renter_start = np.concatenate([[0.0], np.cumsum(self._kum("renter", slutt, s["k"]))])[:-1]
+
+    def __len__(self) -> int:
+        return len(self._s["k"])
+
+    # ---------- kumulative formler pr. segment ----------
+
+    def _kum(self, hva: str, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        """Sum av `hva` over de j første månedene i segment i (j = 0..k)."""
+        s = self._s
+        B0, r, ann, T, A, E = (s[f][i] for f in ("B0", "r", "ann", "T", "A", "E"))
+        j = np.asarray(j, dtype=float)
+        positiv = r > 0
+        r_sikker = np.where(positiv, r, 1.0)
+        S = np.where(positiv, np.expm1(j * np.log1p(r)) / r_sikker, j)  # Σ (1+r)^i, i < j
+        P = T + E   # annuitet: fast innbetaling
+        D = A + E   # lineær: fast nedbetaling
+
+        if hva == "restgjeld":
+            return np.maximum(np.where(ann, B0 * (1 + r * S) - P * S, B0 - j * D), 0.0)
+        renter = np.where(
+            ann,
+            np.where(positiv, r * B0 * S - P * (S - j), 0.0),
+            r * (j * B0 - D * j * (j - 1) / 2),
+        )
+        if hva == "renter":
+            return renter
+        avdrag = np.where(ann, T * j - renter, A * j)
+        if hva == "avdrag":
+            return avdrag
+        første = (j >= 1).astype(float)
+        if hva == "ekstra":
+            return E * j + s["engang"][i] * første
+        # Driftsnetto før skatt: c + d·(m-1) for måned m (konstant for annuitet)
+        c = s["leie"][i] - s["drift"][i] - np.where(ann, T, A + r * B0)
+        d = np.where(ann, 0.0, r * D)
+        x = j * c + d * j * (j - 1) / 2
+        if self.er_as:
+            # Skatt på måneder med positiv netto; netto er ikke-synkende, så det er en hale
+            d_sikker = np.where(d > 0, d, 1.0)
+            j0 = np.where(c > 0, 1.0, np.where(d > 0, np.floor(1 - c / d_sikker) + 1, np.inf))
+            før = np.minimum(j, j0 - 1)
+            x = x - AS_SKATTESATS * (x - (før * c + d * før * (før - 1) / 2))
+        return x - E * j + (s["kontant"][i] - s["engang"][i]) * første
+
+    def _finn(self, måneder) -> tuple[np.ndarray, np.ndarray]:
+        """(segment, måneder inn i segmentet) for måned m (1-basert, etter m måneder)."""
+        m = np.clip(np.asarray(måneder, dtype=np.int64), 0, self.horisont)
+        i = np.clip(np.searchsorted(self._s["start"], m - 1, side="right") - 1, 0, max(len(self) - 1, 0))
+        return i, m - self._s["start"][i]
+
+    # ---------- oppslag uten månedstabell ----------
+
+    def akk_ved(self, måneder) -> np.ndarray:
+        """Akkumulert netto cashflow etter måned m (m = 0 gir 0)."""
+        if not len(self):
+            return np.zeros(np.shape(måneder))
+        i, j = self._finn(måneder)
+        return np.where(np.asarray(måneder) > 0, self._akk_start[i] + self._kum("netto", i, j), 0.0)
+
+    def renter_ved(self, måneder) -> np.ndarray:
+        """Sum renter t.o.m. måned m."""
+        if not len(self):
+            return np.zeros(np.shape(måneder))
+        i, j = self._finn(måneder)
+        return np.where(np.asarray(måneder) > 0, self._renter_start[i] + self._kum("renter", i, j), 0.0)
+
+    def restgjeld_ved(self, måneder) -> np.ndarray:
+        """Restgjeld etter måned m."""
+        if not len(self):
+            return np.zeros(np.shape(måneder))
+        i, j = self._finn(måneder)
+        return self._kum("restgjeld", i, j)
+
+    @property
+    def akk(self) -> float:
+        return float(self.akk_ved(self.horisont))
+
+    @property
+    def renter_total(self) -> float:
+        return float(self.renter_ved(self.horisont))
+
+    def første_måned(self) -> dict:
+        """Som kpi.first_month_kpis."""
+        if not len(self):
+            return {"termin": 0.0, "netto": 0.0}
+        null, en = np.array([0]), np.array([1])
+        termin = self._kum("renter", null, en) + self._kum("avdrag", null, en)
+        return {"termin": float(termin[0]), "netto": float(self.akk_ved(1))}
+
+    def break_even_mnd(self) -> int | None:
+        """Første måned med akkumulert netto ≥ 0 (som kpi.break_even_month).
+
+        Netto kan skifte fortegn ved hver hendelse, så hvert segment sjekkes: innenfor et
+        segment er netto ikke-synkende, og akk er ≥ 0 et sted i segmentet hvis og bare hvis
+        den er det i starten eller slutten av det; første treff finnes med halvering.
+        """
+        s = self._s
+        for i in range(len(self)):
+            k = int(s["k"][i])
+            ii = np.full(2, i)
+            a0, a1 = self._akk_start[i] + self._kum("netto", ii, np.array([1, k]))
+            if a0 >= 0:
+                return int(s["start"][i]) + 1
+            if a1 < 0:
+                continue
+            lo, hi = 1, k  # akk(lo) < 0 ≤ akk(hi)
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if self._akk_start[i] + self._kum("netto", np.array([i]), np.array([mid]))[0] >= 0:
+                    hi = mid
+                else:
+                    lo = mid
+            return int(s["start"][i]) + hi
+        return None
+
+    def leie_serie(self) -> np.ndarray:
+        """Leie pr. måned over horisonten, med leieendringene."""
+        return np.repeat(self._s["leie"], self._s["k"])[:self.horisont]
+
+    # ---------- tabeller ----------
+
+    def tabell(self) -> pd.DataFrame:
+        """Månedstabell med samme kolonner som beregn_lån, pluss Ekstra og Rente (%)."""
+        m = np.arange(1, self.horisont + 1)
+        if not len(self):
+            return pd.DataFrame({k: pd.Series(dtype=float) for k in
+                                 ("Måned", "Restgjeld", "Avdrag", "Renter", "Ekstra", "Rente (%)",
+                                  "Netto cashflow", "Akk. cashflow")})
+        i, j = self._finn(m)
+
+        def mnd(hva):
+            return self._kum(hva, i, j) - self._kum(hva, i, j - 1)
+
+        akk = self._akk_start[i] + self._kum("netto", i, j)
+        return pd.DataFrame({
+            "Måned": m,
+            "Restgjeld": self._kum("restgjeld", i, j),
+            "Avdrag": mnd("avdrag"),
+            "Renter": mnd("renter"),
+            "Ekstra": mnd("ekstra"),
+            "Rente (%)": self._s["r"][i] * 1200,
+            "Netto cashflow": mnd("netto"),
+            "Akk. cashflow": akk,
+        })
+
+    def segmenttabell(self) -> pd.DataFrame:
+        """Én rad pr. segment: periode, rente, terminbeløp og summer."""
+        s = self._s
+        i = np.arange(len(self))
+        null = np.zeros(len(self), dtype=np.int64)
+        termin_1 = self._kum("renter", i, null + 1) + self._kum("avdrag", i, null + 1)
+        return pd.DataFrame({
+            "Fra mnd": s["start"] + 1,
+            "Til mnd": s["start"] + s["k"],
+            "Måneder": s["k"],
+            "Rente (%)": s["r"] * 1200,
+            "Type": np.where(s["ann"], "annuitet", np.where(s["A"] + s["E"] > 0, "serie", "renter")),
+            "Restgjeld start": s["B0"],
+            "Restgjeld slutt": self._kum("restgjeld", i, s["k"]),
+            "Termin (første)": termin_1,
+            "Renter": self._kum("renter", i, s["k"]),
+            "Avdrag": self._kum("avdrag", i, s["k"]),
+            "Ekstra": self._kum("ekstra", i, s["k"]),
+            "Leie": s["leie"],
+            "Netto": self._kum("netto", i, s["k"]),
+        })
+
+
+def _handlinger(hendelser, leie) -> list[tuple]:
+    """Hendelser → (t, rekkefølge, handling, verdier), t 0-basert. Leieserier blir leieendringer."""
+    ut = []
+    for h in hendelser:
+        h = hendelse_fra_dict(h) if isinstance(h, dict) else h
+        t = int(h.måned) - 1
+        if isinstance(h, Refinansiering):
+            ut.append((t, 0, "refinans", h))
+        elif isinstance(h, Fastrente):
+            ut.append((t, 2, "fast_start", float(h.rente)))
+            ut.append((t + int(h.måneder), 1, "fast_slutt", None))
+        elif isinstance(h, Renteendring):
+            ut.append((t, 1, "flyt", float(h.rente)))
+        elif isinstance(h, Ekstrainnbetaling):
+            if h.til_måned is None:
+                ut.append((t, 3, "ekstra", (float(h.beløp), h.forkort)))
+            elif int(h.hver) <= 1:
+                ut.append((t, 3, "løpende", float(h.beløp)))
+                ut.append((int(h.til_måned), 3, "løpende", -float(h.beløp)))
+            else:
+                ut += [(m - 1, 3, "ekstra", (float(h.beløp), h.forkort))
+                       for m in range(int(h.måned), int(h.til_måned) + 1, int(h.hver))]
+        elif isinstance(h, Leieendring):
+            ut.append((t, 4, "leie", float(h.leie)))
+    if np.ndim(leie):
+        serie = np.asarray(leie, dtype=float)
+        endret = np.flatnonzero(np.diff(serie)) + 1
+        ut += [(int(t), 4, "leie", float(serie[t])) for t in endret]
+    ut.sort(key=lambda x: (x[0], x[1]))
+    return ut
+
+
+def beregn_lån_hendelser(lån, rente, løpetid, avdragsfri, lånetype, leie, drift_mnd, eierform,
+                         hendelser=(), måneder: int | None = None) -> Låneforløp:
+    """Som laan.beregn_lån, men med en tidslinje av hendelser (se modulteksten).
+
+    `leie` kan være fast eller en serie pr. måned (som fra en leieliste); serien blir
+    leieendringer der verdien skifter. Horisonten er lånets løpetid, forlenget hvis en
+    refinansiering løper lenger, eller `måneder`. Uten hendelser gir tabellen samme tall
+    som beregn_lån innenfor TOLERANSE_REL × lån.
+    """
+    if float(rente) < 0:
+        raise ValueError("Renten kan ikke være negativ")
+    handlinger = _handlinger(hendelser, leie)
+    horisont = int(løpetid) * 12 if måneder is None else int(måneder)
+    if måneder is None:
+        for t, _, navn, h in handlinger:
+            if navn == "refinans" and t < horisont:
+                horisont = max(horisont, t + int(h.løpetid) * 12)
+
+    B = float(lån)
+    r_flyt = float(rente) / 1200
+    r_fast = None
+    type_ = lånetype
+    slutt = int(løpetid) * 12       # kontraktens siste måned (eksklusiv)
+    af_til = int(avdragsfri) * 12   # første avdragsmåned
+    amortiserer = False
+    T = A = 0.0
+    E = 0.0                         # løpende ekstra innbetaling pr. måned
+    leie_nå = float(leie[0]) if np.ndim(leie) else float(leie)
+    drift = float(drift_mnd)
+    nedbetalt_mnd = None
+
+    def r_nå():
+        return r_fast if r_fast is not None else r_flyt
+
+    def gjenstår():
+        return _gjenstår(B, T, r_nå(), max(slutt - t, 1)) if type_ == "Annuitetslån" else (B / A if A > 0 else 0.0)
+
+    segmenter = []
+    t, h_idx = 0, 0
+    while t < horisont:
+        engang = kontant = 0.0
+        while h_idx < len(handlinger) and handlinger[h_idx][0] <= t:
+            _, _, navn, v = handlinger[h_idx]
+            h_idx += 1
+            if navn == "refinans":
+                nytt = B if v.beløp is None else float(v.beløp)
+                kontant += nytt - B - float(v.gebyr)
+                B, type_ = nytt, v.lånetype
+                r_flyt, r_fast = float(v.rente) / 1200, None
+                slutt, af_til = t + int(v.løpetid) * 12, t + int(v.avdragsfri) * 12
+                amortiserer = False
+                if B > 0:
+                    nedbetalt_mnd = None
+            elif navn in ("flyt", "fast_start", "fast_slutt"):
+                n_rest = gjenstår() if amortiserer else 0.0
+                if navn == "flyt":
+                    r_flyt = v / 1200
+                else:
+                    r_fast = v / 1200 if navn == "fast_start" else None
+                if amortiserer and type_ == "Annuitetslån" and B > 0:
+                    T = _annuitet(B, r_nå(), n_rest)
+            elif navn == "ekstra":
+                beløp, forkort = v
+                beløp = min(beløp, B)
+                if beløp > 0:
+                    n_rest = gjenstår() if amortiserer else 0.0
+                    B -= beløp
+                    engang += beløp
+                    if B <= 0:
+                        nedbetalt_mnd = t + 1
+                    if amortiserer and not forkort and B > 0:
+                        if type_ == "Annuitetslån":
+                            T = _annuitet(B, r_nå(), n_rest)
+                        else:
+                            A = B / max(n_rest, 1.0)
+            elif navn == "løpende":
+                E = max(E + v, 0.0)
+            elif navn == "leie":
+                leie_nå = v
+        if not amortiserer and t >= af_til and B > 0:
+            amortiserer = True
+            n_avdrag = slutt - t
+            if n_avdrag > 0:
+                T = _annuitet(B, r_nå(), n_avdrag) if type_ == "Annuitetslån" else 0.0
+                A = B / n_avdrag if type_ == "Serielån" else 0.0
+            else:
+                # Avdragsfri hele løpetiden: bare renter, som i beregn_lån
+                T, A, type_ = 0.0, 0.0, "Serielån"
+
+        neste = handlinger[h_idx][0] if h_idx < len(handlinger) else horisont
+        if not amortiserer and af_til > t:
+            neste = min(neste, af_til)
+        k = min(neste, horisont) - t
+        r = r_nå()
+        e = E if B > 0 else 0.0
+        ann = amortiserer and type_ == "Annuitetslån" and B > 0
+        felles = dict(r=r, leie=leie_nå, drift=drift, engang=engang, kontant=kontant)
+
+        if B <= 0:
+            segmenter.append(dict(start=t, k=k, B0=0.0, ann=False, T=0.0, A=0.0, E=0.0, **felles))
+            t += k
+            continue
+
+        # Nedbetalt innenfor segmentet? Fulle måneder først, så en siste måned med resten.
+        a_nå = A if amortiserer and type_ == "Serielån" else 0.0
+        if ann:
+            P = T + e
+            k_null = _gjenstår(B, P, r, math.inf)
+        else:
+            P = a_nå + e
+            k_null = B / P if P > 0 else math.inf
+        if k_null == math.inf or math.ceil(k_null - 1e-9) > k:
+            segmenter.append(dict(start=t, k=k, B0=B, ann=ann, T=T if ann else 0.0, A=a_nå, E=e, **felles))
+            B = _saldo(B, r, ann, T, a_nå, e, k)
+            t += k
+            continue
+
+        hele = int(math.floor(k_null + 1e-9))
+        if hele > 0:
+            segmenter.append(dict(start=t, k=hele, B0=B, ann=ann, T=T if ann else 0.0, A=a_nå, E=e, **felles))
+            B = _saldo(B, r, ann, T, a_nå, e, hele)
+            t += hele
+            felles = dict(felles, engang=0.0, kontant=0.0)
+        if B > 1e-6 and t < horisont:
+            # Siste måned: resten av lånet, fordelt på ordinært avdrag og ekstra
+            ordinært = min(B, T - r * B if ann else a_nå)
+            segmenter.append(dict(start=t, k=1, B0=B, ann=False, T=0.0, A=ordinært, E=B - ordinært, **felles))
+            t += 1
+        B = 0.0
+        nedbetalt_mnd = t
+    return Låneforløp(segmenter, horisont, eierform == "AS", nedbetalt_mnd)
@@ -0,0 +1,50 @@
+"""Lagring av autosave og profiler som JSON-filer."""
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def load_json(path: Path) -> dict:
+    """Innholdet i en JSON-fil; {} når filen mangler eller ikke er gyldig JSON.
+
+    Andre feil (f.eks. manglende tilgang) sendes videre til kalleren.
+    """
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_json(path: Path, data: dict):
+    """Skriver `data` som JSON; skrivefeil (OSError) sendes videre til kalleren."""
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+@contextmanager
+def fillås(path: Path):
+    """Eksklusiv lås på tvers av prosesser, holdt på `<path>.lock` mens blokken kjører.
+
+    Låsen er rådgivende: den beskytter bare mot andre som også tar den.
+    """
+    lås = Path(path).with_name(Path(path).name + ".lock")
+    fd = os.open(lås, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        yield
+    finally:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.close(fd)
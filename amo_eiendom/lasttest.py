@@ -0,0 +1,194 @@
+"""Lasttest av lagringen med mange samtidige sesjoner, som på en delt server.
+
+    python -m amo_eiendom.lasttest                         # 20 sesjoner i tråder
+    python -m amo_eiendom.lasttest --prosesser --sesjoner 40
+    python -m amo_eiendom.lasttest --naiv                  # lagre() uten fletting, til sammenligning
+
+Hver sesjon autosaver til navnerommet til sin bruker (to sesjoner pr. bruker
+som standard, som to faner) og åpner, endrer og lagrer profiler fra et lite,
+felles utvalg, slik at de samme profilene redigeres samtidig. Hver sesjon
+endrer sin egen nøkkel, så etterpå kan det sjekkes at ingen skriving gikk tapt.
+Avslutter med kode 1 hvis noe gikk tapt.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from .autosave import Autosave
+from .modeller import Eiendomsinput
+from .navnerom import Navnerom
+from .profilbase import ProfilDatabase
+
+SESJONER = 20
+SESJONER_PR_BRUKER = 2
+PROFILER = 5
+SKRIVINGER = 50
+TENKETID_S = 0.002
+
+
+def _bruker(nr: int, pr_bruker: int) -> str:
+    return f"bruker{nr // pr_bruker:03d}"
+
+
+def _sesjon(nr: int, rot: str, pr_bruker: int, profilnavn: list[str], skrivinger: int, naiv: bool,
+            tenketid_s: float) -> dict:
+    """Én simulert sesjon. Kjøres i en tråd eller en egen prosess."""
+    rng = random.Random(nr)
+    bruker = _bruker(nr, pr_bruker)
+    autosave = Autosave(Navnerom(Path(rot), bruker).sti("autosave.json"), debounce_s=0.0, komprimer_etter=10)
+    db = ProfilDatabase(Path(rot) / "profiles.sqlite3")
+    nøkkel = f"økt{nr:03d}"
+
+    persist = autosave.last()
+    latens = {"autosave": [], "profil": []}
+    sist_skrevet: dict[str, int] = {}
+    flettinger = konflikter = omforsøk = 0
+    for i in range(skrivinger):
+        persist[nøkkel] = i
+        persist.setdefault("felles", {})[nøkkel] = i
+        start = time.perf_counter()
+        autosave.registrer(persist)
+        latens["autosave"].append(time.perf_counter() - start)
+
+        navn = profilnavn[rng.randrange(len(profilnavn))]
+        start = time.perf_counter()
+        profil, versjon, _ = db.hent_versjon(navn)
+        endret = {**profil, "lasttest": {**profil.get("lasttest", {}), nøkkel: i}}
+        time.sleep(rng.uniform(0, tenketid_s))  # bruker redigerer mens andre lagrer
+        if naiv:
+            db.lagre(navn, endret, bruker)
+        else:
+            r = db.lagre_flettet(navn, endret, profil, versjon, bruker)
+            flettinger += r.flettet
+            konflikter += len(r.konflikter)
+            omforsøk += r.forsøk - 1
+        latens["profil"].append(time.perf_counter() - start)
+        sist_skrevet[navn] = i
+        time.sleep(rng.uniform(0, tenketid_s))
+    autosave.flush()
+    return {
+        "nr": nr,
+        "latens": latens,
+        "sist_skrevet": sist_skrevet,
+        "flettinger": flettinger,
+        "konflikter": konflikter,
+        "omforsøk": omforsøk,
+        "autosave_feil": autosave.statistikk()["siste_feil"],
+    }
+
+
+def _persentil(verdier: list[float], p: float) -> float:
+    verdier = sorted(verdier)
+    return verdier[min(int(p * len(verdier)), len(verdier) - 1)]
+
+
+def kjør(rot: Path, sesjoner: int = SESJONER, pr_bruker: int = SESJONER_PR_BRUKER, profiler: int = PROFILER,
+         skrivinger: int = SKRIVINGER, prosesser: bool = False, naiv: bool = False,
+         tenketid_s: float = TENKETID_S) -> dict:
+    """Kjører lasttesten i `rot` og sjekker at alle skrivinger finnes etterpå."""
+    db = ProfilDatabase(rot / "profiles.sqlite3")
+    profilnavn = [f"Lasttest {i + 1}" for i in range(profiler)]
+    db.lagre_mange({
+        navn: Eiendomsinput(prosjekt_navn=navn, kjøpesum=3_000_000 + 250_000 * i, leie=18_000 + 1_000 * i).til_profil()
+        for i, navn in enumerate(profilnavn)
+    })
+    versjon_før = {navn: db.hent_versjon(navn)[1] for navn in profilnavn}
+
+    utfører = ProcessPoolExecutor if prosesser else ThreadPoolExecutor
+    start = time.perf_counter()
+    with utfører(max_workers=sesjoner) as ex:
+        fremtider = [
+            ex.submit(_sesjon, nr, str(rot), pr_bruker, profilnavn, skrivinger, naiv, tenketid_s)
+            for nr in range(sesjoner)
+        ]
+        resultater = [f.result() for f in fremtider]
+    varighet = time.perf_counter() - start
+
+    # Autosave: hver sesjons siste verdi må finnes i brukerens fil
+    tapt_autosave = 0
+    for nr in range(sesjoner):
+        persist = Autosave(Navnerom(rot, _bruker(nr, pr_bruker)).sti("autosave.json")).last()
+        nøkkel = f"økt{nr:03d}"
+        tapt_autosave += persist.get(nøkkel) != skrivinger - 1
+        tapt_autosave += persist.get("felles", {}).get(nøkkel) != skrivinger - 1
+
+    # Profiler: hver sesjons siste verdi pr. profil må finnes, og hver lagring gir én ny versjon
+    tapt_profil = 0
+    lagringer = sesjoner * skrivinger
+    for navn in profilnavn:
+        profil, versjon, _ = db.hent_versjon(navn)
+        lagret = profil.get("lasttest", {})
+        for r in resultater:
+            if navn in r["sist_skrevet"]:
+                tapt_profil += lagret.get(f"økt{r['nr']:03d}") != r["sist_skrevet"][navn]
+        lagringer -= versjon - versjon_før[navn]
+
+    def _latens(type_: str) -> dict:
+        alle = [t for r in resultater for t in r["latens"][type_]]
+        return {"antall": len(alle), "median_ms": statistics.median(alle) * 1000,
+                "p95_ms": _persentil(alle, 0.95) * 1000, "maks_ms": max(alle) * 1000}
+
+    return {
+        "sesjoner": sesjoner,
+        "brukere": len({_bruker(nr, pr_bruker) for nr in range(sesjoner)}),
+        "profiler": profiler,
+        "skrivinger_pr_sesjon": skrivinger,
+        "modus": ("prosesser" if prosesser else "tråder") + (" (naiv)" if naiv else ""),
+        "varighet_s": varighet,
+        "operasjoner_pr_s": 2 * sesjoner * skrivinger / varighet,
+        "autosave": _latens("autosave"),
+        "profil": _latens("profil"),
+        "flettinger": sum(r["flettinger"] for r in resultater),
+        "konflikter": sum(r["konflikter"] for r in resultater),
+        "omforsøk": sum(r["omforsøk"] for r in resultater),
+        "autosave_feil": [r["autosave_feil"] for r in resultater if r["autosave_feil"]],
+        "tapt_autosave": tapt_autosave,
+        "tapt_profil": tapt_profil,
+        "manglende_versjoner": lagringer,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="amo_eiendom.lasttest", description="Lasttest av autosave og profiler.")
+    parser.add_argument("--sesjoner", type=int, default=SESJONER, help=f"samtidige sesjoner (standard: {SESJONER})")
+    parser.add_argument("--pr-bruker", type=int, default=SESJONER_PR_BRUKER,
+                        help="sesjoner som deler samme bruker/autosave (standard: 2)")
+    parser.add_argument("--profiler", type=int, default=PROFILER, help="antall profiler som deles (standard: 5)")
+    parser.add_argument("--skrivinger", type=int, default=SKRIVINGER, help="skrivinger pr. sesjon (standard: 50)")
+    parser.add_argument("--prosesser", action="store_true", help="én prosess pr. sesjon i stedet for tråder")
+    parser.add_argument("--naiv", action="store_true", help="lagre profiler med lagre() (siste skriver vinner)")
+    parser.add_argument("--rot", type=Path, default=None, help="katalog for filene (standard: midlertidig)")
+    parser.add_argument("--json", action="store_true", help="skriv resultatet som JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rot = args.rot or Path(tmp)
+        rot.mkdir(parents=True, exist_ok=True)
+        r = kjør(rot, args.sesjoner, args.pr_bruker, args.profiler, args.skrivinger, args.prosesser, args.naiv)
+
+    if args.json:
+        print(json.dumps(r, ensure_ascii=False, indent=2))
+    else:
+        print(f"{r['sesjoner']} sesjoner / {r['brukere']} brukere / {r['profiler']} profiler, {r['modus']}: "
+              f"{r['varighet_s']:.2f} s, {r['operasjoner_pr_s']:.0f} operasjoner/s")
+        for type_ in ("autosave", "profil"):
+            l = r[type_]
+            print(f"  {type_:<9} n={l['antall']:<6} median {l['median_ms']:.2f} ms · "
+                  f"p95 {l['p95_ms']:.2f} ms · maks {l['maks_ms']:.2f} ms")
+        print(f"  flettinger {r['flettinger']} · konflikter {r['konflikter']} · omforsøk {r['omforsøk']}")
+        print(f"  tapt: autosave {r['tapt_autosave']} · profil {r['tapt_profil']} · "
+              f"manglende versjoner {r['manglende_versjoner']}")
+        for feil in r["autosave_feil"]:
+            print(f"  autosave-feil: {feil}", file=sys.stderr)
+    tapt = r["tapt_autosave"] + r["tapt_profil"] + r["manglende_versjoner"]
+    return 1 if tapt or r["autosave_feil"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""Leieliste (rent roll) for eiendommer med mange enheter.
+
+Listen lagres kolonnevis i NumPy-arrays: leie, enhetstype (kategorikoder),
+kontraktsstart/-slutt (måneder) og ledighetsantakelse. Aggregeringen til
+leie pr. måned er vektorisert med differansearrays, O(enheter + måneder):
+
+- innenfor kontrakten gir enheten full leie,
+- utenfor kontrakten (før start, etter slutt, eller uten kontrakt) regnes
+  den som utleid på nytt til samme leie, minus ledigheten.
+
+Datoer har månedsoppløsning; en kontrakt som slutter 30.06 teller med juni.
+
+    liste = les_leieliste(Path("leieliste.csv"))
+    leie = månedlig_leie(liste, "2026-01", 12 * 25)
+"""
+import hashlib
+import io
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .bilder import _skriv_atomisk
+from .tall import norske_tall
+
+# Kolonnenavn som godtas ved import (små bokstaver); første navn er det interne
+KOLONNER = {
+    "enhet": ("enhet", "unit", "unit_id", "id", "leilighet", "rom"),
+    "type": ("type", "enhetstype", "unit_type"),
+    "leie": ("leie", "rent", "husleie", "månedsleie", "leie_mnd"),
+    "start": ("start", "leie_start", "lease_start", "fra"),
+    "slutt": ("slutt", "leie_slutt", "lease_end", "til"),
+    "ledighet": ("ledighet", "vacancy", "ledighet_pst"),
+}
+
+# Serien lagres bare til siste endring (resten er konstant), men aldri lenger enn dette
+MAKS_MÅNEDER = 50 * 12
+
+
+@dataclass(eq=False)
+class Leieliste:
+    """Én rad pr. enhet, lagret kolonnevis."""
+    enhet: np.ndarray      # str
+    type_kode: np.ndarray  # int16, indeks i `typer`
+    typer: tuple[str, ...]
+    leie: np.ndarray       # float64, kr/mnd
+    start: np.ndarray      # datetime64[M]; NaT = løper allerede
+    slutt: np.ndarray      # datetime64[M], inklusiv; NaT = uten sluttdato
+    ledighet: np.ndarray   # float64, andel 0–1 utenfor kontrakt
+
+    def __len__(self) -> int:
+        return len(self.leie)
+
+    @property
+    def hash(self) -> str:
+        """SHA-256 av innholdet (uavhengig av filformatet det ble lest fra)."""
+        h = hashlib.sha256()
+        for navn, arr in self._arrays().items():
+            h.update(navn.encode())
+            h.update(np.ascontiguousarray(arr).tobytes())
+        return h.hexdigest()
+
+    def _arrays(self) -> dict[str, np.ndarray]:
+        return {
+            "enhet": self.enhet.astype(str),
+            "type_kode": self.type_kode,
+            "typer": np.array(self.typer, dtype=str),
+            "leie": self.leie,
+            "start": self.start.astype("datetime64[M]").view(np.int64),
+            "slutt": self.slutt.astype("datetime64[M]").view(np.int64),
+            "ledighet": self.ledighet,
+        }
+
+    def til_bytes(self) -> bytes:
+        ut = io.BytesIO()
+        np.savez_compressed(ut, **self._arrays())
+        return ut.getvalue()
+
+    @classmethod
+    def fra_bytes(cls, data: bytes) -> "Leieliste":
+        with np.load(io.BytesIO(data), allow_pickle=False) as a:
+            return cls(
+                enhet=a["enhet"],
+                type_kode=a["type_kode"],
+                typer=tuple(a["typer"].tolist()),
+                leie=a["leie"],
+                start=a["start"].view("datetime64[M]"),
+                slutt=a["slutt"].view("datetime64[M]"),
+                ledighet=a["ledighet"],
+            )
+
+    def tabell(self) -> pd.DataFrame:
+        """Listen som DataFrame (for visning og eksport)."""
+        return pd.DataFrame({
+            "Enhet": self.enhet,
+            "Type": np.array(self.typer, dtype=object)[self.type_kode] if self.typer else "",
+            "Leie (kr/mnd)": self.leie,
+            "Start": self.start,
+            "Slutt": self.slutt,
+            "Ledighet": self.ledighet,
+        })
+
+    def oppsummering(self) -> pd.DataFrame:
+        """Antall enheter, sum og snitt leie og snitt ledighet pr. enhetstype."""
+        k = len(self.typer)
+        antall = np.bincount(self.type_kode, minlength=k)
+        leie = np.bincount(self.type_kode, weights=self.leie, minlength=k)
+        ledighet = np.bincount(self.type_kode, weights=self.ledighet, minlength=k)
+        med_slutt = np.bincount(self.type_kode, weights=~np.isnat(self.slutt), minlength=k)
+        sikker = np.maximum(antall, 1)
+        return pd.DataFrame({
+            "Type": list(self.typer),
+            "Enheter": antall,
+            "Sum leie (kr/mnd)": leie,
+            "Snitt leie (kr/mnd)": leie / sikker,
+            "Snitt ledighet": ledighet / sikker,
+            "Med sluttdato": med_slutt.astype(int),
+        })
+
+
+def _måned(x) -> np.datetime64:
+    return np.datetime64(pd.Timestamp(x).strftime("%Y-%m"), "M")
+
+
+def _finn_kolonner(df: pd.DataFrame) -> dict[str, str]:
+    navn = {str(c).strip().lower(): c for c in df.columns}
+    funnet = {}
+    for intern, alias in KOLONNER.items():
+        for a in alias:
+            if a in navn:
+                funnet[intern] = navn[a]
+                break
+    if "leie" not in funnet:
+        raise ValueError(f"Leielisten mangler leiekolonne (en av: {', '.join(KOLONNER['leie'])})")
+    return funnet
+
+
+def fra_dataframe(df: pd.DataFrame, ledighet_standard: float = 0.0) -> Leieliste:
+    """Leieliste fra en tabell med kolonnene i KOLONNER (bare leie er påkrevd).
+
+    Ledighet er prosent i kolonnen ledighet_pst og i celler med '%'; ellers tolkes verdier
+    over 1 som prosent og resten som andel. Tomme ledighetsceller får `ledighet_standard`.
+    """
+    kol = _finn_kolonner(df)
+    n = len(df)
+    leie = norske_tall(df[kol["leie"]])
+    if np.isnan(leie).any() or (leie < 0).any():
+        rader = np.flatnonzero(np.isnan(leie) | (leie < 0))[:5] + 1
+        raise ValueError(f"Ugyldig leie i rad {', '.join(map(str, rader))}")
+
+    if "ledighet" in kol:
+        rå = df[kol["ledighet"]]
+        ledighet = norske_tall(rå)
+        # Prosent når kolonnen eller cellen sier det ('ledighet_pst', '0,5 %'); ellers er
+        # verdier over 1 prosent og resten andeler
+        prosent = np.full(n, str(kol["ledighet"]).strip().lower() == "ledighet_pst")
+        if rå.dtype.kind not in "biuf":
+            prosent |= rå.astype(str).str.contains("%", regex=False).to_numpy(dtype=bool)
+        ledighet = np.where(prosent | (ledighet > 1), ledighet / 100, ledighet)
+        ledighet = np.where(np.isnan(ledighet), ledighet_standard, ledighet)
+    else:
+        ledighet = np.full(n, float(ledighet_standard))
+
+    if "type" in kol:
+        koder, typer = pd.factorize(df[kol["type"]].fillna("").astype(str).str.strip(), sort=True)
+        typer = tuple(typer)
+    else:
+        koder, typer = np.zeros(n, dtype=np.int64), ("",)
+
+    def datoer(intern):
+        if intern not in kol:
+            return np.full(n, np.datetime64("NaT"), dtype="datetime64[M]")
+        kolonne = df[kol[intern]]
+        # ISO-datoer (ÅÅÅÅ-MM-DD) først; dayfirst bare for resten (DD.MM.ÅÅÅÅ), ellers byttes dag og måned
+        d = pd.to_datetime(kolonne, errors="coerce", format="ISO8601")
+        resten = d.isna() & kolonne.notna()
+        if resten.any():
+            d[resten] = pd.to_datetime(kolonne[resten], errors="coerce", dayfirst=True, format="mixed")
+        return d.to_numpy(dtype="datetime64[ns]").astype("datetime64[M]")
+
+    enhet = (df[kol["enhet"]].astype(str).to_numpy() if "enhet" in kol
+             else np.char.add("enhet_", np.arange(1, n + 1).astype(str)))
+    return Leieliste(
+        enhet=np.asarray(enhet, dtype=str),
+        type_kode=koder.astype(np.int16),
+        typer=typer,
+        leie=leie,
+        start=datoer("start"),
+        slutt=datoer("slutt"),
+        ledighet=np.clip(ledighet, 0.0, 1.0),
+    )
+
+
+def les_leieliste(kilde: Path | bytes, filnavn: str = "", ledighet_standard: float = 0.0) -> Leieliste:
+    """Leser CSV (komma eller semikolon) eller JSON (liste av rader eller kolonner).
+
+    `kilde` er en filsti eller innholdet i en opplastet fil; formatet avgjøres
+    av filendelsen, ellers av første tegn.
+    """
+    if isinstance(kilde, (str, Path)):
+        filnavn = filnavn or str(kilde)
+        data = Path(kilde).read_bytes()
+    else:
+        data = kilde
+    tekst = data.decode("utf-8-sig")
+    er_json = filnavn.lower().endswith((".json", ".jsonl")) or tekst.lstrip()[:1] in ("[", "{")
+    if er_json:
+        if filnavn.lower().endswith(".jsonl"):
+            df = pd.DataFrame([json.loads(linje) for linje in tekst.splitlines() if linje.strip()])
+        else:
+            innhold = json.loads(tekst)
+            if isinstance(innhold, dict) and isinstance(innhold.get("enheter"), list):
+                innhold = innhold["enheter"]
+            df = pd.DataFrame(innhold)
+    else:
+        første = tekst.split("\n", 1)[0]
+        sep = ";" if første.count(";") > første.count(",") else ","
+        df = pd.read_csv(io.StringIO(tekst), sep=sep, dtype=str, skipinitialspace=True)
+    return fra_dataframe(df, ledighet_standard)
+
+
+def _indekser(liste: Leieliste, startdato, måneder: int) -> tuple[np.ndarray, np.ndarray]:
+    """Første og første etter siste kontraktsmåned som indekser i [0, måneder]."""
+    start0 = _måned(startdato)
+    s = np.where(np.isnat(liste.start), 0, (liste.start - start0).astype(np.int64))
+    e = np.where(np.isnat(liste.slutt), måneder, (liste.slutt - start0).astype(np.int64) + 1)
+    s = np.clip(s, 0, måneder)
+    e = np.clip(e, s, måneder)
+    return s, e
+
+
+def månedlig_leie(liste: Leieliste, startdato, måneder: int) -> np.ndarray:
+    """Forventet leie pr. måned (float64, lengde `måneder`) fra og med `startdato`."""
+    if måneder <= 0:
+        return np.zeros(0)
+    s, e = _indekser(liste, startdato, måneder)
+    etter = liste.leie * (1.0 - liste.ledighet)
+    tillegg = liste.leie - etter  # ekstra i kontraktsperioden
+    diff = (np.bincount(s, weights=tillegg, minlength=måneder + 1)
+            - np.bincount(e, weights=tillegg, minlength=måneder + 1))
+    return etter.sum() + np.cumsum(diff[:måneder])
+
+
+def leie_pr_type(liste: Leieliste, startdato, måneder: int) -> pd.DataFrame:
+    """Forventet leie pr. måned og enhetstype (måneder × typer)."""
+    k = max(len(liste.typer), 1)
+    s, e = _indekser(liste, startdato, måneder)
+    etter = liste.leie * (1.0 - liste.ledighet)
+    tillegg = liste.leie - etter
+    bredde = måneder + 1
+    kode = liste.type_kode.astype(np.int64)
+    diff = (np.bincount(kode * bredde + s, weights=tillegg, minlength=k * bredde)
+            - np.bincount(kode * bredde + e, weights=tillegg, minlength=k * bredde)).reshape(k, bredde)
+    grunn = np.bincount(kode, weights=etter, minlength=k)
+    matrise = grunn[:, None] + np.cumsum(diff[:, :måneder], axis=1)
+    return pd.DataFrame(matrise.T, index=pd.RangeIndex(1, måneder + 1, name="Måned"), columns=list(liste.typer) or [""])
+
+
+def leie_mnd_for_profil(liste: Leieliste, startdato) -> list[int]:
+    """Serien slik den lagres i profilen: hele kroner, kuttet etter siste endring.
+
+    Etter siste kontraktsstart/-slutt er leien konstant, så serien forlenges med
+    siste verdi (se Eiendomsinput.leie_serie).
+    """
+    serie = np.rint(månedlig_leie(liste, startdato, MAKS_MÅNEDER)).astype(np.int64)
+    endringer = np.flatnonzero(np.diff(serie))
+    lengde = int(endringer[-1]) + 2 if len(endringer) else 1
+    return serie[:lengde].tolist()
+
+
+class Leielistelager:
+    """Innholdsadressert lager for leielister (komprimert .npz), som bilder.Bildelager."""
+
+    def __init__(self, rot: Path = Path("leielister")):
+        self.rot = Path(rot)
+
+    def _path(self, hash_: str) -> Path:
+        return self.rot / hash_[:2] / f"{hash_}.npz"
+
+    def __contains__(self, hash_: str) -> bool:
+        return bool(hash_) and self._path(hash_).exists()
+
+    def lagre(self, liste: Leieliste) -> str:
+        hash_ = liste.hash
+        if hash_ not in self:
+            _skriv_atomisk(self._path(hash_), liste.til_bytes())
+        return hash_
+
+    def hent(self, hash_: str) -> Leieliste | None:
+        if hash_ not in self:
+            return None
+        return Leieliste.fra_bytes(self._path(hash_).read_bytes())
@@ -0,0 +1,155 @@
+"""Målsøk: høyeste kjøpesum/rente eller laveste leie/egenkapital som når et mål.
+
+Målet er enten netto 1. mnd ≥ en terskel eller break-even innen N måneder.
+Begge er monotone i variablene, så løsningen er grensen for et sammenhengende
+område. Den finnes med vektorisert bisection: hver runde evaluerer et rutenett
+av kandidater i én kjøring av kpi_lukket og snevrer inn intervallet. Med 64
+punkter pr. runde holder 3–4 runder for kronepresisjon.
+"""
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+from .kalkulator import scenario
+from .kpi_lukket import lukkede_kpi
+from .modeller import DOKUMENTAVGIFT_SATS, Eiendomsinput
+
+MÅL = {
+    "netto_1": "Netto 1. mnd ≥ terskel",
+    "break_even": "Break-even innen N måneder",
+}
+
+# Variabel → (retning, presisjon). "maks": målet nås for alle verdier under løsningen.
+VARIABLER = {
+    "kjøpesum": ("maks", 1.0),
+    "leie": ("min", 1.0),
+    "egenkapital": ("min", 1.0),
+    "rente": ("maks", 0.001),
+}
+
+PUNKTER_PR_RUNDE = 64
+MAKS_RUNDER = 30
+
+
+@dataclass
+class Målsøkresultat:
+    variabel: str
+    mål: str
+    verdi: float | None  # None: målet nås ikke innenfor søkeområdet
+    nåverdi: float
+    runder: int
+    evalueringer: int
+    melding: str = ""
+
+    @property
+    def endring(self) -> float | None:
+        return None if self.verdi is None else self.verdi - self.nåverdi
+
+
+def _søkeområde(inp: Eiendomsinput, variabel: str) -> tuple[float, float]:
+    if variabel == "kjøpesum":
+        return 0.0, float(max(10 * inp.kjøpesum, 50_000_000))
+    if variabel == "leie":
+        return 0.0, float(max(10 * inp.effektiv_leie, 500_000))
+    if variabel == "egenkapital":
+        return 0.0, float(inp.total_investering)
+    return 0.0, 30.0
+
+
+def _nåverdi(inp: Eiendomsinput, variabel: str) -> float:
+    return float(inp.effektiv_leie if variabel == "leie" else getattr(inp, variabel))
+
+
+def _oppfylt(inp: Eiendomsinput, variabel: str, verdier: np.ndarray, mål: str, terskel: float, maks_mnd: int) -> np.ndarray:
+    """Målet nådd (bool) for hver kandidatverdi av `variabel`, alt annet likt."""
+    s = scenario(inp)
+    if variabel == "kjøpesum":
+        total = verdier + np.floor(verdier * DOKUMENTAVGIFT_SATS) + inp.oppussing_total
+        s["lån"] = np.maximum(total - int(inp.egenkapital), 0)
+    elif variabel == "egenkapital":
+        s["lån"] = np.maximum(inp.total_investering - verdier, 0)
+    else:
+        s[variabel] = verdier
+    kpi = lukkede_kpi(*s.values(), horisonter=())
+    if mål == "netto_1":
+        return kpi["netto_1"] >= terskel
+    be = kpi["break_even_mnd"]
+    return (be > 0) & (be <= maks_mnd)
+
+
+def målsøk(
+    inp: Eiendomsinput,
+    variabel: str,
+    mål: str = "netto_1",
+    terskel: float = 0.0,
+    maks_mnd: int = 120,
+    søkeområde: tuple[float, float] | None = None,
+) -> Målsøkresultat:
+    """Grenseverdien for `variabel` som akkurat når målet, alt annet likt.
+
+    Kjøpesum, leie og egenkapital finnes i hele kroner; rente med tre desimaler.
+    Med leieliste regnes snittleien første år (effektiv_leie) som fast leie.
+    Lånehendelser inngår ikke: søket gjelder grunnlånet.
+    """
+    if variabel not in VARIABLER:
+        raise ValueError(f"Ukjent variabel {variabel!r}; velg en av {', '.join(VARIABLER)}")
+    if mål not in MÅL:
+        raise ValueError(f"Ukjent mål {mål!r}; velg en av {', '.join(MÅL)}")
+    retning, presisjon = VARIABLER[variabel]
+    desimaler = 0 if presisjon >= 1 else 2
+    lo, hi = søkeområde or _søkeområde(inp, variabel)
+    nå = _nåverdi(inp, variabel)
+
+    # Søket går i hele steg av `presisjon` (k · presisjon), så svaret ligger på rutenettet
+    def rutepunkt(k):
+        return np.round(np.asarray(k, dtype=float) * presisjon, 6)
+
+    def oppfylt(k):
+        return _oppfylt(inp, variabel, rutepunkt(k), mål, terskel, maks_mnd)
+
+    def resultat(verdi, runder, evalueringer, melding=""):
+        return Målsøkresultat(variabel, mål, verdi, nå, runder, evalueringer, melding)
+
+    # Den "gode" enden av intervallet må nå målet, den andre ikke
+    lo, hi = float(np.ceil(lo / presisjon - 1e-9)), float(np.floor(hi / presisjon + 1e-9))
+    ender = oppfylt([lo, hi])
+    god, dårlig = (lo, hi) if retning == "maks" else (hi, lo)
+    ok_god, ok_dårlig = (ender[0], ender[1]) if retning == "maks" else (ender[1], ender[0])
+    if not ok_god:
+        return resultat(None, 0, 2, f"Målet nås ikke selv med {variabel} = {rutepunkt(god):,.{desimaler}f}")
+    if ok_dårlig:
+        return resultat(float(rutepunkt(dårlig)), 0, 2,
+                        f"Målet nås i hele søkeområdet (grense {rutepunkt(dårlig):,.{desimaler}f})")
+
+    # Invariant: `god` når målet, `dårlig` gjør det ikke; ferdig når de er nabopunkter
+    evalueringer, runder = 2, 0
+    while abs(dårlig - god) > 1 and runder < MAKS_RUNDER:
+        kandidater = np.unique(np.round(np.linspace(god, dårlig, PUNKTER_PR_RUNDE + 2)[1:-1]))
+        kandidater = kandidater[(kandidater != god) & (kandidater != dårlig)]
+        if not len(kandidater):
+            break
+        # np.unique sorterer stigende; rutenettet skal gå fra god mot dårlig
+        if god > dårlig:
+            kandidater = kandidater[::-1]
+        ok = oppfylt(kandidater)
+        evalueringer += len(kandidater)
+        runder += 1
+        # Siste kandidat som når målet, og første som ikke gjør det
+        n_ok = int(np.argmin(ok)) if not ok.all() else len(ok)
+        if n_ok:
+            god = float(kandidater[n_ok - 1])
+        if n_ok < len(kandidater):
+            dårlig = float(kandidater[n_ok])
+    return resultat(float(rutepunkt(god)), runder, evalueringer)
+
+
+def målsøk_alle(inp: Eiendomsinput, mål: str = "netto_1", terskel: float = 0.0, maks_mnd: int = 120) -> list[Målsøkresultat]:
+    """Målsøk for alle variablene i VARIABLER."""
+    return [målsøk(inp, v, mål, terskel, maks_mnd) for v in VARIABLER]
+
+
+def med_verdi(inp: Eiendomsinput, variabel: str, verdi: float) -> Eiendomsinput:
+    """Kopi av input med variabelen satt til løsningen (leie setter manuell totalleie, uten leieliste)."""
+    if variabel == "leie":
+        return replace(inp, leie=int(verdi), use_rooms_total=False, leie_mnd=[])
+    return replace(inp, **{variabel: float(verdi) if variabel == "rente" else int(verdi)})
@@ -0,0 +1,61 @@
+"""Forhåndskompilerte HTML-maler og vektorisert tallformatering for rapportene.
+
+Malene ligger i `maler/` og parses én gang ved import til en liste med
+faste tekstbiter og feltnavn. Rendering er da bare én `"".join(...)`.
+"""
+import re
+from pathlib import Path
+
+import numpy as np
+
+MAL_MAPPE = Path(__file__).with_name("maler")
+_FELT = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class Mal:
+    """En kompilert mal med `{{felt}}`-plassholdere."""
+
+    def __init__(self, tekst: str):
+        deler = _FELT.split(tekst)
+        # Annenhver del er tekst, annenhver er et feltnavn
+        self._tekst = deler[0::2]
+        self._felt = deler[1::2]
+        self.felt = frozenset(self._felt)
+
+    @classmethod
+    def fra_fil(cls, navn: str) -> "Mal":
+        return cls((MAL_MAPPE / navn).read_text(encoding="utf-8"))
+
+    def render(self, verdier: dict) -> str:
+        mangler = self.felt - verdier.keys()
+        if mangler:
+            raise KeyError(f"Mangler malfelt: {', '.join(sorted(mangler))}")
+        ut = [self._tekst[0]]
+        for felt, tekst in zip(self._felt, self._tekst[1:]):
+            ut.append(str(verdier[felt]))
+            ut.append(tekst)
+        return "".join(ut)
+
+
+def format_tusen(verdier) -> np.ndarray:
+    """Som `f"{x:,.0f}"` for en hel vektor om gangen (tusenskille med komma).
+
+    Avrunder likt som Python (halv til partall) og beholder fortegnet på
+    små negative tall, slik at "-0" blir skrevet likt som før.
+    """
+    x = np.rint(np.asarray(verdier, dtype=float))
+    negativ = np.signbit(x)
+    heltall = np.abs(x).astype(np.int64)
+    if heltall.size == 0:
+        return heltall.astype(str)
+    antall_grupper = (len(str(int(heltall.max()))) + 2) // 3
+    tekst = np.full(heltall.shape, "")
+    startet = np.zeros(heltall.shape, dtype=bool)
+    for k in range(antall_grupper - 1, -1, -1):
+        gruppe = (heltall // 1000**k) % 1000
+        øverst = ~startet & ((gruppe > 0) | (k == 0))
+        uten_null = np.char.mod("%d", gruppe)
+        del_ = np.where(øverst, uten_null, np.where(startet, np.char.add(",", np.char.zfill(uten_null, 3)), ""))
+        tekst = np.char.add(tekst, del_)
+        startet |= øverst
+    return np.where(negativ, np.char.add("-", tekst), tekst)
@@ -0,0 +1,216 @@
+"""Typede inn- og utdataobjekter for kalkulatoren."""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from .verdi import VERDISTIGNING_SATS
+
+DOKUMENTAVGIFT_SATS = 0.025
+
+OPPUSSING_STANDARD = {
+    "riving": 20000,
+    "bad": 120000,
+    "kjøkken": 100000,
+    "overflate": 30000,
+    "gulv": 40000,
+    "rørlegger": 25000,
+    "elektriker": 30000,
+    "utvendig": 20000,
+}
+
+DRIFT_STANDARD = {
+    "felleskostnader": 0,
+    "kommunale avgifter": 0,
+    "strøm": 0,
+    "internett": 0,
+    "forsikring": 0,
+    "vedlikehold": 0,
+    "husleie (kostnad)": 0,  # hvis aktuelt
+}
+
+LÅN_STANDARD = {
+    "egenkapital": 300000,
+    "rente": 5.0,
+    "løpetid": 25,
+    "avdragsfri": 2,
+    "lånetype": "Annuitetslån",
+    "eierform": "Privat",
+}
+
+VERDISTIGNING_STANDARD = VERDISTIGNING_SATS * 100  # % pr. år
+
+
+@dataclass
+class Eiendomsinput:
+    """Alt som trengs for å beregne og presentere én eiendom (samme felter som en profil)."""
+    prosjekt_navn: str = "Eiendomsprosjekt"
+    finn_url: str = ""
+    note: str = ""
+    cover_url: str = ""
+    cover_hash: str = ""  # nøkkel i bilder.Bildelager
+    cover_b64: str = ""   # gammelt format, bare for profiler som ikke er flyttet til bildelageret
+    # Kjøp/inntekter
+    kjøpesum: int = 4_000_000
+    leie: int = 22_000
+    use_rooms_total: bool = False
+    rooms_leie: dict[str, int] = field(default_factory=dict)
+    antall_rom: int = 0
+    # Fra importert leieliste: leie pr. måned fra leieliste_start; siste verdi gjelder videre
+    leie_mnd: list[int] = field(default_factory=list)
+    leieliste_hash: str = ""   # nøkkel i leieliste.Leielistelager
+    leieliste_start: str = ""  # første måned i leie_mnd, "ÅÅÅÅ-MM"
+    # Kostnader
+    oppussing: dict[str, int] = field(default_factory=lambda: OPPUSSING_STANDARD.copy())
+    drift_mnd: dict[str, int] = field(default_factory=lambda: DRIFT_STANDARD.copy())
+    # Lån
+    egenkapital: int = LÅN_STANDARD["egenkapital"]
+    rente: float = LÅN_STANDARD["rente"]
+    løpetid: int = LÅN_STANDARD["løpetid"]
+    avdragsfri: int = LÅN_STANDARD["avdragsfri"]
+    lånetype: str = LÅN_STANDARD["lånetype"]
+    eierform: str = LÅN_STANDARD["eierform"]
+    # Renteendringer, fastrente, ekstra innbetalinger, leieendringer, refinansiering (se laanehendelser)
+    lånehendelser: list[dict] = field(default_factory=list)
+    # Verdi
+    verdistigning: float = VERDISTIGNING_STANDARD  # % pr. år
+
+    @classmethod
+    def fra_profil(cls, p: dict, navn: str = "") -> "Eiendomsinput":
+        """Bygger input fra en lagret profil (samme standardverdier som ved lasting i appen)."""
+        return cls(
+            prosjekt_navn=p.get("prosjekt_navn", navn),
+            finn_url=p.get("finn_url", ""),
+            note=p.get("note", ""),
+            cover_url=p.get("cover_url", ""),
+            cover_hash=p.get("cover_hash", ""),
+            cover_b64=p.get("cover_b64", ""),
+            kjøpesum=int(p.get("kjøpesum", 0)),
+            leie=int(p.get("leie", 0)),
+            use_rooms_total=bool(p.get("use_rooms_total", False)),
+            rooms_leie=dict(p.get("rooms_leie", {})),
+            antall_rom=int(p.get("antall_rom", 0)),
+            leie_mnd=[int(x) for x in p.get("leie_mnd", [])],
+            leieliste_hash=p.get("leieliste_hash", ""),
+            leieliste_start=p.get("leieliste_start", ""),
+            oppussing=dict(p.get("oppussing", {})),
+            drift_mnd=dict(p.get("drift_mnd", {})),
+            egenkapital=int(p.get("egenkapital", LÅN_STANDARD["egenkapital"])),
+            rente=float(p.get("rente", LÅN_STANDARD["rente"])),
+            løpetid=int(p.get("løpetid", LÅN_STANDARD["løpetid"])),
+            avdragsfri=int(p.get("avdragsfri", LÅN_STANDARD["avdragsfri"])),
+            lånetype=p.get("lånetype", LÅN_STANDARD["lånetype"]),
+            eierform=p.get("eierform", LÅN_STANDARD["eierform"]),
+            lånehendelser=[dict(h) for h in p.get("lånehendelser", [])],
+            verdistigning=float(p.get("verdistigning", VERDISTIGNING_STANDARD)),
+        )
+
+    def til_profil(self) -> dict:
+        """Profil-payload slik den lagres i profiles.json."""
+        profil = {
+            "prosjekt_navn": self.prosjekt_navn,
+            "finn_url":      self.finn_url,
+            "note":          self.note,
+            "cover_url":     self.cover_url,
+            "cover_hash":    self.cover_hash,
+            # kjøp/inntekter
+            "kjøpesum":      int(self.kjøpesum),
+            "leie":          int(self.leie),
+            "use_rooms_total": bool(self.use_rooms_total),
+            "rooms_leie":    self.rooms_leie,
+            "antall_rom":    int(self.antall_rom),
+            # kostnader
+            "oppussing":     self.oppussing,
+            "drift_mnd":     self.drift_mnd,
+            # lån
+            "egenkapital":   int(self.egenkapital),
+            "rente":         float(self.rente),
+            "løpetid":       int(self.løpetid),
+            "avdragsfri":    int(self.avdragsfri),
+            "lånetype":      self.lånetype,
+            "eierform":      self.eierform,
+            # Skrives også når de er tomme: en tømt liste er en endring fletting må se
+            "lånehendelser": [dict(h) for h in self.lånehendelser],
+            "leie_mnd":      [int(x) for x in self.leie_mnd],
+            "leieliste_hash":  self.leieliste_hash,
+            "leieliste_start": self.leieliste_start,
+            # verdi
+            "verdistigning": float(self.verdistigning),
+        }
+        if self.cover_b64:
+            profil["cover_b64"] = self.cover_b64
+        return profil
+
+    @property
+    def dokumentavgift(self) -> int:
+        return int(self.kjøpesum * DOKUMENTAVGIFT_SATS)
+
+    @property
+    def oppussing_total(self) -> int:
+        # Som i sidebaren: manglende poster får standardverdien
+        return sum(int(self.oppussing.get(k, v)) for k, v in OPPUSSING_STANDARD.items())
+
+    @property
+    def drift_mnd_total(self) -> int:
+        return sum(int(self.drift_mnd.get(k, v)) for k, v in DRIFT_STANDARD.items())
+
+    @property
+    def sum_rom(self) -> int:
+        return sum(int(self.rooms_leie.get(f"rom_{i+1}", 0)) for i in range(int(self.antall_rom)))
+
+    @property
+    def effektiv_leie(self) -> int:
+        """Leie som brukes i videre beregning (med leieliste: snitt av de første 12 månedene)."""
+        if self.leie_mnd:
+            return int(round(float(self.leie_serie(12).mean())))
+        return int(self.sum_rom) if self.use_rooms_total else int(self.leie)
+
+    def leie_serie(self, måneder: int) -> np.ndarray:
+        """Leie pr. måned: leie_mnd forlenget med siste verdi, ellers fast effektiv_leie."""
+        if not self.leie_mnd:
+            return np.full(måneder, float(self.effektiv_leie))
+        serie = np.asarray(self.leie_mnd[:måneder], dtype=float)
+        return np.pad(serie, (0, måneder - len(serie)), mode="edge") if len(serie) < måneder else serie
+
+    @property
+    def total_investering(self) -> int:
+        return int(self.kjøpesum + self.dokumentavgift + self.oppussing_total)
+
+    @property
+    def lånebeløp(self) -> int:
+        return max(self.total_investering - int(self.egenkapital), 0)
+
+    @property
+    def startverdi(self) -> float:
+        """Startverdi for verdistigning (kjøpesum + oppussing)."""
+        return float(self.kjøpesum + self.oppussing_total)
+
+    @property
+    def verdistigning_sats(self) -> float:
+        return float(self.verdistigning) / 100
+
+
+@dataclass
+class Beregning:
+    """Resultat av kalkulator.beregn for én eiendom."""
+    df: pd.DataFrame
+    akk: float
+    kpis_1: dict
+    breakeven_mnd: int | None
+    skatt: dict
+    verdistigning: list[dict]
+    total_investering: int
+    lånebeløp: int
+    leie: int
+    drift_mnd_total: int
+    brutto_yield: float
+    netto_yield: float
+    skatt_år: pd.DataFrame | None = None  # årlig skatt over løpetiden (skatt.skatteberegning)
+
+    @property
+    def lånegrad(self) -> float:
+        return (self.lånebeløp / self.total_investering * 100) if self.total_investering else 0.0
+
+    @property
+    def verdi_df(self) -> pd.DataFrame:
+        return pd.DataFrame(self.verdistigning)
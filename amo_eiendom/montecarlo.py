@@ -0,0 +1,140 @@
+"""Monte Carlo: stokastiske rentebaner, ledighet og verdistigning fordelt på en prosesspool."""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .laan import netto_cashflow
+
+PERSENTILER = (5, 50, 95)
+
+
+@dataclass(frozen=True)
+class MonteCarloParametre:
+    lån: float
+    rente: float                  # startrente, % p.a.
+    løpetid: int
+    avdragsfri: int
+    lånetype: str
+    leie: float
+    drift_mnd: float
+    eierform: str
+    startverdi: float
+    rente_langsiktig: float | None = None  # None = startrenten
+    rente_reversjon: float = 0.3  # hvor raskt renten trekkes mot langsiktig nivå, pr. år
+    rente_vol: float = 1.0        # prosentpoeng pr. √år
+    ledighet: float = 0.04        # sannsynlighet for at en måned står uten leieinntekt
+    vekst_snitt: float = 0.025    # forventet årlig verdistigning
+    vekst_vol: float = 0.06       # standardavvik årlig verdistigning
+
+
+@dataclass
+class MonteCarloResultat:
+    """Persentilbånd pr. år (rader År 0..løpetid, kolonner P5/P50/P95)."""
+    akk_cashflow: pd.DataFrame
+    egenkapital: pd.DataFrame
+    andel_negativ_akk: float      # andel baner med negativ akk. cashflow ved slutt
+    antall: int
+    seed: int | None
+
+
+def _simuler_chunk(p: MonteCarloParametre, seed: np.random.SeedSequence, antall: int) -> tuple[np.ndarray, np.ndarray]:
+    """Simulerer `antall` baner måned for måned (vektorisert over banene).
+
+    Renten følger en gulvet Ornstein–Uhlenbeck-prosess; annuiteten reberegnes
+    på gjenværende saldo og løpetid når renten endres, som hos bankene.
+    Returnerer (akk. cashflow, egenkapital) ved hvert årsskifte.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(p.løpetid * 12)
+    af = int(p.avdragsfri * 12)
+    år = n // 12
+    serie = p.lånetype == "Serielån" and n > af
+    annuitet = p.lånetype == "Annuitetslån"
+    langsiktig = p.rente if p.rente_langsiktig is None else p.rente_langsiktig
+
+    rente = np.full(antall, float(p.rente))
+    saldo = np.full(antall, float(p.lån))
+    akk = np.zeros(antall)
+    akk_år = np.zeros((antall, år + 1))
+    rest_år = np.empty((antall, år + 1))
+    rest_år[:, 0] = saldo
+
+    for m in range(n):
+        r = rente / 100 / 12
+        renter = saldo * r
+        if m < af:
+            avdrag = np.zeros(antall)
+            termin = renter
+        elif serie:
+            avdrag = np.full(antall, float(p.lån) / (n - af))
+            termin = avdrag + renter
+        elif annuitet:
+            igjen = n - m
+            with np.errstate(divide="ignore", invalid="ignore"):
+                termin = np.where(r > 0, renter / -np.expm1(-igjen * np.log1p(r)), saldo / igjen)
+            avdrag = termin - renter
+        else:
+            avdrag = np.full(antall, float(p.lån) / (n - af)) - renter
+            termin = avdrag + renter
+        saldo = np.maximum(saldo - avdrag, 0.0)
+
+        leie = np.where(rng.random(antall) < p.ledighet, 0.0, float(p.leie))
+        akk += netto_cashflow(termin, leie, p.drift_mnd, p.eierform)
+        if (m + 1) % 12 == 0:
+            akk_år[:, (m + 1) // 12] = akk
+            rest_år[:, (m + 1) // 12] = saldo
+
+        støy = rng.standard_normal(antall)
+        rente = np.maximum(
+            rente + p.rente_reversjon / 12 * (langsiktig - rente) + p.rente_vol / np.sqrt(12) * støy, 0.0
+        )
+
+    vekst = 1.0 + rng.normal(p.vekst_snitt, p.vekst_vol, (antall, år))
+    verdi = float(p.startverdi) * np.concatenate([np.ones((antall, 1)), np.cumprod(vekst, axis=1)], axis=1)
+    return akk_år, verdi - rest_år
+
+
+def _bånd(verdier: np.ndarray, persentiler) -> pd.DataFrame:
+    tabell = np.percentile(verdier, persentiler, axis=0).T
+    return pd.DataFrame(tabell, columns=[f"P{q}" for q in persentiler], index=pd.RangeIndex(tabell.shape[0], name="År"))
+
+
+def simuler(
+    parametre: MonteCarloParametre,
+    antall: int = 10_000,
+    seed: int | None = None,
+    arbeidere: int | None = None,
+    chunk: int = 5_000,
+    persentiler=PERSENTILER,
+) -> MonteCarloResultat:
+    """Kjører `antall` baner i chunks fordelt på en ProcessPoolExecutor.
+
+    Hver chunk får sin egen frø-sekvens avledet fra `seed`, så resultatet er
+    likt uansett antall arbeidere. arbeidere=1 kjører alt i samme prosess.
+    """
+    if antall < 1:
+        raise ValueError("Antall baner må være minst 1")
+    if chunk < 1:
+        raise ValueError("chunk må være minst 1")
+    størrelser = [min(chunk, antall - start) for start in range(0, antall, chunk)]
+    frø = np.random.SeedSequence(seed).spawn(len(størrelser))
+    arbeidere = min(arbeidere or os.cpu_count() or 1, len(størrelser))
+
+    if arbeidere <= 1:
+        deler = [_simuler_chunk(parametre, s, k) for s, k in zip(frø, størrelser)]
+    else:
+        with ProcessPoolExecutor(max_workers=arbeidere) as pool:
+            deler = list(pool.map(_simuler_chunk, [parametre] * len(størrelser), frø, størrelser))
+
+    akk = np.concatenate([d[0] for d in deler])
+    egenkapital = np.concatenate([d[1] for d in deler])
+    return MonteCarloResultat(
+        akk_cashflow=_bånd(akk, persentiler),
+        egenkapital=_bånd(egenkapital, persentiler),
+        andel_negativ_akk=float((akk[:, -1] < 0).mean()),
+        antall=int(antall),
+        seed=seed,
+    )
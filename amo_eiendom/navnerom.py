@@ -0,0 +1,60 @@
+"""Navnerom pr. bruker og økt for filene appen skriver på en delt server.
+
+    rot/autosave.json                                – uten bruker (enkeltbruker, som før)
+    rot/brukere/<bruker>/autosave.json               – én pr. bruker, delt mellom brukerens faner
+    rot/brukere/<bruker>/økter/<økt>/autosave.json   – eget arbeidsområde, f.eks. ?okt=bud2
+
+Brukeren kommer fra innloggingen foran appen (proxy-header), URL-en eller miljøet;
+navnet gjøres om til et trygt katalognavn, så det aldri kan peke ut av roten.
+"""
+import hashlib
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+MAKS_LENGDE = 64
+_UTRYGT = re.compile(r"[^\w.@-]+")
+
+
+def trygt_navn(navn: str) -> str:
+    """Katalognavn for en bruker/økt (uavhengig av store/små bokstaver). Tomt navn gir ''.
+
+    Navn som måtte endres får en kort hash av originalen, så to ulike
+    navn aldri havner i samme katalog.
+    """
+    navn = (navn or "").strip().lower()
+    if not navn:
+        return ""
+    trygt = _UTRYGT.sub("_", navn).strip("._")[:MAKS_LENGDE]
+    if trygt != navn:
+        trygt = f"{trygt or 'x'}-{hashlib.sha256(navn.encode('utf-8')).hexdigest()[:8]}"
+    return trygt
+
+
+@dataclass(frozen=True)
+class Navnerom:
+    rot: Path
+    bruker: str = ""
+    økt: str = ""
+
+    def __post_init__(self):
+        object.__setattr__(self, "rot", Path(self.rot))
+        object.__setattr__(self, "bruker", trygt_navn(self.bruker))
+        object.__setattr__(self, "økt", trygt_navn(self.økt) if self.bruker else "")
+
+    @property
+    def katalog(self) -> Path:
+        if not self.bruker:
+            return self.rot
+        katalog = self.rot / "brukere" / self.bruker
+        return katalog / "økter" / self.økt if self.økt else katalog
+
+    def sti(self, filnavn: str) -> Path:
+        """Filsti i navnerommet; katalogen opprettes ved behov."""
+        self.katalog.mkdir(parents=True, exist_ok=True)
+        return self.katalog / filnavn
+
+    def __str__(self) -> str:
+        if not self.bruker:
+            return "(felles)"
+        return f"{self.bruker}/{self.økt}" if self.økt else self.bruker
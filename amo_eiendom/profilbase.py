@@ -0,0 +1,303 @@
+"""SQLite-basert profillager: én profil pr. rad, indekserte KPI-kolonner.
+
+Erstatter profiles.json, som ble skrevet om i sin helhet ved hver lagring.
+Payload (hele profilen som JSON) leses først når en profil åpnes.
+
+Hver rad har et versjonsnummer. `lagre_flettet` skriver bare hvis versjonen
+fortsatt er den profilen ble åpnet med (optimistisk låsing); har noen andre
+lagret i mellomtiden, flettes endringene tre-veis mot versjonen som ble åpnet.
+"""
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pandas as pd
+
+from .bilder import Bildelager, flytt_cover_til_lager
+from .batch import beregn_kpi_batch
+from .kalkulator import beregn_kpi, scenario
+from .kpi import yields
+from .lagring import fillås, load_json
+from .modeller import Eiendomsinput
+
+KPI_KOLONNER = ("kjøpesum", "leie", "brutto_yield", "netto_yield", "break_even_mnd")
+
+_SKJEMA = """
+CREATE TABLE IF NOT EXISTS profiler (
+    navn            TEXT PRIMARY KEY,
+    payload         TEXT NOT NULL,
+    kjøpesum        INTEGER,
+    leie            INTEGER,
+    brutto_yield    REAL,
+    netto_yield     REAL,
+    break_even_mnd  INTEGER,
+    oppdatert       REAL NOT NULL,
+    versjon         INTEGER NOT NULL DEFAULT 1,
+    endret_av       TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_profiler_kjøpesum ON profiler (kjøpesum);
+CREATE INDEX IF NOT EXISTS ix_profiler_leie ON profiler (leie);
+CREATE INDEX IF NOT EXISTS ix_profiler_brutto_yield ON profiler (brutto_yield);
+CREATE INDEX IF NOT EXISTS ix_profiler_netto_yield ON profiler (netto_yield);
+CREATE INDEX IF NOT EXISTS ix_profiler_break_even ON profiler (break_even_mnd);
+CREATE TABLE IF NOT EXISTS meta (
+    nøkkel  TEXT PRIMARY KEY,
+    verdi   TEXT
+);
+"""
+
+# Kolonner lagt til etter første versjon av skjemaet
+_NYE_KOLONNER = {
+    "versjon": "INTEGER NOT NULL DEFAULT 1",
+    "endret_av": "TEXT",
+}
+
+_UPSERT = """
+INSERT INTO profiler (navn, payload, kjøpesum, leie, brutto_yield, netto_yield, break_even_mnd, oppdatert, endret_av)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (navn) DO UPDATE SET
+  payload = excluded.payload, kjøpesum = excluded.kjøpesum, leie = excluded.leie,
+  brutto_yield = excluded.brutto_yield, netto_yield = excluded.netto_yield,
+  break_even_mnd = excluded.break_even_mnd, oppdatert = excluded.oppdatert,
+  versjon = profiler.versjon + 1, endret_av = excluded.endret_av
+"""
+
+_MANGLER = object()
+
+
+def flett(basis: dict, deres: dict, vår: dict, _sti: tuple = ()) -> tuple[dict, list[str]]:
+    """Tre-veis fletting av profiler. Returnerer (flettet, konflikter).
+
+    Nøkler bare én side har endret siden `basis`, tas fra den siden. Endret
+    begge samme nøkkel ulikt, vinner `vår` og stien meldes som konflikt.
+    Nestede dicts flettes nøkkel for nøkkel; lister behandles som én verdi.
+    """
+    flettet, konflikter = {}, []
+    for k in [*vår, *(k for k in deres if k not in vår), *(k for k in basis if k not in vår and k not in deres)]:
+        b, d, v = basis.get(k, _MANGLER), deres.get(k, _MANGLER), vår.get(k, _MANGLER)
+        if v == d or d == b:
+            verdi = v
+        elif v == b:
+            verdi = d
+        elif isinstance(v, dict) and isinstance(d, dict):
+            verdi, k_konflikter = flett(b if isinstance(b, dict) else {}, d, v, (*_sti, k))
+            konflikter += k_konflikter
+        else:
+            verdi = v
+            konflikter.append(".".join(map(str, (*_sti, k))))
+        if verdi is not _MANGLER:
+            flettet[k] = verdi
+    return flettet, konflikter
+
+
+def _kpi_input(profil: dict, navn: str) -> Eiendomsinput | None:
+    """Det KPI-kolonnene avhenger av; None for ugyldige profiler (som får tomme KPI-er)."""
+    try:
+        return Eiendomsinput.fra_profil(profil, navn)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class Lagreresultat:
+    navn: str
+    versjon: int                  # versjonen som nå ligger i basen
+    profil: dict                  # det som faktisk ble lagret (etter eventuell fletting)
+    flettet: bool = False         # True hvis noen andre hadde lagret siden profilen ble åpnet
+    konflikter: list[str] = field(default_factory=list)
+    endret_av: str | None = None  # hvem som lagret versjonen vi flettet med
+    forsøk: int = 1               # 2: en annen lagring kom imellom lesing og skriving
+
+
+def _kpi_rader(profiler: dict[str, dict]) -> dict[str, dict]:
+    """KPI-kolonnene for mange profiler; lånemotoren kjøres vektorisert på lukket form."""
+    ut, scenarier, enkeltvis = {}, {}, {}
+    for navn, profil in profiler.items():
+        try:
+            inp = Eiendomsinput.fra_profil(profil, navn)
+            if inp.leie_mnd or inp.lånehendelser:
+                # Leie som varierer over tid eller lånehendelser: ikke i batchmotoren, se kalkulator.beregn_kpi
+                enkeltvis[navn] = inp
+            else:
+                scenarier[navn] = scenario(inp)
+            brutto_yield, netto_yield = yields(inp.effektiv_leie, inp.drift_mnd_total, inp.total_investering)
+        except (TypeError, ValueError):
+            # Ufullstendig/ugyldig profil lagres likevel, bare uten KPI-er
+            scenarier.pop(navn, None)
+            ut[navn] = dict.fromkeys(KPI_KOLONNER)
+            continue
+        ut[navn] = {
+            "kjøpesum": int(inp.kjøpesum),
+            "leie": int(inp.effektiv_leie),
+            "brutto_yield": float(brutto_yield),
+            "netto_yield": float(netto_yield),
+            "break_even_mnd": None,
+        }
+    if scenarier:
+        be = beregn_kpi_batch(pd.DataFrame.from_dict(scenarier, orient="index"), horisonter=())["break_even_mnd"]
+        for navn, mnd in be.items():
+            ut[navn]["break_even_mnd"] = None if pd.isna(mnd) else int(mnd)
+    for navn, inp in enkeltvis.items():
+        try:
+            ut[navn]["break_even_mnd"] = beregn_kpi(inp, horisonter=())["breakeven_mnd"]
+        except ValueError:
+            pass  # ugyldig lånehendelse: lagres uten break-even
+    return ut
+
+
+class ProfilDatabase:
+    """Profiler i en SQLite-fil. Hver operasjon bruker sin egen tilkobling,
+    så objektet kan deles mellom Streamlit-sesjoner (tråder)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with self._koble() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(_SKJEMA)
+            finnes = {r[1] for r in con.execute("PRAGMA table_info(profiler)")}
+            for kolonne, definisjon in _NYE_KOLONNER.items():
+                if kolonne not in finnes:
+                    try:
+                        con.execute(f"ALTER TABLE profiler ADD COLUMN {kolonne} {definisjon}")
+                    except sqlite3.OperationalError as e:
+                        if "duplicate column" not in str(e):  # en annen prosess kom først
+                            raise
+
+    @contextmanager
+    def _koble(self):
+        con = sqlite3.connect(self.path, timeout=10)
+        try:
+            with con:  # commit ved suksess, rollback ved feil
+                yield con
+        finally:
+            con.close()
+
+    @contextmanager
+    def _skriv(self):
+        """Skrivetransaksjon. Skrivere står i kø på en fillås (også på tvers av prosesser)
+        i stedet for å vente i SQLites busy-handler, som sover i stadig lengre intervaller."""
+        with fillås(self.path), self._koble() as con:
+            con.execute("BEGIN IMMEDIATE")
+            yield con
+
+    def __len__(self) -> int:
+        with self._koble() as con:
+            return con.execute("SELECT COUNT(*) FROM profiler").fetchone()[0]
+
+    def __contains__(self, navn: str) -> bool:
+        with self._koble() as con:
+            return con.execute("SELECT 1 FROM profiler WHERE navn = ?", (navn,)).fetchone() is not None
+
+    def navn(self) -> list[str]:
+        """Alle profilnavn, sortert (leser ikke payload)."""
+        with self._koble() as con:
+            return [r[0] for r in con.execute("SELECT navn FROM profiler ORDER BY navn")]
+
+    def hent(self, navn: str) -> dict | None:
+        """Full profil, eller None hvis den ikke finnes."""
+        with self._koble() as con:
+            rad = con.execute("SELECT payload FROM profiler WHERE navn = ?", (navn,)).fetchone()
+        return json.loads(rad[0]) if rad else None
+
+    def hent_versjon(self, navn: str) -> tuple[dict | None, int, str | None]:
+        """(profil, versjon, endret_av); versjon 0 hvis profilen ikke finnes."""
+        with self._koble() as con:
+            rad = con.execute("SELECT payload, versjon, endret_av FROM profiler WHERE navn = ?", (navn,)).fetchone()
+        if rad is None:
+            return None, 0, None
+        return json.loads(rad[0]), rad[1], rad[2]
+
+    def alle(self):
+        """Itererer (navn, profil) for alle profiler, én rad om gangen."""
+        with self._koble() as con:
+            for navn, payload in con.execute("SELECT navn, payload FROM profiler ORDER BY navn"):
+                yield navn, json.loads(payload)
+
+    def lagre(self, navn: str, profil: dict, bruker: str | None = None):
+        """Upsert av én profil i én transaksjon (siste skriver vinner, se `lagre_flettet`)."""
+        self.lagre_mange({navn: profil}, bruker)
+
+    @staticmethod
+    def _rader(profiler: dict[str, dict], bruker: str | None) -> list[tuple]:
+        nå = time.time()
+        kpi_rader = _kpi_rader(profiler)
+        return [
+            (navn, json.dumps(profil, ensure_ascii=False), *(kpi_rader[navn][k] for k in KPI_KOLONNER), nå, bruker)
+            for navn, profil in profiler.items()
+        ]
+
+    def lagre_mange(self, profiler: dict[str, dict], bruker: str | None = None):
+        rader = self._rader(profiler, bruker)
+        with self._skriv() as con:
+            con.executemany(_UPSERT, rader)
+
+    def lagre_flettet(self, navn: str, profil: dict, basis: dict | None = None, basis_versjon: int = 0,
+                      bruker: str | None = None) -> Lagreresultat:
+        """Lagrer `profil`, som ble redigert med utgangspunkt i `basis` (versjon `basis_versjon`).
+
+        Er versjonen i basen fortsatt `basis_versjon`, skrives profilen som den er. Ellers
+        flettes den med det som ligger der (se `flett`) før den skrives. Uten `basis`
+        (ny profil, eller lagret over et annet navn) overskrives profilen uten fletting.
+
+        Fletting og KPI-er beregnes først uten lås. Selve skrivingen skjer i en kort
+        skrivetransaksjon som leser versjonen på nytt; har noen lagret i mellomtiden,
+        flettes det en gang til der, og KPI-ene beregnes på nytt bare hvis tallene endret seg.
+        """
+        def _flett_mot(nåværende, versjon):
+            if nåværende is None or basis is None or versjon == basis_versjon:
+                return profil, []
+            return flett(basis or {}, nåværende, profil)
+
+        nåværende, versjon, _ = self.hent_versjon(navn)
+        lagres, konflikter = _flett_mot(nåværende, versjon)
+        (rad,) = self._rader({navn: lagres}, bruker)
+        forsøk = 1
+        with self._skriv() as con:  # skrivelås før ny lesing: ingen kan komme imellom
+            lest = con.execute("SELECT payload, versjon, endret_av FROM profiler WHERE navn = ?", (navn,)).fetchone()
+            nå_profil, nå_versjon, endret_av = (json.loads(lest[0]), lest[1], lest[2]) if lest else (None, 0, None)
+            if nå_versjon != versjon:
+                forsøk = 2
+                forrige, (lagres, konflikter) = lagres, _flett_mot(nå_profil, nå_versjon)
+                if _kpi_input(lagres, navn) == _kpi_input(forrige, navn):
+                    rad = (navn, json.dumps(lagres, ensure_ascii=False), *rad[2:])
+                else:
+                    (rad,) = self._rader({navn: lagres}, bruker)
+            con.execute(_UPSERT, rad)
+        flettet = basis is not None and nå_profil is not None and nå_versjon != basis_versjon
+        return Lagreresultat(navn, nå_versjon + 1, lagres, flettet, konflikter, endret_av if flettet else None, forsøk)
+
+    def slett(self, navn: str) -> bool:
+        with self._skriv() as con:
+            return con.execute("DELETE FROM profiler WHERE navn = ?", (navn,)).rowcount > 0
+
+    def oversikt(self, sorter: str = "navn", synkende: bool = False) -> pd.DataFrame:
+        """KPI-kolonnene for alle profiler, sortert på en indeksert kolonne."""
+        if sorter not in ("navn", *KPI_KOLONNER):
+            raise ValueError(f"Kan ikke sortere på {sorter!r}")
+        retning = "DESC" if synkende else "ASC"
+        with self._koble() as con:
+            return pd.read_sql_query(
+                f"SELECT navn, {', '.join(KPI_KOLONNER)} FROM profiler ORDER BY {sorter} {retning}", con
+            )
+
+
+def migrer_json(json_path: Path, db: ProfilDatabase, bilder: Bildelager | None = None) -> int:
+    """Engangsmigrering fra profiles.json. Returnerer antall importerte profiler.
+
+    Markeres i meta-tabellen, så senere kall gjør ingenting. JSON-filen beholdes urørt.
+    Med `bilder` flyttes innebygde base64-forsidebilder til bildelageret.
+    """
+    with db._koble() as con:
+        if con.execute("SELECT 1 FROM meta WHERE nøkkel = 'migrert_fra_json'").fetchone():
+            return 0
+    profiler = {navn: p for navn, p in load_json(Path(json_path)).items() if isinstance(p, dict)}
+    if bilder is not None:
+        profiler = {navn: flytt_cover_til_lager(p, bilder) for navn, p in profiler.items()}
+    if profiler:
+        db.lagre_mange(profiler)
+    with db._koble() as con:
+        con.execute("INSERT OR REPLACE INTO meta (nøkkel, verdi) VALUES ('migrert_fra_json', ?)", (str(json_path),))
+    return len(profiler)
@@ -0,0 +1,344 @@
+"""HTML-rapporter: detaljert presentasjon og one-pager for bank."""
+import numpy as np
+import pandas as pd
+
+from .bilder import Bildelager
+from .maler import Mal, format_tusen
+from .modeller import Beregning, Eiendomsinput
+from .verdi import VERDISTIGNING_SATS, verdistigning_tekst
+
+_PRESENTASJON = Mal.fra_fil("presentasjon.html")
+_ONEPAGER = Mal.fra_fil("onepager.html")
+
+CASH_KOLONNER = ["Restgjeld", "Avdrag", "Renter", "Netto cashflow", "Akk. cashflow"]
+
+
+def kontantstrøm_rader(df: pd.DataFrame, antall_mnd: int | None = 24) -> str:
+    """Tabellrader for kontantstrømmen, bygget kolonnevis uten radløkke.
+
+    `antall_mnd=None` gir hele løpetiden.
+    """
+    utsnitt = df if antall_mnd is None else df.iloc[:antall_mnd]
+    if utsnitt.empty:
+        return ""
+    rader = np.char.add("<tr><td>", np.char.mod("%d", utsnitt["Måned"].to_numpy(dtype=float).astype(np.int64)))
+    for kol in CASH_KOLONNER:
+        rader = np.char.add(np.char.add(rader, "</td><td>"), format_tusen(utsnitt[kol].to_numpy(dtype=float)))
+    return "".join(np.char.add(rader, "</td></tr>").tolist())
+
+
+def _skatt_løpetid_rader(skatt: dict) -> str:
+    """Tabellrader for skatten over hele løpetiden (skatt.skatteberegning), hvis den finnes."""
+    if "skatt_total" not in skatt:
+        return ""
+    rader = (
+        f"<tr><td>Skatt over løpetiden</td><td>{skatt['skatt_total']:,.0f}</td></tr>"
+        f"<tr><td>Kontantstrøm etter skatt (sum)</td><td>{skatt['etter_skatt_total']:,.0f}</td></tr>"
+    )
+    if skatt["underskudd_fremført"] > 0:
+        rader += f"<tr><td>Fremførbart underskudd ved slutt</td><td>{skatt['underskudd_fremført']:,.0f}</td></tr>"
+    return rader
+
+
+def lag_presentasjon_html(
+    df: pd.DataFrame,
+    prosjekt_navn: str,
+    finn_url: str,
+    note: str,
+    cover_url: str = "",
+    cover_b64: str = "",
+    cover_mime: str = "image/png",
+    kjøpesum: int = 0,
+    dokumentavgift: int = 0,
+    oppussing_total: int = 0,
+    drift_mnd: int = 0,
+    total_investering: int = 0,
+    leie: int = 0,
+    rente: float = 0.0,
+    løpetid: int = 0,
+    avdragsfri: int = 0,
+    lånetype: str = "Annuitetslån",
+    eierform: str = "Privat",
+    egenkapital: int = 0,
+    # Rom
+    antall_rom: int = 0,
+    rom_renter: dict | None = None,
+    # Skatt og verdi
+    skatt: dict | None = None,
+    verdi_tabell: list[dict] | None = None,
+    verdistigning: float = VERDISTIGNING_SATS,
+    # Kostnadsposter
+    oppussing: dict | None = None,
+    drift_poster: dict | None = None,
+    # Antall måneder i kontantstrømtabellen (None = hele løpetiden)
+    kontantstrøm_mnd: int | None = 24,
+) -> bytes:
+    def _safe(s: str) -> str:
+        return (s or "").replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+    # Klikkbar lenke + rå-URL fallback (for PDF-lesere som autolinker ren tekst)
+    finn_html = ""
+    if finn_url:
+        safe_url = _safe(finn_url)
+        finn_html = f'''
+          <p>
+            <a href="{safe_url}" target="_blank" rel="noopener noreferrer" class="btn" style="pointer-events:auto; cursor:pointer;">
+              🔗 Åpne FINN-annonsen
+            </a>
+          </p>
+          <p class="muted" style="margin-top:-6px;">
+            Direkte lenke: <span style="text-decoration:underline; color:#0b63ce;">{safe_url}</span>
+          </p>
+        '''
+
+    # Forsidebilde – litt mindre
+    cover_html = ""
+    if cover_b64:
+        cover_html = f'''
+          <div class="hero-img">
+            <img src="data:{cover_mime};base64,{cover_b64}" alt="Forsidebilde" />
+          </div>'''
+    elif cover_url:
+        cover_html = f'''
+          <div class="hero-img">
+            <img src="{_safe(cover_url)}" alt="Forsidebilde" />
+          </div>'''
+
+    # Rom-detaljer
+    rom_sum = sum((rom_renter or {}).values()) if rom_renter else 0
+    leie_kilde = "Sum av rom" if rom_renter and rom_sum == leie else "Manuelt totalt"
+    snitt_pr_rom = int(leie / antall_rom) if antall_rom > 0 else 0
+
+    # Kontantstrømstabell
+    cash_html = kontantstrøm_rader(df, kontantstrøm_mnd)
+    if kontantstrøm_mnd is None:
+        kontantstrøm_tittel = "Kontantstrøm – hele løpetiden"
+    else:
+        kontantstrøm_tittel = f"Kontantstrøm – første {kontantstrøm_mnd} måneder"
+
+    # Oppussingstabell
+    opp_rows = ""
+    if oppussing_total:
+        opp_dict = oppussing or {}
+        opp_rows = (
+            "<table class='tight'><thead><tr><th>Tiltak</th><th>Beløp</th></tr></thead><tbody>"
+            + "".join(f"<tr><td>{_safe(k.capitalize())}</td><td>{int(v):,} kr</td></tr>"
+                      for k, v in opp_dict.items())
+            + f"<tr class='total'><td>Sum</td><td>{oppussing_total:,.0f} kr</td></tr>"
+            + "</tbody></table>"
+        )
+
+    # Drift pr mnd tabell
+    drift_rows = ""
+    if drift_mnd:
+        drift_dict = drift_poster or {}
+        drift_rows = (
+            "<table class='tight'><thead><tr><th>Post</th><th>Kr / mnd</th></tr></thead><tbody>"
+            + "".join(f"<tr><td>{_safe(k.capitalize())}</td><td>{int(v):,} kr</td></tr>"
+                      for k, v in drift_dict.items())
+            + f"<tr class='total'><td>Sum / mnd</td><td>{drift_mnd:,.0f} kr</td></tr>"
+            + "</tbody></table>"
+        )
+
+    # Rom-tabell
+    rom_table = ""
+    if antall_rom > 0 and rom_renter:
+        rom_table = (
+            "<table class='tight'><thead><tr><th>Rom</th><th>Leie / mnd</th></tr></thead><tbody>"
+            + "".join(f"<tr><td>{_safe(k.replace('_',' ').title())}</td><td>{int(v):,} kr</td></tr>"
+                      for k, v in rom_renter.items())
+            + f"<tr class='total'><td>Sum</td><td>{sum(rom_renter.values()):,} kr</td></tr>"
+            + "</tbody></table>"
+        )
+
+    # Skattefradrag
+    skatt_html = ""
+    if skatt:
+        skatt_html = f"""
+        <table class="tight">
+          <thead><tr><th>Post</th><th>Beløp (kr)</th></tr></thead>
+          <tbody>
+            <tr><td>Renteutgifter år 1</td><td>{skatt['renter_aar1']:,.0f}</td></tr>
+            <tr><td>Driftskostnader pr. år</td><td>{skatt['drift_aar']:,.0f}</td></tr>
+            <tr class="total"><td>Sum fradragsutgifter (år 1, forenklet)</td><td>{skatt['fradrag_aar1_sum']:,.0f}</td></tr>{_skatt_løpetid_rader(skatt)}
+          </tbody>
+        </table>
+        <p class="muted">Forenklet oversikt. Skatteregler kan variere (vedlikehold vs. påkostning m.m.).</p>
+        """
+
+    # Verdiutvikling
+    verdi_html = ""
+    if verdi_tabell:
+        rows = "".join(
+            f"<tr><td>{int(r['År'])}</td><td>{int(r['Verdi']):,} kr</td></tr>"
+            for r in verdi_tabell
+        )
+        verdi_html = f"""
+        <table class="tight">
+          <thead><tr><th>År</th><th>Estimert verdi ({verdistigning_tekst(verdistigning)})</th></tr></thead>
+          <tbody>{rows}</tbody>
+        </table>
+        """
+
+    note_html = ""
+    if note:
+        note_html = "<div class='card'><h2>Notater</h2><p>" + _safe(note).replace("\\n", "<br>") + "</p></div>"
+
+    html = _PRESENTASJON.render({
+        "tittel": _safe(prosjekt_navn),
+        "finn_html": finn_html,
+        "cover_html": cover_html,
+        "kjøpesum": f"{kjøpesum:,.0f}",
+        "dokumentavgift": f"{dokumentavgift:,.0f}",
+        "oppussing_total": f"{oppussing_total:,.0f}",
+        "drift_mnd": f"{drift_mnd:,.0f}",
+        "total_investering": f"{total_investering:,.0f}",
+        "leie": f"{leie:,.0f}",
+        "egenkapital": f"{egenkapital:,.0f}",
+        "rente": f"{rente:.2f}",
+        "brutto_yield": f"{(leie*12/total_investering*100 if total_investering else 0):.2f}",
+        "netto_yield": f"{((leie*12 - drift_mnd*12)/total_investering*100 if total_investering else 0):.2f}",
+        "antall_rom": antall_rom,
+        "snitt_pr_rom": f"{snitt_pr_rom:,.0f}",
+        "leie_kilde": _safe(leie_kilde),
+        "note_html": note_html,
+        "opp_html": opp_rows if opp_rows else "<p class='muted'>Ingen oppussingskostnader registrert.</p>",
+        "drift_html": drift_rows if drift_rows else "<p class='muted'>Ingen driftskostnader registrert.</p>",
+        "rom_html": rom_table if rom_table else "<p class='muted'>Ingen rom spesifisert.</p>",
+        "skatt_html": skatt_html if skatt_html else "<p class='muted'>Ingen beregning tilgjengelig.</p>",
+        "verdi_tittel": verdistigning_tekst(verdistigning),
+        "verdi_html": verdi_html if verdi_html else "<p class='muted'>Ingen beregning tilgjengelig.</p>",
+        "kontantstrøm_tittel": kontantstrøm_tittel,
+        "cash_html": cash_html,
+    })
+    return html.encode("utf-8")
+
+
+def lag_onepager_html(
+    prosjekt_navn: str,
+    finn_url: str,
+    kjøpesum: int,
+    dokumentavgift: int,
+    oppussing_total: int,
+    total_investering: int,
+    egenkapital: int,
+    lån: int,
+    lånegrad: float,
+    brutto_leie_mnd: int,
+    eff_leie_mnd: int,
+    drift_mnd: int,
+    brutto_yield: float,
+    netto_yield: float,
+    rente: float,
+    løpetid: int,
+    avdragsfri: int,
+    lånetype: str,
+    eierform: str,
+    kpis_1: dict,
+    breakeven_mnd: int | None,
+    note: str
+) -> bytes:
+    """Returnerer HTML for en bankvennlig one-pager."""
+    safe_url = finn_url if (finn_url.startswith("http://") or finn_url.startswith("https://")) else ""
+    note_html = "<h2>Notater</h2><p>" + note.replace("\\n", "<br>") + "</p>" if note else ""
+    html = _ONEPAGER.render({
+        "prosjekt_navn": prosjekt_navn,
+        "finn_html": "<p><a href='" + safe_url + "' target='_blank'>🔗 FINN-annonsen</a></p>" if safe_url else "",
+        "kjøpesum": f"{kjøpesum:,.0f}",
+        "dokumentavgift": f"{dokumentavgift:,.0f}",
+        "oppussing_total": f"{oppussing_total:,.0f}",
+        "total_investering": f"{total_investering:,.0f}",
+        "egenkapital": f"{egenkapital:,.0f}",
+        "lån": f"{lån:,.0f}",
+        "lånegrad": f"{lånegrad:.1f}",
+        "brutto_leie_mnd": f"{brutto_leie_mnd:,.0f}",
+        "eff_leie_mnd": f"{eff_leie_mnd:,.0f}",
+        "drift_mnd": f"{drift_mnd:,.0f}",
+        "brutto_yield": f"{brutto_yield:.2f}",
+        "netto_yield": f"{netto_yield:.2f}",
+        "rente": f"{rente:.2f}",
+        "løpetid": løpetid,
+        "avdragsfri": avdragsfri,
+        "lånetype": lånetype,
+        "eierform": eierform,
+        "termin_1": f"{kpis_1['termin']:,.0f}",
+        "netto_1": f"{kpis_1['netto']:,.0f}",
+        "breakeven_mnd": breakeven_mnd if breakeven_mnd else '—',
+        "note_html": note_html,
+    })
+    return html.encode("utf-8")
+
+
+def presentasjon_html(
+    inp: Eiendomsinput,
+    res: Beregning,
+    bilder: Bildelager | None = None,
+    full_tidsserie: bool = False,
+) -> bytes:
+    """Presentasjonen for én eiendom, rett fra input og beregning.
+
+    Forsidebildet hentes fra bildelageret og base64-kodes først her.
+    Med `full_tidsserie` tas hele nedbetalingsplanen med i kontantstrømtabellen.
+    """
+    cover_b64, cover_mime = inp.cover_b64, "image/png"
+    if inp.cover_hash and bilder is not None and inp.cover_hash in bilder:
+        cover_b64, cover_mime = bilder.base64(inp.cover_hash), bilder.mime(inp.cover_hash)
+    return lag_presentasjon_html(
+        df=res.df,
+        prosjekt_navn=inp.prosjekt_navn,
+        finn_url=inp.finn_url,
+        note=inp.note,
+        cover_url=inp.cover_url,
+        cover_b64=cover_b64,
+        cover_mime=cover_mime,
+        kjøpesum=int(inp.kjøpesum),
+        dokumentavgift=int(inp.dokumentavgift),
+        oppussing_total=int(inp.oppussing_total),
+        drift_mnd=int(res.drift_mnd_total),
+        total_investering=int(res.total_investering),
+        leie=int(res.leie),
+        rente=float(inp.rente),
+        løpetid=int(inp.løpetid),
+        avdragsfri=int(inp.avdragsfri),
+        lånetype=inp.lånetype,
+        eierform=inp.eierform,
+        egenkapital=int(inp.egenkapital),
+        antall_rom=int(inp.antall_rom),
+        rom_renter=inp.rooms_leie,
+        skatt=res.skatt,
+        verdi_tabell=res.verdistigning,
+        verdistigning=inp.verdistigning_sats,
+        oppussing=inp.oppussing,
+        drift_poster=inp.drift_mnd,
+        kontantstrøm_mnd=None if full_tidsserie else 24,
+    )
+
+
+def onepager_html(inp: Eiendomsinput, res: Beregning) -> bytes:
+    """One-pager for bank for én eiendom."""
+    brutto_leie_mnd = res.leie
+    eff_leie_mnd = res.leie  # eventuelt juster for ledighet/forvaltning senere
+    return lag_onepager_html(
+        prosjekt_navn=inp.prosjekt_navn,
+        finn_url=inp.finn_url,
+        kjøpesum=int(inp.kjøpesum),
+        dokumentavgift=int(inp.dokumentavgift),
+        oppussing_total=int(inp.oppussing_total),
+        total_investering=int(res.total_investering),
+        egenkapital=int(inp.egenkapital),
+        lån=int(res.lånebeløp),
+        lånegrad=res.lånegrad,
+        brutto_leie_mnd=int(brutto_leie_mnd),
+        eff_leie_mnd=int(eff_leie_mnd),
+        drift_mnd=int(res.drift_mnd_total),
+        brutto_yield=res.brutto_yield,
+        netto_yield=res.netto_yield,
+        rente=float(inp.rente),
+        løpetid=int(inp.løpetid),
+        avdragsfri=int(inp.avdragsfri),
+        lånetype=inp.lånetype,
+        eierform=inp.eierform,
+        kpis_1=res.kpis_1,
+        breakeven_mnd=res.breakeven_mnd,
+        note=inp.note,
+    )
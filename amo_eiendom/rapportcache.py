@@ -0,0 +1,55 @@
+"""LRU-cache for ferdige rapporter, nøklet på en hash av nøyaktig input."""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import asdict
+
+from .modeller import Eiendomsinput
+
+# Økes når rapportmalene endres, så gamle cacheoppføringer ikke gjenbrukes
+RAPPORT_VERSJON = 3
+
+
+def rapport_nøkkel(type_: str, inp: Eiendomsinput) -> str:
+    """Stabil hash av rapporttype + all input. Forsidebildet inngår via sin innholdshash."""
+    data = json.dumps(
+        {"type": type_, "versjon": RAPPORT_VERSJON, "input": asdict(inp)},
+        ensure_ascii=False, sort_keys=True, default=str,
+    )
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class RapportCache:
+    """Trådsikker LRU med treff/bom-telling; kan deles mellom sesjoner."""
+
+    def __init__(self, maks: int = 64):
+        self.maks = maks
+        self._data: OrderedDict[str, bytes] = OrderedDict()
+        self._lås = threading.Lock()
+        self.treff = 0
+        self.bom = 0
+
+    def hent(self, nøkkel: str, lag: Callable[[], bytes]) -> bytes:
+        """Returnerer cachede bytes, eller kaller `lag()` og lagrer resultatet."""
+        with self._lås:
+            if nøkkel in self._data:
+                self._data.move_to_end(nøkkel)
+                self.treff += 1
+                return self._data[nøkkel]
+            self.bom += 1
+        data = lag()  # utenfor låsen: rendering kan ta tid
+        with self._lås:
+            self._data[nøkkel] = data
+            self._data.move_to_end(nøkkel)
+            while len(self._data) > self.maks:
+                self._data.popitem(last=False)
+        return data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def statistikk(self) -> dict:
+        with self._lås:
+            return {"treff": self.treff, "bom": self.bom, "oppføringer": len(self._data), "maks": self.maks}
@@ -0,0 +1,69 @@
+"""Sensitivitet: rente × leie (× egenkapital) beregnet i én vektorisert kjøring."""
+from dataclasses import dataclass
+
+import numpy as np
+
+from .laan import nedbetalingsplan_matrise, netto_cashflow
+
+
+@dataclass
+class SensitivitetResultat:
+    """Alle matriser har form (egenkapital × rente × leie)."""
+    renter: np.ndarray
+    leier: np.ndarray
+    egenkapitaler: np.ndarray
+    netto_1: np.ndarray
+    break_even_mnd: np.ndarray  # NaN = ingen break-even i løpetiden
+    akk_horisont: np.ndarray
+    horisont_mnd: int
+
+
+def sensitivitet_grid(
+    renter,
+    leier,
+    *,
+    total_investering: float,
+    egenkapital,
+    løpetid: int,
+    avdragsfri: int,
+    lånetype: str,
+    drift_mnd: float,
+    eierform: str,
+    horisont_mnd: int = 120,
+) -> SensitivitetResultat:
+    """Beregner netto 1. mnd, break-even-måned og akk. cashflow ved horisont for hele gridet.
+
+    Nedbetalingsplanen avhenger ikke av leie, så den beregnes bare én gang pr.
+    (egenkapital, rente); leieaksen legges på ved kringkasting. Er lånet kortere
+    enn horisonten, brukes akk. cashflow ved lånets slutt.
+    """
+    renter = np.atleast_1d(np.asarray(renter, dtype=float))
+    leier = np.atleast_1d(np.asarray(leier, dtype=float))
+    egenkapitaler = np.atleast_1d(np.asarray(egenkapital, dtype=float))
+    E, R, L = len(egenkapitaler), len(renter), len(leier)
+
+    lån = np.maximum(float(total_investering) - egenkapitaler, 0.0)
+    plan = nedbetalingsplan_matrise(np.repeat(lån, R), np.tile(renter, E), løpetid, avdragsfri, lånetype)
+    M = plan["termin"].shape[1]
+    if M == 0:
+        null = np.zeros((E, R, L))
+        return SensitivitetResultat(renter, leier, egenkapitaler, null, np.full((E, R, L), np.nan), null, 0)
+
+    termin = plan["termin"].reshape(E, R, 1, M)
+    akk = netto_cashflow(termin, leier[None, None, :, None], drift_mnd, eierform)
+    netto_1 = akk[..., 0].copy()
+    np.cumsum(akk, axis=-1, out=akk)
+
+    positiv = akk >= 0
+    break_even = np.where(positiv.any(axis=-1), positiv.argmax(axis=-1) + 1.0, np.nan)
+    horisont = min(int(horisont_mnd), M)
+
+    return SensitivitetResultat(
+        renter=renter,
+        leier=leier,
+        egenkapitaler=egenkapitaler,
+        netto_1=netto_1,
+        break_even_mnd=break_even,
+        akk_horisont=akk[..., horisont - 1].copy(),
+        horisont_mnd=horisont,
+    )
@@ -0,0 +1,179 @@
+"""Skatt og fradrag: årlig skatteberegning over hele løpetiden.
+
+Månedsplanen summeres til inntektsår (12 og 12 måneder), og hvert år skattlegges
+etter reglene for eierformen:
+
+- Privat: leie minus fradragsberettigede renter og drift skattes som alminnelig
+  inntekt; underskudd samordnes med annen inntekt og gir skattefordel samme år.
+- AS: samme grunnlag, men underskudd fremføres og trekkes fra senere overskudd.
+
+Fremføringen er en rekursjon over år, men har lukket form: summen av skattepliktig
+grunnlag t.o.m. år t er max(0, maks av kumulert resultat t.o.m. t), så hele
+beregningen er vektorisert over scenarier og år.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .laan import AS_SKATTESATS
+
+
+@dataclass(frozen=True)
+class Skatteregler:
+    sats: float                         # skattesats på alminnelig inntekt
+    samordne_underskudd: bool = False   # True: underskudd mot annen inntekt, ellers fremføring
+    fradrag_renter: float = 1.0         # fradragsberettiget andel av rentene
+    fradrag_drift: float = 1.0          # fradragsberettiget andel av driften
+
+
+SKATTEREGLER = {
+    "Privat": Skatteregler(sats=0.22, samordne_underskudd=True),
+    "AS": Skatteregler(sats=0.22),
+}
+
+# Kolonne i årstabellen → nøkkel i skatt_pr_år
+SKATTEKOLONNER = {
+    "Leie": "leie",
+    "Drift": "drift",
+    "Renter": "renter",
+    "Resultat": "resultat",
+    "Skattegrunnlag": "skattegrunnlag",
+    "Fremført underskudd": "fremført_underskudd",
+    "Skatt": "skatt",
+    "Kontantstrøm før skatt": "kontantstrøm_før_skatt",
+    "Kontantstrøm etter skatt": "kontantstrøm_etter_skatt",
+    "Akk. etter skatt": "akk_etter_skatt",
+}
+
+
+def skattefradrag_estimat(df: pd.DataFrame, drift_mnd_total: int) -> dict:
+    """Forenklet: Renter år 1 + driftskostnader år = fradrag (estimat)."""
+    renter_aar1 = float(df["Renter"].head(12).sum()) if not df.empty else 0.0
+    drift_aar = float(drift_mnd_total) * 12.0
+    fradrag_sum = renter_aar1 + drift_aar
+    return {
+        "renter_aar1": renter_aar1,
+        "drift_aar": drift_aar,
+        "fradrag_aar1_sum": fradrag_sum
+    }
+
+
+def før_forenklet_skatt(netto, leie, drift, renter, avdrag, eierform) -> np.ndarray:
+    """Netto cashflow uten den forenklede AS-skatten i lånemotoren (laan.netto_cashflow).
+
+    Motoren trekker AS_SKATTESATS av positiv driftsnetto (leie - drift - termin);
+    den legges tilbake her, så skatten kan beregnes pr. år i stedet.
+    """
+    driftsnetto = np.asarray(leie, dtype=float) - np.asarray(drift, dtype=float) - renter - avdrag
+    as_mask = (np.asarray(eierform, dtype=object) == "AS") & (driftsnetto > 0)
+    return np.where(as_mask, netto + AS_SKATTESATS * driftsnetto, netto)
+
+
+def årssummer(x) -> np.ndarray:
+    """(scenario × måned) → (scenario × år), 12 og 12 måneder; år uten måneder blir NaN."""
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    S, M = x.shape
+    år = -(-M // 12)
+    x = np.pad(x, ((0, 0), (0, år * 12 - M)), constant_values=np.nan).reshape(S, år, 12)
+    sum_ = np.nansum(x, axis=2)
+    sum_[np.isnan(x).all(axis=2)] = np.nan
+    return sum_
+
+
+def _regelarrays(eierform: np.ndarray, regler: dict[str, Skatteregler]) -> dict[str, np.ndarray]:
+    """Regelfeltene som kolonner (scenario × 1); ukjent eierform regnes som Privat."""
+    unike, indeks = np.unique(eierform.astype(str), return_inverse=True)
+    valgt = [regler.get(e, regler["Privat"]) for e in unike]
+    return {
+        felt: np.array([getattr(r, felt) for r in valgt], dtype=float)[indeks][:, None]
+        for felt in ("sats", "samordne_underskudd", "fradrag_renter", "fradrag_drift")
+    }
+
+
+def skatt_pr_år(leie, drift, renter, før_skatt, eierform, regler: dict[str, Skatteregler] = SKATTEREGLER) -> dict:
+    """Årlig skatt for mange scenarier samtidig.
+
+    Alle beløp er årssummer som (scenario × år)-matriser, NaN etter siste år:
+    fra månedsplanen med årssummer(), eller direkte fra kpi_lukket.lukkede_årssummer.
+    `før_skatt` er netto cashflow før skatt; `eierform` én pr. scenario.
+    Returnerer (scenario × år)-matriser med nøklene i SKATTEKOLONNER, samt
+    'antall_år' pr. scenario.
+    """
+    renter = np.atleast_2d(np.asarray(renter, dtype=float))
+    S = renter.shape[0]
+    leie, drift, før_skatt = (np.broadcast_to(np.asarray(x, dtype=float), renter.shape) for x in (leie, drift, før_skatt))
+    r = _regelarrays(np.broadcast_to(np.asarray(eierform, dtype=object).reshape(-1), (S,)), regler)
+    resultat = leie - r["fradrag_drift"] * drift - r["fradrag_renter"] * renter
+
+    # Fremføring: kumulert grunnlag = max(0, løpende maks av kumulert resultat)
+    kum = np.cumsum(np.nan_to_num(resultat), axis=1)
+    kum_grunnlag = np.maximum.accumulate(np.maximum(kum, 0.0), axis=1)
+    grunnlag_fremført = np.diff(kum_grunnlag, axis=1, prepend=0.0)
+    samordne = r["samordne_underskudd"] > 0
+    grunnlag = np.where(samordne, resultat, grunnlag_fremført)
+    fremført = np.where(samordne, 0.0, kum_grunnlag - kum)
+    skatt = r["sats"] * grunnlag
+    etter = før_skatt - skatt
+
+    ingen = np.isnan(renter)
+    ut = {
+        "leie": leie.copy(),
+        "drift": drift.copy(),
+        "renter": renter.copy(),
+        "resultat": resultat,
+        "skattegrunnlag": grunnlag,
+        "fremført_underskudd": fremført,
+        "skatt": skatt,
+        "kontantstrøm_før_skatt": før_skatt.copy(),
+        "kontantstrøm_etter_skatt": etter,
+        "akk_etter_skatt": np.cumsum(np.nan_to_num(etter), axis=1),
+    }
+    for arr in ut.values():
+        arr[ingen] = np.nan
+    ut["antall_år"] = (~ingen).sum(axis=1)
+    return ut
+
+
+def skattesummer(år: dict) -> dict[str, np.ndarray]:
+    """Summer pr. scenario fra skatt_pr_år."""
+    siste = np.maximum(år["antall_år"] - 1, 0)
+    rader = np.arange(len(siste))
+
+    def ved_slutt(x):
+        return np.where(år["antall_år"] > 0, x[rader, siste], 0.0) if x.shape[1] else np.zeros(len(siste))
+
+    def første(x):
+        return np.nan_to_num(x[:, 0]) if x.shape[1] else np.zeros(len(siste))
+
+    return {
+        "skatt_aar1": første(år["skatt"]),
+        "skatt_total": np.nansum(år["skatt"], axis=1),
+        "fradrag_total": np.nansum(år["leie"] - år["resultat"], axis=1),
+        "før_skatt_total": np.nansum(år["kontantstrøm_før_skatt"], axis=1),
+        "etter_skatt_total": np.nansum(år["kontantstrøm_etter_skatt"], axis=1),
+        "underskudd_fremført": ved_slutt(år["fremført_underskudd"]),
+    }
+
+
+def skatteberegning(df: pd.DataFrame, leie, drift_mnd: float, eierform: str,
+                    regler: dict[str, Skatteregler] = SKATTEREGLER) -> tuple[dict, pd.DataFrame]:
+    """Årlig skatt for én månedstabell (beregn_lån eller Låneforløp.tabell).
+
+    `leie` er fast leie eller en serie pr. måned. Returnerer (summer, årstabell);
+    summene har også nøklene fra skattefradrag_estimat.
+    """
+    n = len(df)
+    leie = np.broadcast_to(np.asarray(leie, dtype=float), (n,)) if np.ndim(leie) == 0 else np.asarray(leie, float)[:n]
+    renter = df["Renter"].to_numpy(dtype=float)
+    før = før_forenklet_skatt(df["Netto cashflow"].to_numpy(dtype=float), leie, drift_mnd, renter,
+                              df["Avdrag"].to_numpy(dtype=float), eierform)
+    drift = np.where(np.isnan(renter), np.nan, float(drift_mnd))
+    år = skatt_pr_år(årssummer(leie), årssummer(drift), årssummer(renter), årssummer(før), [eierform], regler)
+    antall = int(år["antall_år"][0])
+    tabell = pd.DataFrame({
+        "År": np.arange(1, antall + 1),
+        **{kolonne: år[nøkkel][0, :antall] for kolonne, nøkkel in SKATTEKOLONNER.items()},
+    })
+    summer = {k: float(v[0]) for k, v in skattesummer(år).items()}
+    return {**skattefradrag_estimat(df, drift_mnd), **summer}, tabell
@@ -0,0 +1,54 @@
+"""Tall skrevet på norsk i CSV-celler og annonsetekst.
+
+'12 500', '12.500', '4.250.000 kr', '12 500,50', '12.500,50', 'kr 12 500,-' og
+'5 %' godtas. Punktum er tusenskille når det står foran grupper på tre sifre,
+ellers desimaltegn ('12500.50'); komma er desimaltegn. Verdier med både komma
+og punktum etter dette ('12,500.50') er tvetydige og blir ugyldige, det samme
+blir tomme celler og tekst uten tall.
+
+norske_tall() tar en hel kolonne på én gang, norsk_tall() én verdi; begge
+følger de samme reglene.
+"""
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+# Alt som ikke er siffer, komma, punktum eller minus (mellomrom, NBSP, 'kr', '%', ...)
+_STØY = r"[^\d,.\-]"
+# Skilletegn i endene: 'kr. 12 500' og '12 500,-'
+_KANTER = r"^[.,]+|[.,\-]+$"
+_TUSENSKILLE = r"-?[1-9]\d{0,2}(\.\d{3})+(,\d*)?"
+
+_STØY_RE, _KANTER_RE, _TUSENSKILLE_RE = re.compile(_STØY), re.compile(_KANTER), re.compile(_TUSENSKILLE)
+
+
+def norske_tall(s) -> np.ndarray:
+    """Float-array for en kolonne; ugyldige verdier blir NaN. Tallkolonner brukes som de er."""
+    s = s if isinstance(s, pd.Series) else pd.Series(s)
+    if s.dtype.kind in "biuf":
+        return s.to_numpy(dtype=float)
+    rens = s.astype(str).str.replace(_STØY, "", regex=True).str.replace(_KANTER, "", regex=True)
+    tusenskille = rens.str.fullmatch(_TUSENSKILLE)
+    rens = rens.where(~tusenskille, rens.str.replace(".", "", regex=False))
+    tvetydig = rens.str.contains(",", regex=False) & rens.str.contains(".", regex=False)
+    rens = rens.where(~tvetydig, "").str.replace(",", ".", regex=False)
+    return pd.to_numeric(rens, errors="coerce").to_numpy(dtype=float)
+
+
+def norsk_tall(x) -> float | None:
+    """Som norske_tall() for én verdi; None når den mangler eller er ugyldig."""
+    if x is None or isinstance(x, bool):
+        return None
+    if isinstance(x, (int, float, np.number)):
+        return None if math.isnan(x) else float(x)
+    rens = _KANTER_RE.sub("", _STØY_RE.sub("", str(x)))
+    if _TUSENSKILLE_RE.fullmatch(rens):
+        rens = rens.replace(".", "")
+    if "," in rens and "." in rens:
+        return None
+    try:
+        return float(rens.replace(",", "."))
+    except ValueError:
+        return None
@@ -0,0 +1,51 @@
+"""Verdiutvikling for eiendommen."""
+import numpy as np
+
+# Standard årlig verdistigning
+VERDISTIGNING_SATS = 0.025
+
+
+def verdistigning_liste(startverdi: float, antall_ar: int, rate: float = VERDISTIGNING_SATS) -> list[dict]:
+    """Returnerer liste med {'År': i, 'Verdi': verdi} for år 0..N."""
+    faktorer = np.full(max(int(antall_ar), 0) + 1, 1.0 + rate)
+    faktorer[0] = float(startverdi)
+    verdier = np.cumprod(faktorer).tolist()  # samme multiplikasjoner i samme rekkefølge som en løkke
+    return [{"År": i, "Verdi": round(verdi)} for i, verdi in enumerate(verdier)]
+
+
+def verdistigning_tekst(rate: float = VERDISTIGNING_SATS) -> str:
+    """Til overskrifter, f.eks. 0.025 → '2,5 % årlig'."""
+    return f"{round(rate * 100, 2):g} % årlig".replace(".", ",")
+
+
+def årsvekst(vekst, antall_år: int, scenarier: int = 1) -> np.ndarray:
+    """(scenario × år)-matrise med vekstsats for år 1..antall_år.
+
+    `vekst` er én fast sats, en bane med én sats pr. år (felles for alle scenarier),
+    eller en (scenario × år)-matrise. En bane som er kortere enn antall_år
+    forlenges med siste sats.
+    """
+    g = np.asarray(vekst, dtype=float)
+    g = g.reshape(1, -1) if g.ndim < 2 else g
+    if g.shape[1] == 0:
+        g = np.zeros((g.shape[0], 1))
+    if g.shape[1] < antall_år:
+        g = np.pad(g, ((0, 0), (0, antall_år - g.shape[1])), mode="edge")
+    return np.broadcast_to(g[:, :antall_år], (scenarier, antall_år))
+
+
+def verdibane(startverdi, måneder: int, vekst=VERDISTIGNING_SATS) -> np.ndarray:
+    """Verdi pr. måned 0..måneder som (scenario × måned)-matrise; én rad pr. startverdi.
+
+    Vekst som i årsvekst(). Innenfor et år vokser verdien med fast månedlig
+    sats, så verdien ved hvert årsskifte er den samme som i verdistigning_liste.
+    """
+    start = np.atleast_1d(np.asarray(startverdi, dtype=float))
+    måneder = int(måneder)
+    antall_år = -(-måneder // 12)
+    g = årsvekst(vekst, antall_år + 1, len(start))
+    faktorer = np.hstack([start[:, None], 1.0 + g[:, :antall_år]])
+    ved_årsskifte = np.cumprod(faktorer, axis=1)
+    m = np.arange(måneder + 1)
+    år, andel = m // 12, (m % 12) / 12
+    return ved_årsskifte[:, år] * np.power(1.0 + g[:, år], andel)
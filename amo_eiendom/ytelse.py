@@ -0,0 +1,194 @@
+"""Tidtaking pr. seksjon for hver rerun: veggtid og allokeringer.
+
+Når timeren er av, er `neste` en ren retur, `seksjon` gir en felles
+nullcontext og `målt` returnerer funksjonen uendret – nær null kostnad.
+Når den er på, logges én JSONL-linje pr. rerun til en roterende fil.
+
+Allokeringer måles med tracemalloc, som er prosessglobal: med flere
+samtidige sesjoner blir tallene omtrentlige.
+"""
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from collections.abc import Callable
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+LOGG_MAKS_BYTES = 1_000_000
+LOGG_BEHOLD = 3
+
+_INGEN = nullcontext()
+_skrivelås = threading.Lock()
+_tracemalloc_lås = threading.Lock()
+_tracemalloc_brukere = 0
+
+# Siste poster (reruns og rapportbygginger utenfor rerun) for debugpanelet
+SISTE: deque[dict] = deque(maxlen=50)
+
+
+def aktiv_fra_miljø() -> bool:
+    """`AMO_YTELSE=1` slår på tidtaking uten å endre koden."""
+    return os.environ.get("AMO_YTELSE", "").strip().lower() in ("1", "true", "ja", "on")
+
+
+def _start_tracemalloc():
+    global _tracemalloc_brukere
+    with _tracemalloc_lås:
+        if _tracemalloc_brukere == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracemalloc_brukere += 1
+
+
+def _stopp_tracemalloc():
+    global _tracemalloc_brukere
+    with _tracemalloc_lås:
+        _tracemalloc_brukere -= 1
+        if _tracemalloc_brukere == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def skriv_roterende(path: Path, post: dict, maks_bytes: int = LOGG_MAKS_BYTES, behold: int = LOGG_BEHOLD):
+    """Legger til én JSON-linje; roterer path → path.1 → … → path.<behold> når filen blir for stor."""
+    linje = json.dumps(post, ensure_ascii=False) + "\n"
+    with _skrivelås:
+        try:
+            if path.exists() and path.stat().st_size + len(linje) > maks_bytes:
+                for i in range(behold - 1, 0, -1):
+                    eldre = path.with_name(f"{path.name}.{i}")
+                    if eldre.exists():
+                        os.replace(eldre, path.with_name(f"{path.name}.{i + 1}"))
+                os.replace(path, path.with_name(f"{path.name}.1"))
+            with path.open("a", encoding="utf-8") as f:
+                f.write(linje)
+        except OSError:
+            pass  # logging skal aldri felle appen
+
+
+class Seksjonstimer:
+    """Samler veggtid og allokeringer pr. seksjon for én rerun.
+
+    Skriptet deles i etapper med `neste("Navn")`; enkeltblokker kan måles
+    med `with timer.seksjon("navn"):` eller `@timer.målt("navn")`.
+    """
+
+    def __init__(
+        self,
+        aktiv: bool = False,
+        logg: Path | None = None,
+        allokeringer: bool = True,
+        maks_bytes: int = LOGG_MAKS_BYTES,
+        behold: int = LOGG_BEHOLD,
+    ):
+        self.aktiv = aktiv
+        self.logg = logg
+        self.allokeringer = aktiv and allokeringer
+        self.maks_bytes = maks_bytes
+        self.behold = behold
+        self.seksjoner: list[dict] = []
+        self._stakk: list[list] = []
+        self._etappe: str | None = None
+        self._avsluttet = False
+        if self.allokeringer:
+            _start_tracemalloc()
+        self._start = time.perf_counter()
+
+    # ---- måling ----
+    def _inn(self, navn: str):
+        mem = 0
+        if self.allokeringer:
+            mem, topp = tracemalloc.get_traced_memory()
+            if self._stakk:
+                self._stakk[-1][3] = max(self._stakk[-1][3], topp)
+            tracemalloc.reset_peak()
+        self._stakk.append([navn, time.perf_counter(), mem, mem])
+
+    def _ut(self) -> dict:
+        navn, t0, mem0, topp = self._stakk.pop()
+        post = {"navn": navn, "s": time.perf_counter() - t0}
+        if self.allokeringer:
+            mem, topp_nå = tracemalloc.get_traced_memory()
+            topp = max(topp, topp_nå)
+            if self._stakk:
+                self._stakk[-1][3] = max(self._stakk[-1][3], topp)
+            tracemalloc.reset_peak()
+            post["allokert_kb"] = round((mem - mem0) / 1024, 1)
+            post["topp_kb"] = round((topp - mem0) / 1024, 1)
+        if self._stakk:
+            post["navn"] = f"{self._stakk[-1][0]}/{navn}"
+        return post
+
+    def _registrer(self, post: dict):
+        if not self._avsluttet:
+            self.seksjoner.append(post)
+            return
+        # Kall etter at rerunen er ferdig (f.eks. rapport bygget ved nedlasting)
+        post = {"type": "seksjon", "tidspunkt": time.strftime("%Y-%m-%dT%H:%M:%S"), **post}
+        SISTE.append(post)
+        if self.logg is not None:
+            skriv_roterende(self.logg, post, self.maks_bytes, self.behold)
+
+    def seksjon(self, navn: str):
+        """Kontekstbehandler som måler blokken. Gir en nullcontext når timeren er av."""
+        if not self.aktiv:
+            return _INGEN
+        return self._seksjon(navn)
+
+    @contextmanager
+    def _seksjon(self, navn: str):
+        self._inn(navn)
+        try:
+            yield
+        finally:
+            self._registrer(self._ut())
+
+    def målt(self, navn: str | None = None) -> Callable:
+        """Dekoratør som måler hvert kall. Returnerer funksjonen uendret når timeren er av."""
+        def dekorer(funksjon):
+            if not self.aktiv:
+                return funksjon
+
+            @functools.wraps(funksjon)
+            def innpakket(*args, **kwargs):
+                with self._seksjon(navn or funksjon.__name__):
+                    return funksjon(*args, **kwargs)
+            return innpakket
+        return dekorer
+
+    def neste(self, navn: str):
+        """Avslutter forrige etappe av skriptet og starter en ny."""
+        if not self.aktiv:
+            return
+        if self._etappe is not None:
+            self._registrer(self._ut())
+        self._etappe = navn
+        self._inn(navn)
+
+    def avslutt(self, **ekstra) -> dict | None:
+        """Lukker rerunen, skriver loggposten og returnerer den (None når timeren er av)."""
+        if not self.aktiv or self._avsluttet:
+            return None
+        if self._etappe is not None:
+            self._registrer(self._ut())
+            self._etappe = None
+        self._avsluttet = True
+        post = {
+            "type": "rerun",
+            "tidspunkt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "total_s": time.perf_counter() - self._start,
+            **ekstra,
+            "seksjoner": self.seksjoner,
+        }
+        if self.allokeringer:
+            post["tracemalloc_kb"] = round(tracemalloc.get_traced_memory()[0] / 1024, 1)
+        SISTE.append(post)
+        if self.logg is not None:
+            skriv_roterende(self.logg, post, self.maks_bytes, self.behold)
+        return post
+
+    def __del__(self):
+        if self.allokeringer:
+            _stopp_tracemalloc()
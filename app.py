@@ -1,151 +1,127 @@
 import streamlit as st
 import pandas as pd
-import json
+import copy
+import os
 from pathlib import Path
-import base64
 from io import BytesIO
 
+import matplotlib.pyplot as plt
+import numpy as np
+from PIL import UnidentifiedImageError
+
+from amo_eiendom.autosave import Autosave
+from amo_eiendom.bilder import Bildelager, flytt_cover_til_lager
+from amo_eiendom.eksport import FILENDELSE, MIME, eksport_bytes, tidsserie_chunks
+from amo_eiendom.graf import kalkulatorgraf
+from amo_eiendom.egenkapital import LTV_TERSKLER, egenkapitalforløp
+from amo_eiendom.internrente import DISKONTERINGSRENTE, OK, STANDARD_EXIT_ÅR, avkastningstabell
+from amo_eiendom.laanehendelser import HENDELSESTYPER, LÅNETYPER, hendelse_fra_dict, hendelse_til_dict
+from amo_eiendom.leieliste import Leielistelager, leie_mnd_for_profil, leie_pr_type, les_leieliste
+from amo_eiendom.maalsok import MÅL, målsøk_alle
+from amo_eiendom.modeller import DRIFT_STANDARD, LÅN_STANDARD, OPPUSSING_STANDARD, VERDISTIGNING_STANDARD, Eiendomsinput
+from amo_eiendom.montecarlo import MonteCarloParametre, simuler
+from amo_eiendom.navnerom import Navnerom
+from amo_eiendom.profilbase import KPI_KOLONNER, ProfilDatabase, migrer_json
+from amo_eiendom.rapport import onepager_html, presentasjon_html
+from amo_eiendom.rapportcache import RapportCache, rapport_nøkkel
+from amo_eiendom.sensitivitet import sensitivitet_grid
+from amo_eiendom.verdi import verdistigning_tekst
+from amo_eiendom.ytelse import SISTE, Seksjonstimer, aktiv_fra_miljø
+
+# Tidtaking pr. seksjon: AMO_YTELSE=1 eller ?ytelse=1 i URL-en
+YTELSE_LOGG = Path("ytelse.jsonl")
+ytelse = Seksjonstimer(aktiv=aktiv_fra_miljø() or st.query_params.get("ytelse") == "1", logg=YTELSE_LOGG)
+ytelse.neste("Oppsett")
+
 # =========================
 #   Persist / Autosave
 # =========================
-PERSIST_PATH = Path("autosave.json")
-PROFILES_PATH = Path("profiles.json")
+# Autosave pr. bruker (og eventuelt pr. økt) på en delt server. Brukeren kommer fra
+# innloggingsproxyen foran appen, ellers ?bruker=… eller AMO_BRUKER. Dette er bare
+# navnerom, ikke tilgangskontroll. Uten bruker brukes autosave.json som før.
+BRUKER_HEADER = os.environ.get("AMO_BRUKER_HEADER", "X-Forwarded-User")
+bruker = (
+    st.context.headers.get(BRUKER_HEADER)
+    or st.query_params.get("bruker")
+    or os.environ.get("AMO_BRUKER", "")
+)
+navnerom = Navnerom(Path("."), bruker, st.query_params.get("okt", ""))
 
-def _load_json(path: Path) -> dict:
-    if path.exists():
-        try:
-            return json.loads(path.read_text(encoding="utf-8"))
-        except Exception:
-            return {}
-    return {}
+PERSIST_PATH = navnerom.sti("autosave.json")
+PROFILES_PATH = Path("profiles.json")  # kun kilde for engangsmigrering
+PROFILES_DB_PATH = Path("profiles.sqlite3")
+BILDER_PATH = Path("bilder")
+LEIELISTER_PATH = Path("leielister")
 
-def _save_json(path: Path, data: dict):
-    try:
-        path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-    except Exception:
-        pass
+bildelager = Bildelager(BILDER_PATH)
+leielistelager = Leielistelager(LEIELISTER_PATH)
+
+@st.cache_resource
+def _profilbase() -> ProfilDatabase:
+    db = ProfilDatabase(PROFILES_DB_PATH)
+    migrer_json(PROFILES_PATH, db, bildelager)
+    return db
+
+profilbase = _profilbase()
+
+@st.cache_resource
+def _rapportcache() -> RapportCache:
+    return RapportCache(maks=64)
+
+rapportcache = _rapportcache()
 
 # Init session_state
+if "_autosave" not in st.session_state:
+    st.session_state["_autosave"] = Autosave(PERSIST_PATH)
 if "persist" not in st.session_state:
-    st.session_state["persist"] = _load_json(PERSIST_PATH)
+    st.session_state["persist"] = st.session_state["_autosave"].last()
 if "_dirty" not in st.session_state:
     st.session_state["_dirty"] = False
-if "profiles" not in st.session_state:
-    st.session_state["profiles"] = _load_json(PROFILES_PATH)
+if "cover_b64" in st.session_state["persist"]:
+    # Gammel autosave med innebygd bilde → flytt til bildelageret
+    flytt_cover_til_lager(st.session_state["persist"], bildelager)
+    st.session_state["_dirty"] = True
 if "pending_profile_name" not in st.session_state:
     st.session_state["pending_profile_name"] = ""
 
 def mark_dirty():
     st.session_state["_dirty"] = True
 
+def lagre_hvis_endret():
+    # Bare endrede nøkler journalføres; skrivinger innenfor debounce-vinduet utsettes
+    if st.session_state["_dirty"]:
+        st.session_state["_autosave"].registrer(st.session_state["persist"])
+        st.session_state["_dirty"] = False
+
+# Settes tilbake på slutten av skriptet; fragmentkjøringer ser derfor False
+st.session_state["_full_kjøring"] = True
+
 # =========================
 #   App Config
 # =========================
 st.set_page_config(layout="wide")
 st.title("AMO Eiendomskalkulator")
 
-# =========================
-#   Helpers
-# =========================
-def _img_bytes_to_b64(img_bytes: bytes) -> str:
-    return base64.b64encode(img_bytes).decode("utf-8")
-
-def beregn_lån(lån, rente, løpetid, avdragsfri, lånetype, leie, drift_mnd, eierform):
-    """Returnerer df med månedsrader + akkumulert netto cashflow."""
-    n  = int(løpetid * 12)
-    af = int(avdragsfri * 12)
-    r  = float(rente) / 100 / 12
-
-    if lånetype == "Annuitetslån" and r > 0 and (n - af) > 0:
-        terminbeløp = lån * (r * (1 + r)**(n - af)) / ((1 + r)**(n - af) - 1)
-    else:
-        terminbeløp = lån / (n - af) if (n - af) > 0 else 0
-
-    saldo = float(lån)
-    restgjeld, avdrag, renter_liste, netto_cf, akk_cf = [], [], [], [], []
-    akk = 0.0
-    for m in range(n):
-        rente_mnd = saldo * r
-        if m < af:
-            avdrag_mnd = 0.0
-            termin = rente_mnd
-        elif lånetype == "Serielån" and (n - af) > 0:
-            avdrag_mnd = float(lån) / (n - af)
-            termin = avdrag_mnd + rente_mnd
-        else:
-            avdrag_mnd = terminbeløp - rente_mnd
-            termin = terminbeløp
-
-        saldo = max(saldo - avdrag_mnd, 0.0)
-
-        netto = float(leie) - float(drift_mnd) - termin
-        if eierform == "AS" and netto > 0:
-            netto *= (1 - 0.375)
-
-        akk += netto
-        restgjeld.append(saldo)
-        avdrag.append(avdrag_mnd)
-        renter_liste.append(rente_mnd)
-        netto_cf.append(netto)
-        akk_cf.append(akk)
-
-    return pd.DataFrame({
-        "Måned": list(range(1, n + 1)),
-        "Restgjeld": restgjeld,
-        "Avdrag": avdrag,
-        "Renter": renter_liste,
-        "Netto cashflow": netto_cf,
-        "Akk. cashflow": akk_cf
-    }), akk
-
-def _first_month_kpis(df: pd.DataFrame) -> dict:
-    if df.empty:
-        return {"termin": 0.0, "netto": 0.0}
-    r = df.iloc[0]
-    return {"termin": float(r["Renter"] + r["Avdrag"]), "netto": float(r["Netto cashflow"])}
-
-def _break_even_month(df: pd.DataFrame):
-    if df.empty:
-        return None
-    mask = df["Akk. cashflow"] >= 0
-    if not mask.any():
-        return None
-    idx = mask.idxmax()
-    return int(df.iloc[idx]["Måned"])
-
-def _skattefradrag_estimat(df: pd.DataFrame, drift_mnd_total: int) -> dict:
-    """Forenklet: Renter år 1 + driftskostnader år = fradrag (estimat)."""
-    renter_aar1 = float(df["Renter"].head(12).sum()) if not df.empty else 0.0
-    drift_aar = float(drift_mnd_total) * 12.0
-    fradrag_sum = renter_aar1 + drift_aar
-    return {
-        "renter_aar1": renter_aar1,
-        "drift_aar": drift_aar,
-        "fradrag_aar1_sum": fradrag_sum
-    }
-
-def _verdistigning_liste(startverdi: float, antall_ar: int, rate: float = 0.025) -> list[dict]:
-    """Returnerer liste med {'År': i, 'Verdi': verdi} for år 0..N."""
-    out = []
-    verdi = float(startverdi)
-    out.append({"År": 0, "Verdi": round(verdi)})
-    for i in range(1, antall_ar + 1):
-        verdi *= (1.0 + rate)
-        out.append({"År": i, "Verdi": round(verdi)})
-    return out
-
 # ================ Pending LOAD ================
+ytelse.neste("Pending load")
 if st.session_state["pending_profile_name"]:
     sel = st.session_state["pending_profile_name"]
-    p = st.session_state["profiles"].get(sel, {})
+    p, versjon, _ = profilbase.hent_versjon(sel)
+    p = p or {}
+    if "cover_b64" in p:
+        # Profil lagret før bildelageret: flytt bildet ut og skriv profilen tilbake uten base64
+        r = profilbase.lagre_flettet(sel, flytt_cover_til_lager(copy.deepcopy(p), bildelager), p, versjon, bruker)
+        p, versjon = r.profil, r.versjon
+    # Utgangspunktet for fletting når profilen lagres igjen (kopi: persist muteres på plass)
+    st.session_state["_profil_basis"] = {"navn": sel, "profil": copy.deepcopy(p), "versjon": versjon}
 
     # Persist (grunninfo)
     st.session_state["persist"]["prosjekt_navn"] = p.get("prosjekt_navn", sel)
     st.session_state["persist"]["finn_url"]      = p.get("finn_url", "")
     st.session_state["persist"]["note"]          = p.get("note", "")
     st.session_state["persist"]["cover_url"]     = p.get("cover_url", "")
-    if p.get("cover_b64"):
-        st.session_state["persist"]["cover_b64"] = p.get("cover_b64", "")
+    if p.get("cover_hash"):
+        st.session_state["persist"]["cover_hash"] = p.get("cover_hash", "")
 
     # Kjøp/inntekter
     st.session_state["persist"]["kjøpesum"]   = p.get("kjøpesum", 0)
@@ -153,6 +129,11 @@ if st.session_state["pending_profile_name"]:
     st.session_state["persist"]["use_rooms_total"] = p.get("use_rooms_total", False)
     st.session_state["persist"]["rooms_leie"] = p.get("rooms_leie", {})
     st.session_state["persist"]["antall_rom"] = p.get("antall_rom", 0)
+    st.session_state.pop("rooms_editor", None)  # ellers legges gamle celleendringer over profilen
+    st.session_state["persist"]["leie_mnd"]        = p.get("leie_mnd", [])
+    st.session_state["persist"]["leieliste_hash"]  = p.get("leieliste_hash", "")
+    st.session_state["persist"]["leieliste_start"] = p.get("leieliste_start", "")
+    st.session_state.pop("leieliste_startdato", None)
 
     # Kostnader
     st.session_state["persist"]["opp"]       = p.get("oppussing", {})
@@ -165,6 +146,12 @@ if st.session_state["pending_profile_name"]:
     st.session_state["avdragsfri"]  = p.get("avdragsfri", 2)
     st.session_state["lånetype"]    = p.get("lånetype", "Annuitetslån")
     st.session_state["eierform"]    = p.get("eierform", "Privat")
+    st.session_state["persist"]["lånehendelser"] = p.get("lånehendelser", [])
+    st.session_state.pop("lanehendelser_editor", None)
+    st.session_state.pop("_lånehendelser_basis", None)
+
+    # Verdi
+    st.session_state["verdistigning"] = p.get("verdistigning", VERDISTIGNING_STANDARD)
 
     # Oppdater UI felter som bruker faste keys
     st.session_state["prosjektnavn_input"] = st.session_state["persist"]["prosjekt_navn"]
@@ -174,6 +161,7 @@ if st.session_state["pending_profile_name"]:
     st.rerun()
 
 # ========================= Sidebar: Grunninfo =========================
+ytelse.neste("Sidebar")
 st.sidebar.header("🧾 Eiendomsinfo")
 
 proj_navn = st.sidebar.text_input(
@@ -217,12 +205,22 @@ if cover_url and not cover_url.startswith(("http://", "https://")):
 st.session_state["persist"]["cover_url"] = cover_url
 
 uploaded_cover = st.sidebar.file_uploader("…eller last opp JPG/PNG", type=["jpg", "jpeg", "png"])
-if uploaded_cover is not None:
-    cover_b64 = _img_bytes_to_b64(uploaded_cover.read())
-    st.session_state["persist"]["cover_b64"] = cover_b64
-    mark_dirty()
-else:
-    cover_b64 = st.session_state["persist"].get("cover_b64", "")
+if uploaded_cover is not None and st.session_state.get("_cover_fil") != uploaded_cover.file_id:
+    # Ny opplasting: lagres og markeres én gang; senere reruns med samme fil hasher den ikke på nytt
+    try:
+        ny_hash = bildelager.lagre(uploaded_cover.getvalue())
+    except (UnidentifiedImageError, OSError) as e:
+        st.sidebar.error(f"Kunne ikke lese bildet: {e}")
+    else:
+        st.session_state["_cover_fil"] = uploaded_cover.file_id
+        if st.session_state["persist"].get("cover_hash") != ny_hash:
+            st.session_state["persist"]["cover_hash"] = ny_hash
+            mark_dirty()
+cover_hash = st.session_state["persist"].get("cover_hash", "")
+if cover_hash:
+    miniatyr = bildelager.miniatyr(cover_hash)
+    if miniatyr:
+        st.sidebar.image(miniatyr, caption="Forsidebilde")
 
 # ========================= Kjøp & Inntekter =========================
 kjøpesum = st.sidebar.number_input(
@@ -232,64 +230,150 @@ kjøpesum = st.sidebar.number_input(
     on_change=mark_dirty,
 )
 st.session_state["persist"]["kjøpesum"] = int(kjøpesum)
-dokumentavgift = int(kjøpesum * 0.025)
 
 # ========================= Expanders =========================
+# Rom, oppussing og drift er fragmenter: en endring kjører bare fragmentet på nytt.
+# Hele appen kjøres først når verdien beregningen bruker faktisk er endret.
+ROM_EDITOR_GRENSE = 20  # flere rom enn dette redigeres i én tabell i stedet for ett felt pr. rom
+
+def _i_fragment() -> bool:
+    return not st.session_state.get("_full_kjøring", False)
+
+def _avviker_fra_beregningen(**verdier) -> bool:
+    """Om verdiene avviker fra siste fulle kjøring. Alltid False i en full kjøring: der beregnes alt etterpå."""
+    graf = st.session_state.get("_graf")
+    return graf is not None and _i_fragment() and graf.avviker(**verdier)
+
+def _avslutt_fragment(**beregnet):
+    """Full rerun hvis beregningsgrunnlaget er endret; ellers lagres endringene direkte."""
+    if _avviker_fra_beregningen(**beregnet):
+        st.rerun(scope="app")
+    if _i_fragment():
+        lagre_hvis_endret()
+
 # --- ROM & LEIE PR. ROM ---
-with st.sidebar.expander("🏠 Rom & leie pr. rom", expanded=False):
+@st.fragment
+def _rom_og_leie():
+    persist = st.session_state["persist"]
     antall_rom = st.number_input(
         "Antall rom",
         min_value=0,
         step=1,
-        value=int(st.session_state["persist"].get("antall_rom", 0)),
+        value=int(persist.get("antall_rom", 0)),
         on_change=mark_dirty,
         key="rooms_count",
     )
-    st.session_state["persist"]["antall_rom"] = int(antall_rom)
-
-    rooms_key = "rooms_leie"
-    st.session_state["persist"].setdefault(rooms_key, {})
-    sum_rom = 0
-    for i in range(int(antall_rom)):
-        rk = f"rom_{i+1}"
-        default_val = int(st.session_state["persist"][rooms_key].get(rk, 0))
-        val = st.number_input(f"Rom {i+1} (kr/mnd)", min_value=0, step=500, value=default_val, key=f"room_input_{i+1}")
-        if st.session_state["persist"][rooms_key].get(rk) != int(val):
-            st.session_state["persist"][rooms_key][rk] = int(val)
+    antall_rom = int(antall_rom)
+    persist["antall_rom"] = antall_rom
+
+    rooms = persist.setdefault("rooms_leie", {})
+    if antall_rom > ROM_EDITOR_GRENSE:
+        # Én tabell (virtualisert) i stedet for ett widget pr. rom
+        lagret = np.array([int(rooms.get(f"rom_{i+1}", 0)) for i in range(antall_rom)], dtype=np.int64)
+        redigert = st.data_editor(
+            pd.DataFrame({"Rom": np.arange(1, antall_rom + 1), "Leie (kr/mnd)": lagret}),
+            key="rooms_editor",
+            num_rows="fixed",
+            hide_index=True,
+            disabled=["Rom"],
+            height=320,
+            use_container_width=True,
+            column_config={"Leie (kr/mnd)": st.column_config.NumberColumn(min_value=0, step=500, format="%d")},
+        )
+        leie_pr_rom = redigert["Leie (kr/mnd)"].fillna(0).to_numpy(dtype=np.int64)
+        endret = np.flatnonzero(leie_pr_rom != lagret)
+        for i in endret:
+            rooms[f"rom_{i+1}"] = int(leie_pr_rom[i])
+        if len(endret):
             mark_dirty()
-        sum_rom += int(val)
+        sum_rom = int(leie_pr_rom.sum())
+    else:
+        sum_rom = 0
+        for i in range(antall_rom):
+            rk = f"rom_{i+1}"
+            default_val = int(rooms.get(rk, 0))
+            val = st.number_input(f"Rom {i+1} (kr/mnd)", min_value=0, step=500, value=default_val, key=f"room_input_{i+1}")
+            if rooms.get(rk) != int(val):
+                rooms[rk] = int(val)
+                mark_dirty()
+            sum_rom += int(val)
+    if antall_rom:
+        st.caption(f"**Sum rom:** {sum_rom:,} kr/mnd")
 
     use_rooms_total = st.checkbox(
         "Bruk sum av rom som total leie",
-        value=bool(st.session_state["persist"].get("use_rooms_total", False)),
+        value=bool(persist.get("use_rooms_total", False)),
         key="use_rooms_total_chk"
     )
-    st.session_state["persist"]["use_rooms_total"] = use_rooms_total
+    persist["use_rooms_total"] = use_rooms_total
 
     leie_input = st.number_input(
         "Leieinntekter – total (kr/mnd)",
-        value=int(st.session_state["persist"].get("leie", 22_000)),
+        value=int(persist.get("leie", 22_000)),
         step=1_000,
         on_change=mark_dirty,
         key="leie_total_input",
     )
-    st.session_state["persist"]["leie"] = int(leie_input)
+    persist["leie"] = int(leie_input)
+
+    # Romlisten alene endrer ikke tallene når totalleien brukes; romtabellen og rapportene venter
+    effektiv_leie = Eiendomsinput(leie=int(leie_input), use_rooms_total=use_rooms_total, rooms_leie=rooms,
+                                  antall_rom=antall_rom, leie_mnd=persist.get("leie_mnd", [])).effektiv_leie
+    if (not _avviker_fra_beregningen(effektiv_leie=effektiv_leie)
+            and _avviker_fra_beregningen(antall_rom=antall_rom, rooms_leie=rooms, use_rooms_total=use_rooms_total)):
+        st.caption("Romlisten er endret. Romtabellen og rapportene oppdateres ved neste endring utenfor denne boksen.")
+        if st.button("Oppdater nå", key="btn_rom_oppdater"):
+            st.rerun(scope="app")
+    _avslutt_fragment(effektiv_leie=effektiv_leie)
 
-# Leie som brukes i videre beregning
-leie = int(sum_rom) if st.session_state["persist"].get("use_rooms_total", False) else int(st.session_state["persist"].get("leie", 0))
+with st.sidebar.expander("🏠 Rom & leie pr. rom", expanded=False):
+    _rom_og_leie()
+
+# --- LEIELISTE (IMPORT) ---
+with st.sidebar.expander("📋 Leieliste (import)", expanded=False):
+    st.caption("CSV eller JSON med én rad pr. enhet: leie, type, start, slutt og ledighet. "
+               "Leien varierer da over tid og erstatter totalleien over.")
+    ledighet_standard = st.number_input("Ledighet for tomme celler (%)", min_value=0.0, max_value=100.0,
+                                        value=5.0, step=1.0, key="leieliste_ledighet") / 100
+    lagret_start = st.session_state["persist"].get("leieliste_start") or pd.Timestamp.today().strftime("%Y-%m")
+    leieliste_start = st.date_input("Første måned i beregningen", value=pd.Timestamp(lagret_start).date(),
+                                    key="leieliste_startdato", format="DD.MM.YYYY").strftime("%Y-%m")
+    opplastet_liste = st.file_uploader("Leieliste", type=["csv", "json", "jsonl"], key="leieliste_fil")
+    leieliste = None
+    if opplastet_liste is not None and st.session_state.get("_leieliste_fil_id") != opplastet_liste.file_id:
+        try:
+            leieliste = les_leieliste(opplastet_liste.getvalue(), opplastet_liste.name, ledighet_standard)
+        except (ValueError, UnicodeDecodeError) as e:
+            st.error(f"Kunne ikke lese leielisten: {e}")
+        else:
+            st.session_state["_leieliste_fil_id"] = opplastet_liste.file_id
+            st.session_state["persist"]["leieliste_hash"] = leielistelager.lagre(leieliste)
+            st.session_state["persist"]["leieliste_start"] = ""  # beregnes under
+    leieliste_hash = st.session_state["persist"].get("leieliste_hash", "")
+    if leieliste_hash:
+        leieliste = leieliste or leielistelager.hent(leieliste_hash)
+    if leieliste is not None:
+        if st.session_state["persist"].get("leieliste_start") != leieliste_start:
+            st.session_state["persist"]["leie_mnd"] = leie_mnd_for_profil(leieliste, leieliste_start)
+            st.session_state["persist"]["leieliste_start"] = leieliste_start
+            mark_dirty()
+        st.caption(f"{len(leieliste):,} enheter · {leieliste.leie.sum():,.0f} kr/mnd i kontraktsleie")
+        st.dataframe(leieliste.oppsummering(), hide_index=True, use_container_width=True)
+
+        def _fjern_leieliste():
+            for k in ("leie_mnd", "leieliste_hash", "leieliste_start"):
+                st.session_state["persist"].pop(k, None)
+            st.session_state.pop("_leieliste_fil_id", None)
+            mark_dirty()
+
+        st.button("Fjern leieliste", on_click=_fjern_leieliste, key="btn_leieliste_fjern")
+    elif leieliste_hash:
+        st.warning("Leielisten til profilen finnes ikke i lageret; den lagrede månedsleien brukes.")
 
 # --- OPPUSSING ---
-with st.sidebar.expander("🔨 Oppussing", expanded=False):
-    oppussing_defaults = {
-        "riving": 20000,
-        "bad": 120000,
-        "kjøkken": 100000,
-        "overflate": 30000,
-        "gulv": 40000,
-        "rørlegger": 25000,
-        "elektriker": 30000,
-        "utvendig": 20000,
-    }
+@st.fragment
+def _oppussing():
+    oppussing_defaults = OPPUSSING_STANDARD
     st.session_state["persist"].setdefault("opp", oppussing_defaults.copy())
 
     def _reset_opp_to_zero():
@@ -316,18 +400,15 @@ with st.sidebar.expander("🔨 Oppussing", expanded=False):
             mark_dirty()
         oppussing_total += val
     st.caption(f"**Sum oppussing:** {oppussing_total:,} kr")
+    _avslutt_fragment(oppussing_total=oppussing_total)
+
+with st.sidebar.expander("🔨 Oppussing", expanded=False):
+    _oppussing()
 
 # --- DRIFTSKOSTNADER (MND) ---
-with st.sidebar.expander("💡 Driftskostnader (per måned)", expanded=False):
-    driftskostnader_defaults = {
-        "felleskostnader": 0,
-        "kommunale avgifter": 0,
-        "strøm": 0,
-        "internett": 0,
-        "forsikring": 0,
-        "vedlikehold": 0,
-        "husleie (kostnad)": 0,  # hvis aktuelt
-    }
+@st.fragment
+def _driftskostnader():
+    driftskostnader_defaults = DRIFT_STANDARD
     st.session_state["persist"].setdefault("drift_mnd", driftskostnader_defaults.copy())
 
     def _reset_drift_to_zero():
@@ -354,23 +435,20 @@ with st.sidebar.expander("💡 Driftskostnader (per måned)", expanded=False):
             mark_dirty()
         drift_mnd_total += val
     st.caption(f"**Sum drift / mnd:** {drift_mnd_total:,} kr")
+    _avslutt_fragment(drift_mnd_total=drift_mnd_total)
+
+with st.sidebar.expander("💡 Driftskostnader (per måned)", expanded=False):
+    _driftskostnader()
 
 # --- LÅN ---
 with st.sidebar.expander("🏦 Lån", expanded=False):
-    lån_defaults = {
-        "egenkapital": 300000,
-        "rente": 5.0,
-        "løpetid": 25,
-        "avdragsfri": 2,
-        "lånetype": "Annuitetslån",
-        "eierform": "Privat",
-    }
+    lån_defaults = LÅN_STANDARD
     for k, v in lån_defaults.items():
         if k not in st.session_state:
             st.session_state[k] = st.session_state["persist"].get(k, v)
 
     st.session_state["egenkapital"] = st.number_input("Egenkapital (kr)", value=int(st.session_state["egenkapital"]), step=10000)
-    st.session_state["rente"] = st.number_input("Rente (%)", value=float(st.session_state["rente"]), step=0.1)
+    st.session_state["rente"] = st.number_input("Rente (%)", value=float(st.session_state["rente"]), step=0.1, min_value=0.0)
     st.session_state["løpetid"] = st.number_input("Løpetid (år)", value=int(st.session_state["løpetid"]), step=1, min_value=1)
     st.session_state["avdragsfri"] = st.number_input("Avdragsfri (år)", value=int(st.session_state["avdragsfri"]), step=1, min_value=0)
     st.session_state["lånetype"] = st.selectbox("Lånetype", ["Annuitetslån", "Serielån"], index=["Annuitetslån", "Serielån"].index(st.session_state["lånetype"]))
@@ -381,32 +459,118 @@ with st.sidebar.expander("🏦 Lån", expanded=False):
             st.session_state["persist"][k] = st.session_state[k]
             mark_dirty()
 
-# ========================= Beregninger =========================
-total_investering = int(kjøpesum + dokumentavgift + oppussing_total)
-lånebeløp = max(total_investering - int(st.session_state["egenkapital"]), 0)
-st.session_state["lån"] = lånebeløp
+    st.markdown("**Lånehendelser**")
+    st.caption(
+        "Renteendring, fastrente, ekstra innbetaling (engang eller løpende t.o.m. en måned), "
+        "leieendring og refinansiering. Måned 1 = første måned i lånet."
+    )
+    # Editoren får et fast utgangspunkt; endringene i editor-state legges oppå det
+    if "_lånehendelser_basis" not in st.session_state:
+        st.session_state["_lånehendelser_basis"] = list(st.session_state["persist"].get("lånehendelser", []))
+    hendelse_kolonner = ["type", "måned", "rente", "måneder", "beløp", "til_måned", "hver", "forkort",
+                         "leie", "løpetid", "lånetype", "avdragsfri", "gebyr"]
+    hendelser_df = pd.DataFrame(st.session_state["_lånehendelser_basis"], columns=hendelse_kolonner)
+    hendelser_df["forkort"] = hendelser_df["forkort"].fillna(True).astype(bool)  # brukes bare av ekstra innbetalinger
+    redigert = st.data_editor(
+        hendelser_df,
+        key="lanehendelser_editor",
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "type": st.column_config.SelectboxColumn("Type", options=list(HENDELSESTYPER), required=True),
+            "måned": st.column_config.NumberColumn("Måned", min_value=1, step=1, format="%d"),
+            "rente": st.column_config.NumberColumn("Rente (%)", min_value=0.0, step=0.1),
+            "måneder": st.column_config.NumberColumn("Fastrente (mnd)", min_value=1, step=1, format="%d"),
+            "beløp": st.column_config.NumberColumn("Beløp (kr)", min_value=0, step=10_000, format="%d"),
+            "til_måned": st.column_config.NumberColumn("Til måned", min_value=1, step=1, format="%d"),
+            "hver": st.column_config.NumberColumn("Hver (mnd)", min_value=1, step=1, format="%d"),
+            "forkort": st.column_config.CheckboxColumn("Forkort løpetid"),
+            "leie": st.column_config.NumberColumn("Ny leie (kr/mnd)", min_value=0, step=500, format="%d"),
+            "løpetid": st.column_config.NumberColumn("Ny løpetid (år)", min_value=1, step=1, format="%d"),
+            "lånetype": st.column_config.SelectboxColumn("Ny lånetype", options=list(LÅNETYPER)),
+            "avdragsfri": st.column_config.NumberColumn("Ny avdragsfri (år)", min_value=0, step=1, format="%d"),
+            "gebyr": st.column_config.NumberColumn("Gebyr (kr)", min_value=0, step=1_000, format="%d"),
+        },
+    )
+    lånehendelser, hendelsesfeil = [], []
+    for nr, rad in enumerate(redigert.to_dict("records"), start=1):
+        if not isinstance(rad.get("type"), str):
+            continue
+        try:
+            lånehendelser.append(hendelse_til_dict(hendelse_fra_dict(rad)))
+        except ValueError as e:
+            hendelsesfeil.append(f"Rad {nr}: {e}")
+    for feil in hendelsesfeil:
+        st.warning(feil)
+    if st.session_state["persist"].get("lånehendelser", []) != lånehendelser:
+        st.session_state["persist"]["lånehendelser"] = lånehendelser
+        mark_dirty()
+
+# --- VERDI ---
+with st.sidebar.expander("📈 Verdiutvikling", expanded=False):
+    if "verdistigning" not in st.session_state:
+        st.session_state["verdistigning"] = st.session_state["persist"].get("verdistigning", VERDISTIGNING_STANDARD)
+    st.session_state["verdistigning"] = st.number_input(
+        "Verdistigning (% pr. år)", value=float(st.session_state["verdistigning"]), step=0.5, min_value=-20.0, max_value=20.0
+    )
+    if st.session_state["persist"].get("verdistigning") != st.session_state["verdistigning"]:
+        st.session_state["persist"]["verdistigning"] = st.session_state["verdistigning"]
+        mark_dirty()
 
-df, _akk = beregn_lån(
-    lån=int(st.session_state["lån"]),
+# ========================= Beregninger =========================
+ytelse.neste("Beregninger")
+persist = st.session_state["persist"]
+inp = Eiendomsinput(
+    prosjekt_navn=proj_navn,
+    finn_url=finn_url,
+    note=note,
+    cover_url=persist.get("cover_url", ""),
+    cover_hash=persist.get("cover_hash", ""),
+    kjøpesum=int(kjøpesum),
+    leie=int(persist.get("leie", 0)),
+    use_rooms_total=bool(persist.get("use_rooms_total", False)),
+    rooms_leie=persist.get("rooms_leie", {}),
+    antall_rom=int(persist.get("antall_rom", 0)),
+    leie_mnd=persist.get("leie_mnd", []),
+    leieliste_hash=persist.get("leieliste_hash", ""),
+    leieliste_start=persist.get("leieliste_start", ""),
+    oppussing=persist.get("opp", {}),
+    drift_mnd=persist.get("drift_mnd", {}),
+    egenkapital=int(st.session_state["egenkapital"]),
     rente=float(st.session_state["rente"]),
     løpetid=int(st.session_state["løpetid"]),
     avdragsfri=int(st.session_state["avdragsfri"]),
     lånetype=st.session_state["lånetype"],
-    leie=int(leie),
-    drift_mnd=int(drift_mnd_total),
-    eierform=st.session_state["eierform"]
+    eierform=st.session_state["eierform"],
+    lånehendelser=persist.get("lånehendelser", []),
+    verdistigning=float(st.session_state["verdistigning"]),
 )
+# Memoisert graf: bare noder med endret input beregnes på nytt (f.eks. ingenting ved endret notat)
+if "_graf" not in st.session_state:
+    st.session_state["_graf"] = kalkulatorgraf(bildelager)
+graf = st.session_state["_graf"]
+graf.sett_input(inp)
+res = graf.hent("beregning")
+
+# Leie som brukes i videre beregning
+leie = res.leie
+drift_mnd_total = res.drift_mnd_total
+total_investering = res.total_investering
+lånebeløp = res.lånebeløp
+st.session_state["lån"] = lånebeløp
 
-kpis_1 = _first_month_kpis(df)
-breakeven_mnd = _break_even_month(df)
-skatt = _skattefradrag_estimat(df, drift_mnd_total)
+df = res.df
+kpis_1 = res.kpis_1
+breakeven_mnd = res.breakeven_mnd
+skatt = res.skatt
 
 # Verdistigning (startverdi = kjøpesum + oppussing)
-startverdi = float(kjøpesum + oppussing_total)
-verdistigning = _verdistigning_liste(startverdi, int(st.session_state["løpetid"]), rate=0.025)
-verdi_df = pd.DataFrame(verdistigning)
+verdistigning = res.verdistigning
+verdi_df = graf.hent("verdi_df")
 
 # ========================= Profiler =========================
+ytelse.neste("Profiler")
 st.sidebar.markdown("---")
 st.sidebar.subheader("📁 Profiler")
 
@@ -417,65 +581,64 @@ profile_name = st.sidebar.text_input(
 )
 
 def _current_profile_payload() -> dict:
-    return {
-        "prosjekt_navn": st.session_state["persist"].get("prosjekt_navn", profile_name),
-        "finn_url":      st.session_state["persist"].get("finn_url", ""),
-        "note":          st.session_state["persist"].get("note", ""),
-        "cover_url":     st.session_state["persist"].get("cover_url", ""),
-        "cover_b64":     st.session_state["persist"].get("cover_b64", ""),
-        # kjøp/inntekter
-        "kjøpesum":      int(kjøpesum),
-        "leie":          int(st.session_state["persist"].get("leie", 0)),
-        "use_rooms_total": bool(st.session_state["persist"].get("use_rooms_total", False)),
-        "rooms_leie":    st.session_state["persist"].get("rooms_leie", {}),
-        "antall_rom":    int(st.session_state["persist"].get("antall_rom", 0)),
-        # kostnader
-        "oppussing":     st.session_state["persist"].get("opp", {}),
-        "drift_mnd":     st.session_state["persist"].get("drift_mnd", {}),
-        # lån
-        "egenkapital":   int(st.session_state["egenkapital"]),
-        "rente":         float(st.session_state["rente"]),
-        "løpetid":       int(st.session_state["løpetid"]),
-        "avdragsfri":    int(st.session_state["avdragsfri"]),
-        "lånetype":      st.session_state["lånetype"],
-        "eierform":      st.session_state["eierform"],
-    }
-
-def _save_profiles_now():
-    _save_json(PROFILES_PATH, st.session_state["profiles"])
+    return inp.til_profil()
 
 if st.sidebar.button("💾 Lagre profil", key="btn_save_profile"):
     name = (profile_name or "").strip() or "Uten navn"
-    st.session_state["profiles"][name] = _current_profile_payload()
-    _save_profiles_now()
-    st.sidebar.success(f"Lagret: {name}")
+    payload = _current_profile_payload()
+    basis = st.session_state.get("_profil_basis") or {}
+    if basis.get("navn") == name:
+        r = profilbase.lagre_flettet(name, payload, basis["profil"], basis["versjon"], bruker)
+    else:
+        # Nytt navn eller ingen lastet profil: overskriv uten fletting
+        r = profilbase.lagre_flettet(name, payload, bruker=bruker)
+    st.session_state["_profil_basis"] = {"navn": name, "profil": copy.deepcopy(r.profil), "versjon": r.versjon}
+    melding = f"Lagret: {name} (versjon {r.versjon})"
+    if r.flettet:
+        melding += f" – flettet med endringer fra {r.endret_av or 'en annen sesjon'}"
+    st.session_state["_profil_melding"] = (melding, r.konflikter)
+    if r.profil != payload:
+        # Andres endringer ble tatt med: last den flettede profilen inn i skjemaet
+        st.session_state["pending_profile_name"] = name
+        st.rerun()
 
-existing = ["(Velg)"] + sorted(st.session_state["profiles"].keys())
+if "_profil_melding" in st.session_state:
+    melding, konflikter = st.session_state.pop("_profil_melding")
+    st.sidebar.success(melding)
+    if konflikter:
+        st.sidebar.warning("Endret av begge, din versjon ble beholdt: " + ", ".join(konflikter))
+
+existing = ["(Velg)"] + profilbase.navn()
 sel = st.sidebar.selectbox("Åpne / Slett profil", options=existing, index=0, key="profile_select")
 
 def _queue_load_profile(name: str):
     st.session_state["pending_profile_name"] = name
 
 def _delete_selected(name: str):
-    st.session_state["profiles"].pop(name, None)
-    _save_profiles_now()
+    profilbase.slett(name)
     st.sidebar.warning(f"Slettet: {name}")
 
 if sel != "(Velg)":
     st.sidebar.button("📂 Last profil", key="btn_load_profile", on_click=_queue_load_profile, args=(sel,))
     st.sidebar.button("🗑️ Slett profil", key="btn_delete_profile", on_click=_delete_selected, args=(sel,))
 
+with st.sidebar.expander("📊 Profiloversikt", expanded=False):
+    sorter = st.selectbox("Sorter på", ["netto_yield", *[k for k in KPI_KOLONNER if k != "netto_yield"], "navn"], key="profil_sorter")
+    st.dataframe(
+        profilbase.oversikt(sorter, synkende=sorter not in ("navn", "break_even_mnd")),
+        use_container_width=True, hide_index=True, height=240,
+    )
+
 # ========================= Hovedinnhold =========================
+ytelse.neste("Hovedinnhold")
 st.markdown("---")
 col1, col2 = st.columns([1, 1.4])
 
 with col1:
     st.subheader("✨ Resultater")
-    brutto_yield = (leie * 12 / total_investering) * 100 if total_investering else 0
-    netto_yield = ((leie * 12 - drift_mnd_total * 12) / total_investering) * 100 if total_investering else 0
     st.metric("Total investering", f"{int(total_investering):,} kr")
-    st.metric("Brutto yield", f"{brutto_yield:.2f} %")
-    st.metric("Netto yield", f"{netto_yield:.2f} %")
+    st.metric("Brutto yield", f"{res.brutto_yield:.2f} %")
+    st.metric("Netto yield", f"{res.netto_yield:.2f} %")
     st.metric("Lån", f"{int(st.session_state['lån']):,} kr")
     st.metric("Termin 1. mnd (ca.)", f"{kpis_1['termin']:,.0f} kr")
     st.metric("Netto 1. mnd (ca.)", f"{kpis_1['netto']:,.0f} kr")
@@ -491,9 +654,41 @@ with col1:
     )
     st.caption("Forenklet oversikt. Vedlikehold er normalt fradragsberettiget, mens påkostning ikke er det.")
 
+    st.subheader(f"Skatt over løpetiden ({st.session_state['eierform']})")
+    s1, s2 = st.columns(2)
+    s1.metric("Skatt totalt", f"{skatt['skatt_total']:,.0f} kr")
+    s2.metric("Kontantstrøm etter skatt", f"{skatt['etter_skatt_total']:,.0f} kr")
+    if skatt["underskudd_fremført"] > 0:
+        st.caption(f"Fremførbart underskudd ved slutt: {skatt['underskudd_fremført']:,.0f} kr")
+    with st.expander("🧾 Skatt pr. år", expanded=False):
+        st.dataframe(res.skatt_år.round(0), use_container_width=True, hide_index=True)
+        st.caption(
+            "22 % av leie minus renter og drift pr. inntektsår. Privat: underskudd gir fradrag i annen "
+            "inntekt samme år. AS: underskudd fremføres mot senere overskudd. Negativ skatt er skattefordel."
+        )
+
     st.subheader("Kontantstrøm (første 60 måneder)")
     st.dataframe(df.head(60), use_container_width=True, height=420)
 
+    forløp = graf.hent("låneforløp")
+    if forløp is not None:
+        with st.expander(f"🏦 Låneforløp: {len(forløp)} segmenter", expanded=False):
+            st.dataframe(forløp.segmenttabell().round(2), use_container_width=True, hide_index=True)
+            if forløp.nedbetalt_mnd:
+                st.caption(f"Lånet er nedbetalt i måned {forløp.nedbetalt_mnd} av {forløp.horisont}.")
+
+    e1, e2 = st.columns([1, 2])
+    eksport_format = e1.selectbox("Format", list(MIME), key="eksport_format", label_visibility="collapsed")
+    e2.download_button(
+        f"⬇️ Last ned full tidsserie ({len(df)} mnd)",
+        # Callable: filen bygges først ved klikk
+        data=lambda: eksport_bytes(tidsserie_chunks(df), eksport_format),
+        file_name=f"tidsserie{FILENDELSE[eksport_format]}",
+        mime=MIME[eksport_format],
+        use_container_width=True,
+        key="btn_eksport_tidsserie",
+    )
+
 with col2:
     st.subheader("Oppsummering")
     st.write(
@@ -507,9 +702,17 @@ with col2:
     )
 
     # Romtabell i UI (hvis valgt)
-    rooms = st.session_state["persist"].get("rooms_leie", {})
-    antall_rom_ui = int(st.session_state["persist"].get("antall_rom", 0))
-    if antall_rom_ui > 0:
+    rooms = inp.rooms_leie
+    antall_rom_ui = inp.antall_rom
+    if antall_rom_ui > ROM_EDITOR_GRENSE:
+        st.subheader("Rom & leie pr. rom")
+        st.caption(f"{antall_rom_ui} rom · sum {inp.sum_rom:,} kr/mnd")
+        df_rooms = pd.DataFrame({
+            "Rom": np.arange(1, antall_rom_ui + 1),
+            "Leie (kr/mnd)": [int(rooms.get(f"rom_{i+1}", 0)) for i in range(antall_rom_ui)],
+        })
+        st.dataframe(df_rooms, hide_index=True, use_container_width=True, height=360)
+    elif antall_rom_ui > 0:
         st.subheader("Rom & leie pr. rom")
         rows = [{"Rom": i+1, "Leie (kr/mnd)": int(rooms.get(f"rom_{i+1}", 0))} for i in range(antall_rom_ui)]
         if rows:
@@ -517,320 +720,262 @@ with col2:
             df_rooms.loc["Sum"] = ["", df_rooms["Leie (kr/mnd)"].sum()]
             st.table(df_rooms)
 
-    st.subheader("Verdiutvikling (2,5 % årlig)")
+    if inp.leie_mnd:
+        st.subheader("Leie pr. måned (leieliste)")
+        if leieliste is not None:
+            st.area_chart(leie_pr_type(leieliste, inp.leieliste_start, len(df)), height=260)
+        else:
+            st.line_chart(pd.DataFrame({"Leie": inp.leie_serie(len(df))}, index=df["Måned"]), height=260)
+
+    st.subheader(f"Verdiutvikling ({verdistigning_tekst(inp.verdistigning_sats)})")
     st.dataframe(verdi_df, use_container_width=True, height=360)
 
-# ========================= Presentasjon (HTML – detalj) =========================
-def lag_presentasjon_html(
-    df: pd.DataFrame,
-    prosjekt_navn: str,
-    finn_url: str,
-    note: str,
-    cover_url: str = "",
-    cover_b64: str = "",
-    kjøpesum: int = 0,
-    dokumentavgift: int = 0,
-    oppussing_total: int = 0,
-    drift_mnd: int = 0,
-    total_investering: int = 0,
-    leie: int = 0,
-    rente: float = 0.0,
-    løpetid: int = 0,
-    avdragsfri: int = 0,
-    lånetype: str = "Annuitetslån",
-    eierform: str = "Privat",
-    egenkapital: int = 0,
-    # Rom
-    antall_rom: int = 0,
-    rom_renter: dict | None = None,
-    # Skatt og verdi
-    skatt: dict | None = None,
-    verdi_tabell: list[dict] | None = None,
-) -> bytes:
-    def _safe(s: str) -> str:
-        return (s or "").replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-
-    # Klikkbar lenke + rå-URL fallback (for PDF-lesere som autolinker ren tekst)
-    finn_html = ""
-    if finn_url:
-        safe_url = _safe(finn_url)
-        finn_html = f'''
-          <p>
-            <a href="{safe_url}" target="_blank" rel="noopener noreferrer" class="btn" style="pointer-events:auto; cursor:pointer;">
-              🔗 Åpne FINN-annonsen
-            </a>
-          </p>
-          <p class="muted" style="margin-top:-6px;">
-            Direkte lenke: <span style="text-decoration:underline; color:#0b63ce;">{safe_url}</span>
-          </p>
-        '''
-
-    # Forsidebilde – litt mindre
-    cover_html = ""
-    if cover_b64:
-        cover_html = f'''
-          <div class="hero-img">
-            <img src="data:image/png;base64,{cover_b64}" alt="Forsidebilde" />
-          </div>'''
-    elif cover_url:
-        cover_html = f'''
-          <div class="hero-img">
-            <img src="{_safe(cover_url)}" alt="Forsidebilde" />
-          </div>'''
-
-    # Rom-detaljer
-    rom_sum = sum((rom_renter or {}).values()) if rom_renter else 0
-    leie_kilde = "Sum av rom" if rom_renter and rom_sum == leie else "Manuelt totalt"
-    snitt_pr_rom = int(leie / antall_rom) if antall_rom > 0 else 0
-
-    # Kontantstrømstabell (første 24 mnd)
-    vis_mnd = min(24, len(df))
-    cash_rows = []
-    for i in range(vis_mnd):
-        r = df.iloc[i]
-        cash_rows.append(
-            f"<tr>"
-            f"<td>{int(r['Måned'])}</td>"
-            f"<td>{r['Restgjeld']:,.0f}</td>"
-            f"<td>{r['Avdrag']:,.0f}</td>"
-            f"<td>{r['Renter']:,.0f}</td>"
-            f"<td>{r['Netto cashflow']:,.0f}</td>"
-            f"<td>{r['Akk. cashflow']:,.0f}</td>"
-            f"</tr>"
-        )
-    cash_html = "".join(cash_rows)
-
-    # Oppussingstabell
-    opp_rows = ""
-    if oppussing_total:
-        opp_dict = st.session_state['persist'].get('opp', {}) or {}
-        opp_rows = (
-            "<table class='tight'><thead><tr><th>Tiltak</th><th>Beløp</th></tr></thead><tbody>"
-            + "".join(f"<tr><td>{_safe(k.capitalize())}</td><td>{int(v):,} kr</td></tr>"
-                      for k, v in opp_dict.items())
-            + f"<tr class='total'><td>Sum</td><td>{oppussing_total:,.0f} kr</td></tr>"
-            + "</tbody></table>"
+# ========================= Målsøk =========================
+ytelse.neste("Målsøk")
+with st.expander("🎯 Målsøk: maks kjøpesum, min leie, min egenkapital, maks rente", expanded=False):
+    m1, m2 = st.columns([1.4, 1])
+    mål = m1.radio("Mål", list(MÅL), format_func=MÅL.get, key="maalsok_maal", horizontal=True)
+    if mål == "netto_1":
+        terskel = m2.number_input("Netto 1. mnd minst (kr)", value=0, step=500, key="maalsok_terskel")
+        maks_mnd = 0
+    else:
+        terskel = 0
+        maks_mnd = m2.number_input("Break-even innen (mnd)", min_value=1, max_value=480, value=60, step=6,
+                                   key="maalsok_mnd")
+    if inp.lånehendelser:
+        st.warning(
+            f"Målsøket regner på grunnlånet uten de {len(inp.lånehendelser)} lånehendelsene, så grensene "
+            "kan avvike fra nøkkeltallene over, som tar dem med."
         )
+    # Hver variabel løses for seg, alt annet likt; tar millisekunder (lukket form, ingen rerun pr. forsøk)
+    målsøk_rader = []
+    for r in målsøk_alle(inp, mål, float(terskel), int(maks_mnd)):
+        fmt = "{:,.3f} %" if r.variabel == "rente" else "{:,.0f} kr"
+        målsøk_rader.append({
+            "Variabel": r.variabel.capitalize(),
+            "Nå": fmt.format(r.nåverdi),
+            "Grense": fmt.format(r.verdi) if r.verdi is not None else "—",
+            "Endring": ("+" if r.endring >= 0 else "") + fmt.format(r.endring) if r.verdi is not None else "—",
+            "Merknad": r.melding,
+        })
+    st.dataframe(pd.DataFrame(målsøk_rader), hide_index=True, use_container_width=True)
+    st.caption("Kjøpesum og rente er høyeste verdi, leie og egenkapital laveste verdi som fortsatt når målet.")
+
+# ========================= Egenkapital og belåningsgrad =========================
+ytelse.neste("Egenkapital")
+with st.expander("🏠 Egenkapitaloppbygging og belåningsgrad (LTV)", expanded=False):
+    k1, k2, k3 = st.columns([1.6, 1, 1])
+    ltv_terskler = k1.multiselect(
+        "LTV-terskler (%)",
+        options=[90, 85, 80, 75, 70, 65, 60, 50, 40],
+        default=[round(t * 100) for t in LTV_TERSKLER],
+        key="ltv_terskler",
+    )
+    ek_horisont = k2.number_input("Horisont (år)", min_value=1, max_value=50, step=1,
+                                  value=max(int(st.session_state["løpetid"]), 1), key="ltv_horisont")
+    ek_oppløsning = k3.radio("Vis pr.", ["År", "Måned"], horizontal=True, key="ltv_opplosning")
+    ek = egenkapitalforløp(res, inp.startverdi, inp.verdistigning_sats,
+                           terskler=[t / 100 for t in sorted(ltv_terskler, reverse=True)], måneder=12 * int(ek_horisont))
+    ek_tabell = ek.pr_år() if ek_oppløsning == "År" else ek.tabell
+    g1, g2 = st.columns(2)
+    g1.line_chart(ek_tabell.set_index("År")[["Verdi", "Restgjeld", "Egenkapital"]], height=260)
+    g2.line_chart(ek_tabell.set_index("År")[["LTV (%)"]], height=260)
+    if ltv_terskler:
+        st.dataframe(ek.terskeltabell(), hide_index=True, use_container_width=True)
+    st.dataframe(
+        ek_tabell.style.format({"År": "{:.2f}", "Verdi": "{:,.0f}", "Restgjeld": "{:,.0f}", "Egenkapital": "{:,.0f}",
+                                "LTV (%)": "{:.1f}"}),
+        hide_index=True, use_container_width=True, height=360,
+    )
+    st.caption(
+        f"Verdi fra kjøpesum + oppussing med {verdistigning_tekst(inp.verdistigning_sats)} verdistigning, minus restgjelden. "
+        "LTV = restgjeld / verdi; tersklene viser første måned LTV er under (måned 0 = kjøpet, tomt = aldri)."
+    )
 
-    # Drift pr mnd tabell
-    drift_rows = ""
-    if drift_mnd:
-        drift_dict = st.session_state["persist"].get("drift_mnd", {}) or {}
-        drift_rows = (
-            "<table class='tight'><thead><tr><th>Post</th><th>Kr / mnd</th></tr></thead><tbody>"
-            + "".join(f"<tr><td>{_safe(k.capitalize())}</td><td>{int(v):,} kr</td></tr>"
-                      for k, v in drift_dict.items())
-            + f"<tr class='total'><td>Sum / mnd</td><td>{drift_mnd:,.0f} kr</td></tr>"
-            + "</tbody></table>"
+# ========================= Internrente og nåverdi =========================
+ytelse.neste("Internrente")
+with st.expander("💹 Internrente (IRR) og nåverdi (NPV) på egenkapitalen", expanded=False):
+    i1, i2 = st.columns([1.6, 1])
+    exit_år = i1.multiselect(
+        "Exit etter (år)",
+        options=list(range(1, 41)),
+        default=[år for år in STANDARD_EXIT_ÅR if år <= max(int(st.session_state["løpetid"]), 1)],
+        key="irr_exit_aar",
+    )
+    diskontering = i2.number_input("Avkastningskrav for NPV (%/år)", value=DISKONTERINGSRENTE * 100, step=0.5,
+                                   key="irr_diskontering")
+    if exit_år:
+        irr_tabell = avkastningstabell(res, st.session_state["eierform"], sorted(exit_år), float(diskontering) / 100)
+        st.dataframe(
+            irr_tabell.style.format({
+                "Egenkapital": "{:,.0f}", "Sum netto": "{:,.0f}", "Salgsverdi": "{:,.0f}", "Restgjeld": "{:,.0f}",
+                "IRR (%/år)": "{:.2f}", "NPV (kr)": "{:,.0f}",
+            }, na_rep="—"),
+            hide_index=True, use_container_width=True,
         )
+        mislykket = irr_tabell[irr_tabell["Status"] != OK]
+        if not mislykket.empty:
+            st.warning("Internrenten mangler eller er usikker for exit etter "
+                       + ", ".join(f"{int(r['Exit (år)'])} år ({r['Status']})" for _, r in mislykket.iterrows()))
+    st.caption(
+        f"Egenkapitalen ut ved kjøp, netto cashflow inn hver måned, og salgsverdi ({verdistigning_tekst(inp.verdistigning_sats)} verdistigning) "
+        "minus restgjeld ved exit. Ingen salgskostnader eller skatt ved salg."
+    )
 
-    # Rom-tabell
-    rom_table = ""
-    if antall_rom > 0 and rom_renter:
-        rom_table = (
-            "<table class='tight'><thead><tr><th>Rom</th><th>Leie / mnd</th></tr></thead><tbody>"
-            + "".join(f"<tr><td>{_safe(k.replace('_',' ').title())}</td><td>{int(v):,} kr</td></tr>"
-                      for k, v in rom_renter.items())
-            + f"<tr class='total'><td>Sum</td><td>{sum(rom_renter.values()):,} kr</td></tr>"
-            + "</tbody></table>"
+# ========================= Sensitivitet =========================
+ytelse.neste("Sensitivitet")
+def _sensitivitet_figur(res, ek_idx: int):
+    """Tre heatmaps (rente × leie): netto 1. mnd, break-even og akk. cashflow ved horisont."""
+    paneler = [
+        ("Netto 1. mnd (kr)", res.netto_1[ek_idx], "RdYlGn"),
+        ("Break-even (mnd)", res.break_even_mnd[ek_idx], "RdYlGn_r"),
+        (f"Akk. cashflow {res.horisont_mnd // 12} år (kr)", res.akk_horisont[ek_idx], "RdYlGn"),
+    ]
+    extent = [res.leier[0], res.leier[-1], res.renter[0], res.renter[-1]]
+    # Fast layout og nearest-interpolering: constrained_layout dobler tegnetiden
+    fig, axes = plt.subplots(1, 3, figsize=(15, 4.2))
+    fig.subplots_adjust(left=0.05, right=0.98, bottom=0.14, wspace=0.3)
+    for ax, (tittel, data, cmap_navn) in zip(axes, paneler):
+        cmap = plt.get_cmap(cmap_navn).copy()
+        cmap.set_bad("#d9d9d9")  # ingen break-even i løpetiden
+        im = ax.imshow(np.ma.masked_invalid(data), origin="lower", aspect="auto", extent=extent, cmap=cmap, interpolation="nearest")
+        ax.set_title(tittel)
+        ax.set_xlabel("Leie (kr/mnd)")
+        ax.set_ylabel("Rente (%)")
+        fig.colorbar(im, ax=ax)
+    return fig
+
+st.markdown("---")
+with st.expander("📊 Sensitivitet: rente × leie", expanded=False):
+    vis_sensitivitet = st.checkbox("Beregn sensitivitet", key="sens_vis")
+    if vis_sensitivitet:
+        s1, s2, s3 = st.columns(3)
+        rente_fra = s1.number_input("Rente fra (%)", min_value=0.0, value=max(float(st.session_state["rente"]) - 2.0, 0.0), step=0.1, key="sens_rente_fra")
+        rente_til = s1.number_input("Rente til (%)", min_value=0.0, value=float(st.session_state["rente"]) + 2.0, step=0.1, key="sens_rente_til")
+        rente_antall = s1.number_input("Antall renter", min_value=2, max_value=200, value=40, step=1, key="sens_rente_antall")
+        leie_fra = s2.number_input("Leie fra (kr/mnd)", value=int(leie * 0.7), step=500, key="sens_leie_fra")
+        leie_til = s2.number_input("Leie til (kr/mnd)", value=int(leie * 1.3), step=500, key="sens_leie_til")
+        leie_antall = s2.number_input("Antall leienivåer", min_value=2, max_value=200, value=40, step=1, key="sens_leie_antall")
+        varier_ek = s3.checkbox("Varier egenkapital", key="sens_varier_ek")
+        if varier_ek:
+            ek_fra = s3.number_input("Egenkapital fra (kr)", value=int(st.session_state["egenkapital"]), step=50_000, key="sens_ek_fra")
+            ek_til = s3.number_input("Egenkapital til (kr)", value=int(st.session_state["egenkapital"]) * 2, step=50_000, key="sens_ek_til")
+            ek_antall = s3.number_input("Antall nivåer", min_value=2, max_value=20, value=5, step=1, key="sens_ek_antall")
+            egenkapitaler = np.linspace(ek_fra, ek_til, int(ek_antall))
+        else:
+            egenkapitaler = np.array([float(st.session_state["egenkapital"])])
+
+        sens = sensitivitet_grid(
+            np.linspace(rente_fra, rente_til, int(rente_antall)),
+            np.linspace(leie_fra, leie_til, int(leie_antall)),
+            total_investering=total_investering,
+            egenkapital=egenkapitaler,
+            løpetid=int(st.session_state["løpetid"]),
+            avdragsfri=int(st.session_state["avdragsfri"]),
+            lånetype=st.session_state["lånetype"],
+            drift_mnd=drift_mnd_total,
+            eierform=st.session_state["eierform"],
+        )
+        ek_idx = 0
+        if len(sens.egenkapitaler) > 1:
+            ek_valg = st.select_slider(
+                "Vis egenkapital",
+                options=list(range(len(sens.egenkapitaler))),
+                format_func=lambda i: f"{sens.egenkapitaler[i]:,.0f} kr",
+                key="sens_ek_vis",
+            )
+            ek_idx = int(ek_valg)
+        fig = _sensitivitet_figur(sens, ek_idx)
+        st.pyplot(fig, use_container_width=True)
+        plt.close(fig)
+        st.caption("Grått felt i break-even = ingen break-even innen løpetiden.")
+
+# ========================= Monte Carlo =========================
+ytelse.neste("Monte Carlo")
+def _monte_carlo_figur(res):
+    """Persentilbånd (P5–P95 og P50) for akk. cashflow og egenkapital pr. år."""
+    fig, axes = plt.subplots(1, 2, figsize=(14, 4.2))
+    fig.subplots_adjust(left=0.07, right=0.98, bottom=0.14, wspace=0.25)
+    for ax, (tittel, bånd) in zip(axes, [("Akk. cashflow (kr)", res.akk_cashflow), ("Egenkapital (kr)", res.egenkapital)]):
+        ax.fill_between(bånd.index, bånd["P5"], bånd["P95"], alpha=0.25, color="#0b63ce", label="P5–P95")
+        ax.plot(bånd.index, bånd["P50"], color="#0b63ce", label="P50")
+        ax.axhline(0, color="#999", linewidth=0.8)
+        ax.set_title(tittel)
+        ax.set_xlabel("År")
+        ax.legend(loc="upper left")
+    return fig
+
+with st.expander("🎲 Monte Carlo: rente, ledighet og verdistigning", expanded=False):
+    m1, m2, m3 = st.columns(3)
+    mc_antall = m1.number_input("Antall baner", min_value=1_000, max_value=100_000, value=10_000, step=1_000, key="mc_antall")
+    mc_seed = m1.number_input("Seed", min_value=0, value=42, step=1, key="mc_seed")
+    mc_arbeidere = m1.number_input("Prosesser", min_value=1, max_value=64, value=os.cpu_count() or 1, step=1, key="mc_arbeidere")
+    mc_rente_lang = m2.number_input("Langsiktig rente (%)", min_value=0.0, value=float(st.session_state["rente"]), step=0.1, key="mc_rente_lang")
+    mc_rente_vol = m2.number_input("Rentevolatilitet (%-poeng/√år)", min_value=0.0, value=1.0, step=0.1, key="mc_rente_vol")
+    mc_reversjon = m2.number_input("Rentereversjon (pr. år)", min_value=0.0, value=0.3, step=0.05, key="mc_reversjon")
+    mc_ledighet = m3.number_input("Ledighet (% av måneder)", min_value=0.0, max_value=100.0, value=4.0, step=0.5, key="mc_ledighet")
+    mc_vekst = m3.number_input("Verdistigning snitt (%/år)", value=2.5, step=0.1, key="mc_vekst")
+    mc_vekst_vol = m3.number_input("Verdistigning std.avvik (%/år)", min_value=0.0, value=6.0, step=0.5, key="mc_vekst_vol")
+
+    if st.button("Kjør simulering", key="btn_mc"):
+        st.session_state["mc_resultat"] = simuler(
+            MonteCarloParametre(
+                lån=float(lånebeløp),
+                rente=float(st.session_state["rente"]),
+                løpetid=int(st.session_state["løpetid"]),
+                avdragsfri=int(st.session_state["avdragsfri"]),
+                lånetype=st.session_state["lånetype"],
+                leie=float(leie),
+                drift_mnd=float(drift_mnd_total),
+                eierform=st.session_state["eierform"],
+                startverdi=inp.startverdi,
+                rente_langsiktig=float(mc_rente_lang),
+                rente_reversjon=float(mc_reversjon),
+                rente_vol=float(mc_rente_vol),
+                ledighet=float(mc_ledighet) / 100,
+                vekst_snitt=float(mc_vekst) / 100,
+                vekst_vol=float(mc_vekst_vol) / 100,
+            ),
+            antall=int(mc_antall),
+            seed=int(mc_seed),
+            arbeidere=int(mc_arbeidere),
         )
 
-    # Skattefradrag
-    skatt_html = ""
-    if skatt:
-        skatt_html = f"""
-        <table class="tight">
-          <thead><tr><th>Post</th><th>Beløp (kr)</th></tr></thead>
-          <tbody>
-            <tr><td>Renteutgifter år 1</td><td>{skatt['renter_aar1']:,.0f}</td></tr>
-            <tr><td>Driftskostnader pr. år</td><td>{skatt['drift_aar']:,.0f}</td></tr>
-            <tr class="total"><td>Sum fradragsutgifter (år 1, forenklet)</td><td>{skatt['fradrag_aar1_sum']:,.0f}</td></tr>
-          </tbody>
-        </table>
-        <p class="muted">Forenklet oversikt. Skatteregler kan variere (vedlikehold vs. påkostning m.m.).</p>
-        """
-
-    # Verdiutvikling
-    verdi_html = ""
-    if verdi_tabell:
-        rows = "".join(
-            f"<tr><td>{int(r['År'])}</td><td>{int(r['Verdi']):,} kr</td></tr>"
-            for r in verdi_tabell
+    mc_res = st.session_state.get("mc_resultat")
+    if mc_res is not None:
+        fig = _monte_carlo_figur(mc_res)
+        st.pyplot(fig, use_container_width=True)
+        plt.close(fig)
+        st.caption(
+            f"{mc_res.antall:,} baner (seed {mc_res.seed}). "
+            f"Andel baner med negativ akk. cashflow ved slutt: {mc_res.andel_negativ_akk * 100:.1f} %"
         )
-        verdi_html = f"""
-        <table class="tight">
-          <thead><tr><th>År</th><th>Estimert verdi (2,5 % årlig)</th></tr></thead>
-          <tbody>{rows}</tbody>
-        </table>
-        """
-
-    html = f"""
-<!DOCTYPE html>
-<html lang="no">
-<head>
-<meta charset="utf-8" />
-<title>{_safe(prosjekt_navn)} – Presentasjon</title>
-<style>
-  :root {{
-    --bg:#fafafa; --card:#ffffff; --text:#111; --muted:#666; --border:#eaeaea; --brand:#0b63ce;
-  }}
-  * {{ box-sizing: border-box; }}
-  body {{ margin: 24px; font-family: -apple-system, BlinkMacSystemFont,"Segoe UI",Roboto,Helvetica,Arial,sans-serif; color: var(--text); background: var(--bg); }}
-  h1 {{ font-size: 28px; margin: 0 0 10px; }}
-  h2 {{ font-size: 20px; margin: 0 0 12px; }}
-  .muted {{ color: var(--muted); }}
-  .btn {{
-    display:inline-block; padding:8px 12px; border:1px solid var(--brand); color: var(--brand);
-    border-radius:10px; text-decoration:none; font-weight:600;
-  }}
-  .hero {{ display:grid; grid-template-columns: 1fr auto; gap: 16px; align-items:center; }}
-  .hero-img img {{
-    max-width: 360px; width: 100%;
-    border: 1px solid var(--border); border-radius: 12px; box-shadow: 0 2px 10px rgba(0,0,0,.06);
-  }}
-  .kpi {{
-    margin-top: 12px;
-    display:grid; grid-template-columns: repeat(3, minmax(0,1fr)); gap: 12px;
-  }}
-  .card {{
-    background: var(--card); border:1px solid var(--border); border-radius: 14px;
-    padding: 14px; box-shadow: 0 1px 6px rgba(0,0,0,.04);
-  }}
-  .kpi .card .label {{ font-size:12px; color:var(--muted); margin-bottom:6px; }}
-  .kpi .card .value {{ font-size:16px; font-weight:700; }}
-  .split {{ display:grid; grid-template-columns: 1fr 1fr; gap: 16px; }}
-  table {{ width:100%; border-collapse: collapse; font-size: 12px; }}
-  td, th {{ padding: 6px 8px; border-bottom:1px solid var(--border); text-align:right; }}
-  th:first-child, td:first-child {{ text-align:left; }}
-  table.tight td, table.tight th {{ padding: 6px 6px; }}
-  tr.total td {{ font-weight: 700; }}
-  .badge {{
-    display:inline-block; padding:4px 8px; border-radius:999px;
-    background:#eef6ff; color: var(--brand); font-size:12px; font-weight:700;
-  }}
-  .spacer {{ height: 8px; }}
-
-  /* Sikre at lenker bevares ved print → PDF */
-  @media print {{
-    a[href]::after {{ content:" (" attr(href) ")"; font-size:11px; color:#555; }}
-  }}
-</style>
-</head>
-<body>
-
-<div class="hero">
-  <div>
-    <h1>{_safe(prosjekt_navn)}</h1>
-    <p class="muted">Generert fra AMO Eiendomskalkulator</p>
-    {finn_html}
-  </div>
-  {cover_html}
-</div>
-
-<div class="kpi">
-  <div class="card"><div class="label">Kjøpesum</div><div class="value">{kjøpesum:,.0f} kr</div></div>
-  <div class="card"><div class="label">Dokumentavgift</div><div class="value">{dokumentavgift:,.0f} kr</div></div>
-  <div class="card"><div class="label">Oppussing</div><div class="value">{oppussing_total:,.0f} kr</div></div>
-
-  <div class="card"><div class="label">Drift / mnd</div><div class="value">{drift_mnd:,.0f} kr</div></div>
-  <div class="card"><div class="label">Total investering</div><div class="value">{total_investering:,.0f} kr</div></div>
-  <div class="card"><div class="label">Leie / mnd</div><div class="value">{leie:,.0f} kr</div></div>
-
-  <div class="card"><div class="label">Egenkapital</div><div class="value">{egenkapital:,.0f} kr</div></div>
-  <div class="card"><div class="label">Rente</div><div class="value">{rente:.2f} %</div></div>
-  <div class="card"><div class="label">Yield (brutto / netto)</div><div class="value">{(leie*12/total_investering*100 if total_investering else 0):.2f}% / {((leie*12 - drift_mnd*12)/total_investering*100 if total_investering else 0):.2f}%</div></div>
-
-  <div class="card"><div class="label">Antall rom</div><div class="value">{antall_rom}</div></div>
-  <div class="card"><div class="label">Snitt pr. rom</div><div class="value">{snitt_pr_rom:,.0f} kr</div></div>
-  <div class="card"><div class="label">Leie-kilde</div><div class="value"><span class="badge">{_safe(leie_kilde)}</span></div></div>
-</div>
-
-<div class="spacer"></div>
-
-{"<div class='card'><h2>Notater</h2><p>" + _safe(note).replace("\\n","<br>") + "</p></div>" if note else ""}
-
-<div class="spacer"></div>
-
-<div class="split">
-  <div class="card">
-    <h2>Oppussing (engang)</h2>
-    {opp_rows if opp_rows else "<p class='muted'>Ingen oppussingskostnader registrert.</p>"}
-  </div>
-  <div class="card">
-    <h2>Drift (per måned)</h2>
-    {drift_rows if drift_rows else "<p class='muted'>Ingen driftskostnader registrert.</p>"}
-  </div>
-</div>
-
-<div class="spacer"></div>
-
-<div class="card">
-  <h2>Rom og leie</h2>
-  {rom_table if rom_table else "<p class='muted'>Ingen rom spesifisert.</p>"}
-</div>
-
-<div class="spacer"></div>
-
-<div class="split">
-  <div class="card">
-    <h2>Skattefradrag (estimat)</h2>
-    {skatt_html if skatt_html else "<p class='muted'>Ingen beregning tilgjengelig.</p>"}
-  </div>
-  <div class="card">
-    <h2>Verdiutvikling (2,5 % årlig)</h2>
-    {verdi_html if verdi_html else "<p class='muted'>Ingen beregning tilgjengelig.</p>"}
-  </div>
-</div>
-
-<div class="spacer"></div>
-
-<div class="card">
-  <h2>Kontantstrøm – første 24 måneder</h2>
-  <table>
-    <thead>
-      <tr>
-        <th>Mnd</th><th>Restgjeld</th><th>Avdrag</th><th>Renter</th><th>Netto</th><th>Akk.</th>
-      </tr>
-    </thead>
-    <tbody>
-      {cash_html}
-    </tbody>
-  </table>
-  <p class="muted">Full tidsserie kan eksporteres fra appen.</p>
-</div>
-
-</body>
-</html>
-"""
-    return html.encode("utf-8")
+        slutt = pd.DataFrame({"Akk. cashflow": mc_res.akk_cashflow.iloc[-1], "Egenkapital": mc_res.egenkapital.iloc[-1]})
+        st.table(slutt.style.format("{:,.0f}"))
 
-rapport_bytes = lag_presentasjon_html(
-    df=df,
-    prosjekt_navn=proj_navn,
-    finn_url=finn_url,
-    note=note,
-    cover_url=st.session_state["persist"].get("cover_url", ""),
-    cover_b64=st.session_state["persist"].get("cover_b64", ""),
-    kjøpesum=int(kjøpesum),
-    dokumentavgift=int(dokumentavgift),
-    oppussing_total=int(oppussing_total),
-    drift_mnd=int(drift_mnd_total),
-    total_investering=int(total_investering),
-    leie=int(leie),
-    rente=float(st.session_state["rente"]),
-    løpetid=int(st.session_state["løpetid"]),
-    avdragsfri=int(st.session_state["avdragsfri"]),
-    lånetype=st.session_state["lånetype"],
-    eierform=st.session_state["eierform"],
-    egenkapital=int(st.session_state["egenkapital"]),
-    antall_rom=int(st.session_state["persist"].get("antall_rom", 0)),
-    rom_renter=st.session_state["persist"].get("rooms_leie", {}),
-    skatt=skatt,
-    verdi_tabell=verdistigning,
-)
+# ========================= Presentasjon (HTML – detalj) =========================
+ytelse.neste("Presentasjon")
+# Rapportene bygges først når knappen trykkes, og gjenbrukes så lenge input er uendret.
+# Nedlastingen kjøres senere i en annen tråd: input og beregning fra denne kjøringen
+# fanges her, så rapporten alltid passer til nøkkelen, og den levende grafen røres ikke.
+def _lazy_rapport(type_: str, inp: Eiendomsinput, lag):
+    return lambda: rapportcache.hent(rapport_nøkkel(type_, inp), lag)
 
 st.markdown("---")
 st.subheader("📄 Presentasjon")
+full_tidsserie = st.checkbox(
+    "Ta med hele nedbetalingsplanen i kontantstrømtabellen",
+    value=False,
+    key="rapport_full_tidsserie",
+    help="Standard er de første 24 månedene.",
+)
+rapport_bytes = _lazy_rapport(
+    "presentasjon_full" if full_tidsserie else "presentasjon",
+    inp,
+    ytelse.målt("Bygg presentasjon")(
+        lambda inp=inp, res=res, full=full_tidsserie: presentasjon_html(inp, res, bildelager, full_tidsserie=full)
+    ),
+)
 st.download_button(
     "Last ned presentasjon (HTML)",
     data=rapport_bytes,
@@ -841,130 +986,9 @@ st.download_button(
 st.caption("Åpne HTML-filen i nettleser → Skriv ut → Lagre som PDF. (Lenker og rå-URL bevares som klikkbare.)")
 
 # ========================= ONE PAGER (BANK) =========================
-def lag_onepager_html(
-    prosjekt_navn: str,
-    finn_url: str,
-    kjøpesum: int,
-    dokumentavgift: int,
-    oppussing_total: int,
-    total_investering: int,
-    egenkapital: int,
-    lån: int,
-    lånegrad: float,
-    brutto_leie_mnd: int,
-    eff_leie_mnd: int,
-    drift_mnd: int,
-    brutto_yield: float,
-    netto_yield: float,
-    rente: float,
-    løpetid: int,
-    avdragsfri: int,
-    lånetype: str,
-    eierform: str,
-    kpis_1: dict,
-    breakeven_mnd: int | None,
-    note: str
-) -> bytes:
-    """Returnerer HTML for en bankvennlig one-pager."""
-    safe_url = finn_url if (finn_url.startswith("http://") or finn_url.startswith("https://")) else ""
-    html = f"""
-<!DOCTYPE html>
-<html lang="no">
-<head>
-<meta charset="utf-8" />
-<title>{prosjekt_navn} – One Pager</title>
-<style>
-  body {{ font-family: Arial, sans-serif; margin: 36px; color:#111; }}
-  h1 {{ font-size: 26px; margin-bottom: 0; }}
-  h2 {{ font-size: 18px; margin-top: 20px; }}
-  table {{ border-collapse: collapse; width: 100%; margin-top: 6px; }}
-  th, td {{ text-align: left; padding: 6px; border-bottom: 1px solid #ddd; }}
-  th {{ background:#f7f7f7; }}
-  .muted {{ color:#666; font-size: 12px; }}
-  .grid {{ display: grid; grid-template-columns: 1fr 1fr; gap: 16px; }}
-  @media print {{
-    a[href]::after {{ content:" (" attr(href) ")"; font-size:11px; color:#555; }}
-  }}
-</style>
-</head>
-<body>
-
-<h1>{prosjekt_navn}</h1>
-<p class="muted">One Pager – for bank / finansiering</p>
-{"<p><a href='" + safe_url + "' target='_blank'>🔗 FINN-annonsen</a></p>" if safe_url else ""}
-
-<div class="grid">
-<div>
-<h2>Grunnlag</h2>
-<table>
-<tr><th>Kjøpesum</th><td>{kjøpesum:,.0f} kr</td></tr>
-<tr><th>Dokumentavgift</th><td>{dokumentavgift:,.0f} kr</td></tr>
-<tr><th>Oppussing</th><td>{oppussing_total:,.0f} kr</td></tr>
-<tr><th>Total investering</th><td>{total_investering:,.0f} kr</td></tr>
-<tr><th>Egenkapital</th><td>{egenkapital:,.0f} kr</td></tr>
-<tr><th>Lånebeløp</th><td>{lån:,.0f} kr</td></tr>
-<tr><th>Lånegrad (LTV)</th><td>{lånegrad:.1f} %</td></tr>
-</table>
-</div>
-
-<div>
-<h2>Leie & Yield</h2>
-<table>
-<tr><th>Brutto leie</th><td>{brutto_leie_mnd:,.0f} kr/mnd</td></tr>
-<tr><th>Effektiv leie</th><td>{eff_leie_mnd:,.0f} kr/mnd</td></tr>
-<tr><th>Driftskostnader</th><td>{drift_mnd:,.0f} kr/mnd</td></tr>
-<tr><th>Yield brutto</th><td>{brutto_yield:.2f} %</td></tr>
-<tr><th>Yield netto</th><td>{netto_yield:.2f} %</td></tr>
-</table>
-</div>
-</div>
-
-<h2>Lån</h2>
-<table>
-<tr><th>Rente</th><td>{rente:.2f} %</td></tr>
-<tr><th>Løpetid</th><td>{løpetid} år</td></tr>
-<tr><th>Avdragsfri</th><td>{avdragsfri} år</td></tr>
-<tr><th>Lånetype</th><td>{lånetype}</td></tr>
-<tr><th>Eierform</th><td>{eierform}</td></tr>
-<tr><th>Termin 1. mnd</th><td>{kpis_1['termin']:,.0f} kr</td></tr>
-<tr><th>Netto 1. mnd</th><td>{kpis_1['netto']:,.0f} kr</td></tr>
-<tr><th>Break-even</th><td>{breakeven_mnd if breakeven_mnd else '—'} mnd</td></tr>
-</table>
-
-{"<h2>Notater</h2><p>" + note.replace("\\n","<br>") + "</p>" if note else ""}
-
-</body>
-</html>
-"""
-    return html.encode("utf-8")
-
-# One-pager bytes
-brutto_leie_mnd = leie
-eff_leie_mnd = leie  # eventuelt juster for ledighet/forvaltning senere
-onepager_bytes = lag_onepager_html(
-    prosjekt_navn=proj_navn,
-    finn_url=finn_url,
-    kjøpesum=int(kjøpesum),
-    dokumentavgift=int(dokumentavgift),
-    oppussing_total=int(oppussing_total),
-    total_investering=int(total_investering),
-    egenkapital=int(st.session_state["egenkapital"]),
-    lån=int(st.session_state["lån"]),
-    lånegrad=(st.session_state["lån"] / total_investering * 100) if total_investering else 0.0,
-    brutto_leie_mnd=int(brutto_leie_mnd),
-    eff_leie_mnd=int(eff_leie_mnd),
-    drift_mnd=int(drift_mnd_total),
-    brutto_yield=(brutto_leie_mnd*12/total_investering*100 if total_investering else 0.0),
-    netto_yield=((eff_leie_mnd*12 - drift_mnd_total*12)/total_investering*100 if total_investering else 0.0),
-    rente=float(st.session_state["rente"]),
-    løpetid=int(st.session_state["løpetid"]),
-    avdragsfri=int(st.session_state["avdragsfri"]),
-    lånetype=st.session_state["lånetype"],
-    eierform=st.session_state["eierform"],
-    kpis_1=kpis_1,
-    breakeven_mnd=breakeven_mnd,
-    note=note
-)
+ytelse.neste("One pager")
+onepager_bytes = _lazy_rapport("onepager", inp,
+                               ytelse.målt("Bygg one pager")(lambda inp=inp, res=res: onepager_html(inp, res)))
 
 st.download_button(
     "📑 Last ned One Pager (for bank)",
@@ -975,6 +999,33 @@ st.download_button(
 )
 
 # ========================= Autosave persist =========================
-if st.session_state["_dirty"]:
-    _save_json(PERSIST_PATH, st.session_state["persist"])
-    st.session_state["_dirty"] = False
+ytelse.neste("Autosave")
+lagre_hvis_endret()
+
+with st.sidebar.expander("💾 Autosave", expanded=False):
+    st.caption(f"Navnerom: {navnerom} · {PERSIST_PATH}")
+    autosave_stats = st.session_state["_autosave"].statistikk()
+    if autosave_stats["siste_feil"]:
+        st.error(f"Autosave feilet: {autosave_stats['siste_feil']}")
+    st.caption(
+        f"Skrivinger: {autosave_stats['skrivinger']} · utsatt: {autosave_stats['utsatt']} · "
+        f"komprimeringer: {autosave_stats['komprimeringer']} · journal: {autosave_stats['journal_linjer']} linjer  \n"
+        f"Latens snitt/maks: {autosave_stats['snitt_latens_ms']:.2f} / {autosave_stats['maks_latens_ms']:.2f} ms"
+    )
+
+with st.sidebar.expander("🧮 Beregningsgraf", expanded=False):
+    st.caption("Treff = gjenbrukt fra forrige rerun, bom = beregnet på nytt.")
+    st.dataframe(graf.statistikk().drop(columns="avhenger_av"), hide_index=True, use_container_width=True)
+
+# ========================= Ytelse (debug) =========================
+st.session_state["_full_kjøring"] = False
+ytelse_post = ytelse.avslutt()
+if ytelse_post is not None:
+    with st.expander("⏱️ Ytelse pr. seksjon (debug)", expanded=False):
+        st.caption(f"Denne rerunen: {ytelse_post['total_s'] * 1000:.1f} ms · logg: {YTELSE_LOGG}")
+        st.dataframe(pd.DataFrame(ytelse_post["seksjoner"]).assign(ms=lambda d: d["s"] * 1000).drop(columns="s"),
+                     hide_index=True, use_container_width=True)
+        bygg = [p for p in SISTE if p["type"] == "seksjon"]
+        if bygg:
+            st.caption("Siste rapportbygginger (kjøres ved nedlasting, utenfor rerunen)")
+            st.dataframe(pd.DataFrame(bygg).drop(columns="type"), hide_index=True, use_container_width=True)
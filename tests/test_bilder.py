@@ -0,0 +1,30 @@
+"""Bildelageret: nøkkelen er hashen av de lagrede bytene, også når bildet nedskaleres."""
+import hashlib
+from io import BytesIO
+
+from PIL import Image
+
+from amo_eiendom.bilder import Bildelager
+
+
+def _bilde(størrelse, format_):
+    ut = BytesIO()
+    Image.new("RGB", størrelse, (200, 10, 10)).save(ut, format=format_)
+    return ut.getvalue()
+
+
+def test_nedskalert_bilde_nøkles_på_lagrede_bytes(tmp_path):
+    lager = Bildelager(tmp_path, maks_side=400)
+    data = _bilde((1200, 800), "JPEG")
+    hash_ = lager.lagre(data)
+    assert hash_ == hashlib.sha256(lager.hent(hash_)).hexdigest()
+    assert hash_ != hashlib.sha256(data).hexdigest()
+    assert lager.lagre(data) == hash_
+    assert len(list(tmp_path.rglob("*.jpg"))) == 1
+
+
+def test_lite_bilde_lagres_uendret(tmp_path):
+    lager = Bildelager(tmp_path)
+    data = _bilde((100, 100), "PNG")
+    assert lager.lagre(data) == hashlib.sha256(data).hexdigest()
+    assert lager.hent(lager.lagre(data)) == data
@@ -0,0 +1,109 @@
+"""Lånemotoren på lukket form mot den tidligere måned-for-måned-løkken."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from amo_eiendom.kpi import break_even_month, first_month_kpis
+from amo_eiendom.kpi_lukket import lukkede_kpi
+from amo_eiendom.laan import AS_SKATTESATS, TOLERANSE_REL, beregn_lån, nedbetalingsplan_matrise
+from amo_eiendom.skatt import skattefradrag_estimat
+
+KOLONNER = ["Restgjeld", "Avdrag", "Renter", "Netto cashflow", "Akk. cashflow"]
+
+SCENARIER = [
+    # lån, rente, løpetid, avdragsfri, lånetype, leie, drift_mnd, eierform
+    (3_000_000, 5.0, 25, 0, "Annuitetslån", 22_000, 3_000, "Privat"),
+    (3_000_000, 5.0, 25, 2, "Serielån", 22_000, 3_000, "Privat"),
+    (6_338_000, 6.0, 30, 1, "Annuitetslån", 35_000, 4_500, "AS"),
+    (2_500_000, 4.2, 20, 0, "Serielån", 30_000, 2_000, "AS"),
+    (1_000_000, 0.0, 10, 0, "Annuitetslån", 9_000, 500, "Privat"),
+    (1_000_000, 0.0, 10, 3, "Serielån", 9_000, 500, "AS"),
+    (4_000_000, 3.5, 5, 5, "Annuitetslån", 15_000, 2_000, "Privat"),   # bare avdragsfrie måneder
+    (0, 5.0, 25, 0, "Annuitetslån", 10_000, 2_000, "AS"),
+    (10_000_000, 9.9, 30, 0, "Annuitetslån", 0, 0, "Privat"),
+]
+
+
+def referanse(lån, rente, løpetid, avdragsfri, lånetype, leie, drift_mnd, eierform):
+    """Den tidligere løkken i app.py, uendret bortsett fra navn."""
+    n = int(løpetid * 12)
+    af = int(avdragsfri * 12)
+    r = float(rente) / 100 / 12
+    if lånetype == "Annuitetslån" and r > 0 and (n - af) > 0:
+        terminbeløp = lån * (r * (1 + r) ** (n - af)) / ((1 + r) ** (n - af) - 1)
+    else:
+        terminbeløp = lån / (n - af) if (n - af) > 0 else 0
+
+    saldo = float(lån)
+    rader = []
+    akk = 0.0
+    for m in range(n):
+        rente_mnd = saldo * r
+        if m < af:
+            avdrag_mnd = 0.0
+            termin = rente_mnd
+        elif lånetype == "Serielån" and (n - af) > 0:
+            avdrag_mnd = float(lån) / (n - af)
+            termin = avdrag_mnd + rente_mnd
+        else:
+            avdrag_mnd = terminbeløp - rente_mnd
+            termin = terminbeløp
+        saldo = max(saldo - avdrag_mnd, 0.0)
+        netto = float(leie) - float(drift_mnd) - termin
+        if eierform == "AS" and netto > 0:
+            netto *= (1 - AS_SKATTESATS)
+        akk += netto
+        rader.append((m + 1, saldo, avdrag_mnd, rente_mnd, netto, akk))
+    return pd.DataFrame(rader, columns=["Måned", *KOLONNER]), akk
+
+
+@pytest.mark.parametrize("scenario", SCENARIER)
+def test_beregn_lån_som_løkken(scenario):
+    df, akk = beregn_lån(*scenario)
+    ref, ref_akk = referanse(*scenario)
+    toleranse = TOLERANSE_REL * max(scenario[0], 1)
+    assert len(df) == len(ref)
+    assert (df["Måned"].to_numpy() == ref["Måned"].to_numpy()).all()
+    for kolonne in KOLONNER:
+        assert np.max(np.abs(df[kolonne].to_numpy() - ref[kolonne].to_numpy()), initial=0.0) <= toleranse, kolonne
+    assert abs(akk - ref_akk) <= toleranse
+
+
+def test_tilfeldige_scenarier_som_løkken():
+    rng = np.random.default_rng(1)
+    for _ in range(40):
+        scenario = (
+            float(rng.integers(0, 9_000_000)), float(rng.choice([0.0, rng.uniform(0, 10)])),
+            int(rng.integers(1, 31)), int(rng.integers(0, 4)), str(rng.choice(["Annuitetslån", "Serielån"])),
+            float(rng.integers(0, 80_000)), float(rng.integers(0, 9_000)), str(rng.choice(["Privat", "AS"])),
+        )
+        df, _ = beregn_lån(*scenario)
+        ref, _ = referanse(*scenario)
+        toleranse = TOLERANSE_REL * max(scenario[0], 1)
+        for kolonne in KOLONNER:
+            assert np.max(np.abs(df[kolonne].to_numpy() - ref[kolonne].to_numpy()), initial=0.0) <= toleranse
+
+
+@pytest.mark.parametrize("scenario", SCENARIER)
+def test_lukkede_kpi_som_tabellen(scenario):
+    df, akk = beregn_lån(*scenario)
+    kpi = {k: v[0] for k, v in lukkede_kpi(*scenario, horisonter=(12, 60)).items()}
+    toleranse = TOLERANSE_REL * max(scenario[0], 1)
+    første = first_month_kpis(df)
+    assert kpi["termin_1"] == pytest.approx(første["termin"], abs=toleranse)
+    assert kpi["netto_1"] == pytest.approx(første["netto"], abs=toleranse)
+    assert kpi["renter_aar1"] == pytest.approx(skattefradrag_estimat(df, 0)["renter_aar1"], abs=toleranse)
+    assert kpi["renter_total"] == pytest.approx(df["Renter"].sum(), abs=toleranse)
+    assert kpi["akk_slutt"] == pytest.approx(akk, abs=toleranse)
+    for h in (12, 60):
+        assert kpi[f"akk_{h}"] == pytest.approx(df["Akk. cashflow"].iloc[min(h, len(df)) - 1], abs=toleranse)
+    assert (break_even_month(df) or 0) == kpi["break_even_mnd"]
+
+
+def test_negativ_rente_avvises():
+    with pytest.raises(ValueError):
+        beregn_lån(3_000_000, -0.5, 25, 0, "Annuitetslån", 22_000, 3_000, "Privat")
+    with pytest.raises(ValueError):
+        nedbetalingsplan_matrise([3_000_000, 3_000_000], [5.0, -0.1], 25, 0, "Annuitetslån")
+    with pytest.raises(ValueError):
+        lukkede_kpi(3_000_000, -1.0, 25, 0, "Serielån", 22_000, 3_000, "AS")
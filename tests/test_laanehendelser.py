@@ -0,0 +1,29 @@
+"""Hendelsesmotoren uten hendelser skal gi samme tall som beregn_lån."""
+import numpy as np
+import pytest
+
+from amo_eiendom.laan import TOLERANSE_REL, beregn_lån
+from amo_eiendom.laanehendelser import beregn_lån_hendelser, hendelse_fra_dict
+
+from .test_laan import KOLONNER, SCENARIER
+
+
+@pytest.mark.parametrize("scenario", SCENARIER)
+def test_uten_hendelser_som_beregn_lån(scenario):
+    df, akk = beregn_lån(*scenario)
+    forløp = beregn_lån_hendelser(*scenario)
+    tabell = forløp.tabell()
+    toleranse = TOLERANSE_REL * max(scenario[0], 1)
+    assert len(tabell) == len(df)
+    for kolonne in KOLONNER:
+        assert np.max(np.abs(tabell[kolonne].to_numpy() - df[kolonne].to_numpy()), initial=0.0) <= toleranse, kolonne
+    assert forløp.akk == pytest.approx(akk, abs=toleranse)
+    assert forløp.renter_total == pytest.approx(df["Renter"].sum(), abs=toleranse)
+    assert forløp.første_måned()["netto"] == pytest.approx(df["Netto cashflow"].iloc[0] if len(df) else 0.0, abs=toleranse)
+
+
+def test_negativ_rente_avvises():
+    with pytest.raises(ValueError):
+        beregn_lån_hendelser(3_000_000, -0.5, 25, 0, "Annuitetslån", 22_000, 3_000, "Privat")
+    with pytest.raises(ValueError):
+        hendelse_fra_dict({"type": "renteendring", "måned": 13, "rente": -1.0})
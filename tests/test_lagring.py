@@ -0,0 +1,27 @@
+"""JSON-lagring: manglende eller ødelagte filer gir {}, andre feil når kalleren."""
+import pytest
+
+from amo_eiendom.autosave import Autosave
+from amo_eiendom.lagring import load_json, save_json
+
+
+def test_manglende_og_ugyldig_fil_gir_tom(tmp_path):
+    assert load_json(tmp_path / "mangler.json") == {}
+    (tmp_path / "ødelagt.json").write_text("{ikke json", encoding="utf-8")
+    assert load_json(tmp_path / "ødelagt.json") == {}
+
+
+def test_lese_og_skrivefeil_sendes_videre(tmp_path):
+    with pytest.raises(OSError):
+        load_json(tmp_path)
+    with pytest.raises(OSError):
+        save_json(tmp_path / "mangler" / "profil.json", {"a": 1})
+
+
+def test_autosave_viser_feil_ved_komprimering(tmp_path):
+    autosave = Autosave(tmp_path / "autosave.json", debounce_s=0, komprimer_etter=2)
+    autosave.last()
+    autosave.registrer({"rente": 5.0}, nå=1e9)
+    (tmp_path / "autosave.json").mkdir()  # øyeblikksbildet kan ikke leses eller erstattes
+    assert not autosave.registrer({"rente": 6.0}, nå=2e9)
+    assert autosave.statistikk()["siste_feil"].startswith("IsADirectoryError")
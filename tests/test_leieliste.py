@@ -0,0 +1,21 @@
+"""Ledighet fra leielisten: prosent når kolonnen eller cellen sier det."""
+import pandas as pd
+import pytest
+
+from amo_eiendom.leieliste import fra_dataframe
+
+
+def test_celler_med_prosenttegn():
+    df = pd.DataFrame({"leie": [10_000] * 5, "ledighet": ["1 %", "0,5 %", "0.05", "5", None]})
+    assert fra_dataframe(df, 0.02).ledighet.tolist() == pytest.approx([0.01, 0.005, 0.05, 0.05, 0.02])
+
+
+@pytest.mark.parametrize("verdier", [[1, 0.5, 5], ["1", "0,5", "5"]])
+def test_kolonnen_ledighet_pst(verdier):
+    df = pd.DataFrame({"leie": [10_000] * 3, "Ledighet_pst": verdier})
+    assert fra_dataframe(df).ledighet.tolist() == pytest.approx([0.01, 0.005, 0.05])
+
+
+def test_umerkede_tall_over_1_er_prosent():
+    df = pd.DataFrame({"leie": [10_000] * 3, "vacancy": [0.05, 1, 5]})
+    assert fra_dataframe(df).ledighet.tolist() == pytest.approx([0.05, 1.0, 0.05])
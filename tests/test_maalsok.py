@@ -0,0 +1,26 @@
+"""Målsøk: svaret er grensen på rutenettet – det når målet, ett steg forbi gjør det ikke."""
+import numpy as np
+import pytest
+
+from amo_eiendom.maalsok import VARIABLER, _oppfylt, målsøk
+from amo_eiendom.modeller import Eiendomsinput
+
+INNDATA = [
+    Eiendomsinput(),
+    Eiendomsinput(kjøpesum=5_500_000, leie=28_000, rente=5.4, lånetype="Serielån", eierform="AS"),
+    Eiendomsinput(kjøpesum=3_200_000, leie=19_500, rente=4.1, avdragsfri=2),
+]
+
+
+@pytest.mark.parametrize("inp", INNDATA)
+@pytest.mark.parametrize("variabel", list(VARIABLER))
+@pytest.mark.parametrize("mål,terskel,maks_mnd", [("netto_1", 0.0, 120), ("netto_1", 2_000.0, 120), ("break_even", 0.0, 120)])
+def test_grensen_er_skarp(inp, variabel, mål, terskel, maks_mnd):
+    res = målsøk(inp, variabel, mål, terskel=terskel, maks_mnd=maks_mnd)
+    if res.verdi is None or res.melding:
+        pytest.skip(res.melding or "målet nås ikke")
+    retning, presisjon = VARIABLER[variabel]
+    forbi = res.verdi + presisjon if retning == "maks" else res.verdi - presisjon
+    ok = _oppfylt(inp, variabel, np.array([res.verdi, np.round(forbi, 6)]), mål, terskel, maks_mnd)
+    assert ok[0]
+    assert not ok[1]
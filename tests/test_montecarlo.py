@@ -0,0 +1,28 @@
+"""Monte Carlo: validering av antall baner og samme resultat for samme frø."""
+import pandas as pd
+import pytest
+
+from amo_eiendom.montecarlo import MonteCarloParametre, simuler
+
+PARAMETRE = MonteCarloParametre(
+    lån=3_000_000, rente=5.0, løpetid=25, avdragsfri=0, lånetype="Annuitetslån",
+    leie=22_000, drift_mnd=3_000, eierform="Privat", startverdi=4_000_000,
+)
+
+
+@pytest.mark.parametrize("antall", [0, -5])
+def test_antall_under_1_avvises(antall):
+    with pytest.raises(ValueError):
+        simuler(PARAMETRE, antall=antall, seed=1, arbeidere=1)
+
+
+def test_én_bane():
+    res = simuler(PARAMETRE, antall=1, seed=1, arbeidere=1)
+    assert res.antall == 1
+    assert len(res.akk_cashflow) == PARAMETRE.løpetid + 1
+
+
+def test_samme_frø_gir_samme_resultat():
+    a = simuler(PARAMETRE, antall=300, seed=7, arbeidere=1, chunk=100)
+    b = simuler(PARAMETRE, antall=300, seed=7, arbeidere=1, chunk=100)
+    pd.testing.assert_frame_equal(a.akk_cashflow, b.akk_cashflow)
@@ -0,0 +1,44 @@
+"""Norske tall: én tolkning for både kolonner (leieliste) og enkeltverdier (annonser)."""
+import math
+
+import pandas as pd
+import pytest
+
+from amo_eiendom.tall import norsk_tall, norske_tall
+
+TILFELLER = [
+    ("kr 12.500", 12_500.0),
+    ("4.250.000", 4_250_000.0),
+    ("4 250 000 kr", 4_250_000.0),
+    ("kr. 4.250.000", 4_250_000.0),
+    ("12 500,-", 12_500.0),
+    ("12 500,50", 12_500.5),
+    ("12.500,50", 12_500.5),
+    ("12500.50", 12_500.5),
+    ("12.5", 12.5),
+    ("0,5 %", 0.5),
+    ("-1.500", -1_500.0),
+    ("12,500.50", None),
+    ("", None),
+    ("ukjent", None),
+    (None, None),
+]
+
+
+@pytest.mark.parametrize("tekst,forventet", TILFELLER)
+def test_norsk_tall(tekst, forventet):
+    assert norsk_tall(tekst) == forventet
+
+
+def test_kolonne_som_enkeltverdier():
+    tekster, forventet = zip(*TILFELLER)
+    tall = norske_tall(pd.Series(tekster, dtype=object))
+    for t, f in zip(tall, forventet):
+        assert math.isnan(t) if f is None else t == f
+
+
+def test_tallkolonne_og_tallverdier_brukes_som_de_er():
+    assert norske_tall(pd.Series([1, 2.5])).tolist() == [1.0, 2.5]
+    assert norsk_tall(4_250_000) == 4_250_000.0
+    assert norsk_tall(float("nan")) is None
+    assert norsk_tall(True) is None